@@ -0,0 +1,168 @@
+import argparse
+import os
+import re
+import sys
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from latencies import PERCENTILES, find_experiment_dirs, iter_task_chunks
+from latency_store import ExperimentResult, LATENCIES
+from task_index import find_task_index
+
+SUMMARY = "-summary.csv"
+CLIENT_RESULT = re.compile(r"^(?P<run>.+)-c(?P<client>\d+)(?P<suffix>-summary\.csv|-latencies\.csv)$")
+
+SUMMARY_COLUMNS = [
+    'Task-ID', 'async / sync', 'intended load (ops/s)', 'thread num', 'runtime', 'req size [B]',
+    'Total Time (sec)', 'Tput (ops/sec)', 'Resp. Time (ms)',
+    '50th p (ms)', '95th p (ms)', '99th p (ms)', '999th p (ms)',
+]
+
+
+def find_client_runs(result_dir: str) -> Dict[str, List[int]]:
+    """
+    Finds the runs of an ExperimentResult folder that were executed by several clients.
+
+    :return: The client indices of every run, by the run's output name.
+    """
+    runs = {}
+    for file in os.listdir(result_dir):
+        match = CLIENT_RESULT.match(file)
+        if match and match.group("suffix") == SUMMARY:
+            runs.setdefault(match.group("run"), []).append(int(match.group("client")))
+    return {run: sorted(clients) for run, clients in runs.items()}
+
+
+def client_repetitions(client_run: str) -> Dict[Tuple[int, int], Tuple[pd.Series, List[np.ndarray]]]:
+    """
+    Reads the summary row and samples of every repetition of every task of one client.
+
+    Repetitions are taken from the task index, which only records attempts
+    that succeeded on all clients. Summary rows of failed attempts have no
+    index entry and are skipped.
+
+    :param client_run: Result files prefix of the client, without suffix.
+    :return: The summary row and sample chunks keyed by task id and repetition,
+             the n-th occurrence of a task in the task index is its repetition n.
+    """
+    latencies_path = client_run + LATENCIES
+    boundaries = find_task_index(latencies_path)
+    if boundaries is None:
+        raise ValueError(f"{latencies_path} has no task index, samples cannot be split by task")
+
+    summary = pd.read_csv(client_run + SUMMARY)
+    repetitions = {}
+    occurrences = {}
+    for boundary in boundaries:
+        repetition = occurrences.get(boundary.task_id, 0)
+        occurrences[boundary.task_id] = repetition + 1
+        if boundary.summary_row is not None:
+            row = summary.iloc[boundary.summary_row]
+        else:
+            # index written before summary rows were recorded, the n-th row of a task is its repetition n
+            task_rows = summary[summary['Task-ID'] == boundary.task_id]
+            if repetition >= len(task_rows):
+                raise ValueError(f"{client_run + SUMMARY} has no row for repetition {repetition + 1} of task {boundary.task_id}")
+            row = task_rows.iloc[repetition]
+        repetitions[(boundary.task_id, repetition)] = (row, list(iter_task_chunks(latencies_path, boundary)))
+    return repetitions
+
+
+def aggregate_run(result_dir: str, run: str, clients: List[int]) -> pd.DataFrame:
+    """
+    Merges the results of all clients of a run into one summary with one row
+    per repetition of every task, in the order they ran.
+
+    Repetitions are the successful attempts recorded in the task index of
+    every client. Percentiles and the mean response time are computed from the
+    merged raw samples of a repetition, throughput is the number of samples of
+    all clients over the longest client runtime of the repetition. The intended
+    load is the sum of the client shares, every client runs the configured
+    number of threads.
+    """
+    repetitions = {}
+    for client in clients:
+        client_run = os.path.join(result_dir, f"{run}-c{client}")
+        for key, (row, chunks) in client_repetitions(client_run).items():
+            summaries, samples = repetitions.setdefault(key, ([], []))
+            summaries.append(row)
+            samples.extend(chunks)
+
+    rows = []
+    for (task_id, repetition), (summaries, samples) in repetitions.items():
+        task_rows = pd.DataFrame(summaries)
+        task_samples = np.concatenate(samples or [np.empty(0)])
+        total_time = task_rows['Total Time (sec)'].max()
+        row = {
+            'Task-ID': task_id,
+            'async / sync': task_rows['async / sync'].iloc[0],
+            'intended load (ops/s)': task_rows['intended load (ops/s)'].sum(),
+            'thread num': task_rows['thread num'].iloc[0],
+            'runtime': task_rows['runtime'].iloc[0],
+            'req size [B]': task_rows['req size [B]'].iloc[0],
+            'Total Time (sec)': total_time,
+        }
+
+        if task_samples.size == 0:
+            print(f"Repetition {repetition + 1} of task {task_id} of {run} has no samples, percentiles left empty")
+            row['Tput (ops/sec)'] = task_rows['Tput (ops/sec)'].sum()
+            rows.append(row)
+            continue
+
+        row['Tput (ops/sec)'] = task_samples.size / total_time
+        row['Resp. Time (ms)'] = task_samples.mean()
+        for column, p in PERCENTILES.items():
+            row[column] = np.percentile(task_samples, p, method="inverted_cdf")
+        rows.append(row)
+
+    return pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+
+
+def aggregate_experiment(experiment_dir: str, force: bool = False) -> List[str]:
+    """
+    Writes a combined `<run>-summary.csv` for every multi client run of an experiment.
+
+    :return: Paths of the written summaries.
+    """
+    result_dir = os.path.join(experiment_dir, ExperimentResult)
+    written = []
+    for run, clients in sorted(find_client_runs(result_dir).items()):
+        output_file = os.path.join(result_dir, run + SUMMARY)
+        if os.path.exists(output_file) and not force:
+            continue
+
+        try:
+            summary = aggregate_run(result_dir, run, clients)
+        except (OSError, ValueError) as e:
+            print(f"Couldn't aggregate {run}: {e}")
+            continue
+
+        summary.to_csv(output_file, index=False, float_format="%.3f")
+        print(f"Combined summary of {len(clients)} clients saved to {output_file}")
+        written.append(output_file)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge the results of multi client runs into one summary per run.")
+
+    parser.add_argument('-f', action='store_true', help="Overwrite existing combined summaries.")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+
+    experiment_dirs = []
+    for directory in args.directories:
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            continue
+        experiment_dirs.extend(find_experiment_dirs(directory))
+
+    if len(experiment_dirs) == 0:
+        print("No experiment results found")
+        sys.exit(1)
+
+    for experiment_dir in experiment_dirs:
+        aggregate_experiment(experiment_dir, force=args.f)
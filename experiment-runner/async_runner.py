@@ -0,0 +1,200 @@
+import asyncio
+import datetime
+import os
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from colorama import Fore, init
+
+from readiness import PROBE_INTERVAL, READY_TIMEOUT, wait_for_cluster
+from scheduler import TASK_ATTEMPTS, WorkerSlot
+from task_index import TaskIndexRecorder
+
+init(autoreset=True)  # Ensure automatic color reset
+
+
+async def stream_output(name: str, stream: asyncio.StreamReader):
+    """Prints every line of `stream` prefixed with the name of the process."""
+    while True:
+        line = await stream.readline()
+        if not line:
+            break
+        print(f"[{name}] {line.decode(errors='replace').rstrip()}")
+
+
+async def run_process(name: str, command: List[str], cwd: str, env: Optional[Dict[str, str]] = None) -> int:
+    """
+    Runs a process, streams its output and returns its exit code as soon as it exits.
+    The process is killed if the supervising task is cancelled.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        cwd=cwd,
+        env=env,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    try:
+        await stream_output(name, process.stdout)
+        return await process.wait()
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+
+async def compose(compose_file: str, *args: str) -> None:
+    return_code = await run_process("compose", ["docker", "compose", "-f", compose_file, *args], os.path.dirname(compose_file))
+    if return_code != 0:
+        raise RuntimeError(f"docker compose {' '.join(args)} failed with {return_code}")
+
+
+async def tcp_reachable(host: str, port: int) -> bool:
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=PROBE_INTERVAL * 2)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+def fault_script_env() -> Dict[str, str]:
+    """
+    Environment of the fault scripts. The scripts in `interupts/` import the
+    runner's modules (docker_api, event_log), so its folder is put on the PYTHONPATH.
+    """
+    runner_dir = os.path.dirname(os.path.abspath(__file__))
+    python_path = os.environ.get("PYTHONPATH")
+    return {**os.environ, "PYTHONPATH": runner_dir + (os.pathsep + python_path if python_path else "")}
+
+
+def zookeeper_endpoints(zk: str):
+    """Splits a ZooKeeper connection string into (host, port) pairs."""
+    endpoints = []
+    for server in zk.split("/", 1)[0].split(","):
+        host, _, port = server.strip().partition(":")
+        endpoints.append((host, int(port or 2181)))
+    return endpoints
+
+
+async def wait_until_ready(zk: str, expected_bookies: Optional[int] = None, timeout: float = READY_TIMEOUT) -> bool:
+    """
+    Polls the ZooKeeper servers until all of them accept connections, then
+    waits until the expected number of bookies registered as available.
+
+    :return: False if the cluster was not usable within `timeout` seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        reachable = await asyncio.gather(*(tcp_reachable(host, port) for host, port in zookeeper_endpoints(zk)))
+        if all(reachable):
+            break
+        if loop.time() >= deadline:
+            print(Fore.RED + f"Cluster {zk} not ready after {timeout}s")
+            return False
+        await asyncio.sleep(PROBE_INTERVAL)
+
+    return await asyncio.to_thread(wait_for_cluster, zk, expected_bookies, max(0.0, deadline - loop.time()))
+
+
+async def run_task(
+    task: Any,
+    time: datetime.datetime,
+    zk: str,
+    experiment_dir: str,
+    slots: List[WorkerSlot],
+    task_indexes: List[TaskIndexRecorder],
+    fault_scripts: List[str],
+    expected_bookies: Optional[int] = None,
+) -> bool:
+    """
+    Runs one task with all of its clients and the fault injection scripts
+    concurrently. As soon as one client exits with an error the others are
+    killed, and the attempt is retried once the cluster is reachable again
+    instead of after a fixed pause.
+    """
+    name = os.path.basename(experiment_dir)
+    clients = len(task_indexes)
+    for attempt in range(TASK_ATTEMPTS):
+        print(f"Running task {task.task_id} (attempt {attempt + 1})")
+        for task_index in task_indexes:
+            task_index.begin()
+
+        fault_tasks = [
+            asyncio.create_task(run_process(os.path.basename(script), [sys.executable, script], experiment_dir, fault_script_env()))
+            for script in fault_scripts
+        ]
+        client_tasks = [
+            asyncio.create_task(run_process(
+                f"client-{client}",
+                slots[client % len(slots)].wrap(task.command + task.build_args(time=time, zk=zk, name=name, client=client, clients=clients), experiment_dir),
+                experiment_dir,
+            ))
+            for client in range(clients)
+        ]
+        succeeded = True
+        try:
+            pending = set(client_tasks)
+            while pending and succeeded:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for client_task in done:
+                    try:
+                        return_code = client_task.result()
+                    except OSError as e:
+                        print(Fore.RED + "Couldn't start benchmark")
+                        print(e)
+                        return_code = None
+                    if return_code != 0:
+                        succeeded = False
+        finally:
+            # the other clients would only add samples of an attempt that is discarded
+            for client_task in client_tasks:
+                client_task.cancel()
+            await asyncio.gather(*client_tasks, return_exceptions=True)
+            for fault_task in fault_tasks:
+                fault_task.cancel()
+            await asyncio.gather(*fault_tasks, return_exceptions=True)
+
+        if succeeded:
+            for task_index in task_indexes:
+                task_index.end(task.task_id)
+            return True
+
+        if not await wait_until_ready(zk, expected_bookies):
+            print(Fore.RED + f"Cluster not ready, giving up task {task.task_id}")
+            return False
+        print(Fore.GREEN + "Retrying")
+    return False
+
+
+async def run_experiments(
+    experiment_dirs: List[str],
+    run_experiment: Callable[[str, List[WorkerSlot]], Awaitable[None]],
+    slots: List[WorkerSlot],
+    client_count: Callable[[str], int],
+) -> None:
+    """
+    Runs experiments concurrently, each one as soon as enough worker slots are free.
+    """
+    free = list(slots)
+    condition = asyncio.Condition()
+
+    async def run(experiment_dir: str):
+        count = max(1, min(client_count(experiment_dir), len(slots)))
+        async with condition:
+            await condition.wait_for(lambda: len(free) >= count)
+            acquired = [free.pop(0) for _ in range(count)]
+        try:
+            print(Fore.GREEN + f"Running {experiment_dir} on {[slot.name for slot in acquired]}")
+            await run_experiment(experiment_dir, acquired)
+        finally:
+            async with condition:
+                free.extend(acquired)
+                condition.notify_all()
+
+    await asyncio.gather(*(run(experiment_dir) for experiment_dir in experiment_dirs))
@@ -0,0 +1,80 @@
+import json
+import os
+from typing import Dict, List, Tuple
+
+ExperimentResult = "ExperimentResult"
+BENCHMARK = "benchmark.yml"
+CACHE_FILE = ".build-cache.json"
+
+# result files whose changes invalidate the outputs built from an experiment
+INPUT_SUFFIXES = ("-summary.csv", "-latencies.csv", "-latencies.bin", "-tasks.csv", "-timeseries.csv", "-faults.jsonl", "events.jsonl")
+
+
+def fingerprint(paths: List[str]) -> Dict[str, Tuple[int, int]]:
+    """Returns modification time (ns) and size of every existing file of `paths`."""
+    fingerprints = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        fingerprints[os.path.basename(path)] = (stat.st_mtime_ns, stat.st_size)
+    return fingerprints
+
+
+def experiment_inputs(experiment_dir: str) -> List[str]:
+    """Returns the benchmark.yml and all result files of an experiment."""
+    inputs = [os.path.join(experiment_dir, BENCHMARK)]
+    result_dir = os.path.join(experiment_dir, ExperimentResult)
+    if os.path.isdir(result_dir):
+        files = sorted(file for file in os.listdir(result_dir) if file.endswith(INPUT_SUFFIXES))
+        inputs.extend(os.path.join(result_dir, file) for file in files)
+    return inputs
+
+
+class BuildCache:
+    """
+    Remembers from which inputs the outputs of an experiment were built.
+
+    Every target (e.g. the summary plot) stores the fingerprint of the
+    experiment's inputs at the time it was built. A target is fresh as long
+    as no input was added, removed or modified and all of its outputs exist,
+    so unchanged experiments can be skipped on the next run.
+    """
+
+    def __init__(self, experiment_dir: str):
+        self.experiment_dir = experiment_dir
+        self.path = os.path.join(experiment_dir, CACHE_FILE)
+        self._entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as file:
+                    self._entries = json.load(file)
+            except (OSError, ValueError):
+                # a broken cache only costs a rebuild
+                self._entries = {}
+
+    def _current(self, key: str) -> Dict:
+        return {
+            "key": key,
+            "inputs": {name: list(value) for name, value in fingerprint(experiment_inputs(self.experiment_dir)).items()},
+        }
+
+    def is_fresh(self, target: str, outputs: List[str], key: str = "") -> bool:
+        """
+        :param target: Name of the built artifact, e.g. "plot".
+        :param outputs: Files the target produces, all of them have to exist.
+        :param key: Additional parameters the target was built with.
+        """
+        entry = self._entries.get(target)
+        if entry is None or not all(os.path.exists(output) for output in outputs):
+            return False
+        return entry == self._current(key)
+
+    def update(self, target: str, key: str = "") -> None:
+        """Stores the current inputs of the experiment as the inputs of `target`."""
+        self._entries[target] = self._current(key)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self._entries, file, indent=2)
+        os.replace(tmp_path, self.path)
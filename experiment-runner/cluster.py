@@ -0,0 +1,159 @@
+import hashlib
+import os
+import threading
+from typing import Callable, Optional
+
+from colorama import Fore, init
+from kazoo.client import KazooClient
+
+from readiness import CONNECT_TIMEOUT
+from zookeeper import reset_cluster_state
+
+init(autoreset=True)  # Ensure automatic color reset
+
+COMPOSE_FILE = "docker-compose.yml"
+
+
+def find_compose_file(experiment_dir: str) -> str:
+    """
+    Returns the docker-compose.yml of an experiment, the one of its campaign
+    directory if the experiment has none (e.g. experiments of a sweep).
+    """
+    compose_file = os.path.join(experiment_dir, COMPOSE_FILE)
+    if os.path.exists(compose_file):
+        return compose_file
+    campaign_compose_file = os.path.join(os.path.dirname(os.path.abspath(experiment_dir)), COMPOSE_FILE)
+    if os.path.exists(campaign_compose_file):
+        return campaign_compose_file
+    return compose_file
+
+
+def compose_fingerprint(compose_file: str) -> Optional[str]:
+    """Hash of the compose file's content, None if it does not exist."""
+    try:
+        with open(compose_file, "rb") as file:
+            return hashlib.sha256(file.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def reset_ledgers(zk: str) -> int:
+    """
+    Deletes the ledgers of earlier runs through ZooKeeper.
+
+    :return: The number of deleted znodes.
+    :raises RuntimeError: If no writable bookie is registered, the cluster has to be restarted.
+    """
+    zk_client = KazooClient(hosts=zk)
+    zk_client.start(timeout=CONNECT_TIMEOUT)
+    try:
+        result = reset_cluster_state(zk_client)
+        print(Fore.GREEN + f"Deleted {result.deleted} znodes in {result.seconds * 1000:.0f} ms, {len(result.bookies)} bookies available")
+        if len(result.bookies) == 0:
+            raise RuntimeError("no writable bookies registered")
+        return result.deleted
+    finally:
+        zk_client.stop()
+        zk_client.close()
+
+
+class ClusterManager:
+    """
+    Keeps one docker compose cluster up across repetitions and experiments.
+
+    Experiments whose compose files have the same content share the running
+    cluster, its ledgers are deleted before a run starts on an idle cluster
+    instead of tearing it down. The cluster is only restarted if the compose
+    file changed or a run failed, and stopped by `shutdown`.
+    """
+
+    def __init__(
+        self,
+        zk: str,
+        start: Callable[[str], object],
+        stop: Callable[[str], object],
+        reset: Callable[[str], int] = reset_ledgers,
+    ):
+        """
+        :param start: Brings the cluster of a compose file up, e.g. `docker compose up -d`.
+        :param stop: Tears the cluster of a compose file down.
+        :param reset: Clears the state earlier runs left in the cluster.
+        """
+        self.zk = zk
+        self._start = start
+        self._stop = stop
+        self._reset = reset
+        self.compose_file = None
+        self._fingerprint = None
+        self._dirty = False
+        self._users = 0
+        # reentrant, the kill handler may shut down while a thread holds the lock
+        self._condition = threading.Condition(threading.RLock())
+
+    def acquire(self, compose_file: str) -> None:
+        """
+        Blocks until a cluster of `compose_file` is up for the caller.
+
+        Joins a running identical cluster, otherwise waits until the running
+        one is idle and then either resets or restarts it.
+        """
+        fingerprint = compose_fingerprint(compose_file)
+        with self._condition:
+            self._condition.wait_for(lambda: self._available(fingerprint))
+            self._take(compose_file, fingerprint)
+
+    def try_acquire(self, compose_file: str) -> bool:
+        """Like `acquire` but returns False instead of waiting for other runs."""
+        fingerprint = compose_fingerprint(compose_file)
+        with self._condition:
+            if not self._available(fingerprint):
+                return False
+            self._take(compose_file, fingerprint)
+            return True
+
+    def release(self, failed: bool = False) -> None:
+        """
+        :param failed: The run failed, the cluster is restarted before it is used again.
+        """
+        with self._condition:
+            self._users -= 1
+            self._dirty = self._dirty or failed
+            self._condition.notify_all()
+
+    def shutdown(self) -> None:
+        with self._condition:
+            if self.compose_file is not None:
+                compose_file, self.compose_file, self._fingerprint = self.compose_file, None, None
+                self._stop(compose_file)
+            self._condition.notify_all()
+
+    def _available(self, fingerprint: Optional[str]) -> bool:
+        return self._users == 0 or self._matches(fingerprint)
+
+    def _take(self, compose_file: str, fingerprint: Optional[str]) -> None:
+        if self._users == 0:
+            if self._matches(fingerprint):
+                self._reset_or_restart(compose_file)
+            else:
+                self._restart(compose_file, fingerprint)
+        self._users += 1
+
+    def _matches(self, fingerprint: Optional[str]) -> bool:
+        return self.compose_file is not None and not self._dirty and self._fingerprint == fingerprint
+
+    def _reset_or_restart(self, compose_file: str) -> None:
+        try:
+            deleted = self._reset(self.zk)
+            print(Fore.GREEN + f"Reusing cluster of {compose_file}, deleted {deleted} znodes")
+        except Exception as e:
+            print(Fore.YELLOW + f"Couldn't reset cluster ({e}), restarting it")
+            self._restart(compose_file, compose_fingerprint(compose_file))
+
+    def _restart(self, compose_file: str, fingerprint: Optional[str]) -> None:
+        if self.compose_file is not None:
+            running, self.compose_file = self.compose_file, None
+            self._stop(running)
+        self._start(compose_file)
+        self.compose_file = compose_file
+        self._fingerprint = fingerprint
+        self._dirty = False
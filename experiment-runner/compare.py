@@ -0,0 +1,356 @@
+import argparse
+import math
+import os
+import sys
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from colorama import Fore, init
+from pydantic import BaseModel, ValidationError
+
+from confidence import BOOTSTRAP_SEED, find_runs, bootstrap_percentile_values
+from coordinated_omission import task_settings
+from latencies import PERCENTILES, LatencyHistogram, find_experiment_dirs, find_task_boundaries, iter_task_chunks
+from latency_store import BENCHMARK, is_up_to_date, store_path
+from plot import get_task_parameters
+from result_index import open_index
+from summerize_csv import SummaryData
+
+init(autoreset=True)  # Ensure automatic color reset
+
+# a task regressed if a gated percentile grew (or throughput dropped) by more
+# than THRESHOLD and the lower bound of the one sided 1 - ALPHA bootstrap
+# interval of the percentile change is above zero
+THRESHOLD = 0.10
+ALPHA = 0.01
+GATED_PERCENTILES = [99.0]
+# every repetition of a task is cut into this many consecutive blocks, the
+# bootstrap resamples blocks
+BLOCKS_PER_REPETITION = 10
+
+# tasks are matched across result sets by these parameters
+MATCH_KEY = ['mode', 'num_threads', 'payload_size', 'throughput', 'latency_correction']
+
+# percentiles of the generator's summary by their SummaryData field
+SUMMARY_PERCENTILES = {
+    50.0: 'percentile_50',
+    95.0: 'percentile_95',
+    99.0: 'percentile_99',
+    99.9: 'percentile_999',
+}
+
+
+class TaskResults(BaseModel):
+    """Results of all runs of one task configuration in a result set."""
+    experiments: List[str]
+    summaries: List[SummaryData]
+    # sorted pooled latencies, None if a run has no task index
+    samples: Optional[Any] = None
+    # consecutive latency blocks of every repetition, resampled by the bootstrap
+    blocks: Optional[List[Any]] = None
+
+
+def percentile(sorted_samples: np.ndarray, p: float) -> float:
+    """The value below or equal to which `p` percent of the samples fall, like `LatencyHistogram.percentile`."""
+    if sorted_samples.size == 0:
+        return math.nan
+    rank = max(1, int(math.ceil(p / 100.0 * sorted_samples.size)))
+    return float(sorted_samples[rank - 1])
+
+
+def mann_whitney(baseline: np.ndarray, candidate: np.ndarray) -> Tuple[float, float]:
+    """
+    One sided Mann-Whitney U test whether candidate latencies tend to be
+    larger than baseline latencies, normal approximation with tie correction.
+
+    Both arrays are ranked together once, tied values (latencies are often
+    whole milliseconds) get their average rank.
+
+    :return: The probability that a candidate sample exceeds a baseline
+             sample (0.5 for equal distributions) and the p-value.
+    """
+    n1, n2 = baseline.size, candidate.size
+    if n1 == 0 or n2 == 0:
+        return math.nan, math.nan
+
+    _, inverse, counts = np.unique(np.concatenate((baseline, candidate)), return_inverse=True, return_counts=True)
+    # average rank of every distinct value
+    ranks = np.cumsum(counts) - (counts - 1) / 2.0
+    u = ranks[inverse[n1:]].sum() - n2 * (n2 + 1) / 2.0
+
+    n = n1 + n2
+    ties = float(np.sum(counts.astype(np.float64) ** 3 - counts))
+    variance = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1))) if n > 1 else 0.0
+    effect = u / (n1 * n2)
+    if variance <= 0:
+        return effect, 1.0
+    z = (u - n1 * n2 / 2.0 - 0.5) / math.sqrt(variance)
+    return effect, 1.0 - NormalDist().cdf(z)
+
+
+def ks_distance(baseline: np.ndarray, candidate: np.ndarray) -> float:
+    """Largest distance between the empirical CDFs of the two sorted sample sets."""
+    if baseline.size == 0 or candidate.size == 0:
+        return math.nan
+    values = np.concatenate((baseline, candidate))
+    cdf_baseline = np.searchsorted(baseline, values, side='right') / baseline.size
+    cdf_candidate = np.searchsorted(candidate, values, side='right') / candidate.size
+    return float(np.max(np.abs(cdf_baseline - cdf_candidate)))
+
+
+def task_blocks(experiment_dir: str, task_id: int, newest_only: bool = False) -> Optional[List[np.ndarray]]:
+    """
+    The raw samples of a task over all runs and clients of an experiment, every
+    repetition of every client cut into `BLOCKS_PER_REPETITION` consecutive blocks.
+
+    :return: None if a run has no task index, its samples can't be assigned to tasks.
+    """
+    runs = sorted(find_runs(experiment_dir).items(), reverse=True)
+    if newest_only:
+        runs = runs[:1]
+
+    blocks = []
+    for _, latencies_paths in runs:
+        for latencies_path in latencies_paths:
+            path = store_path(latencies_path) if is_up_to_date(latencies_path) else latencies_path
+            if not os.path.exists(path):
+                continue
+            boundaries = find_task_boundaries(path)
+            if boundaries is None:
+                return None
+            for boundary in boundaries:
+                if boundary.task_id != task_id:
+                    continue
+                chunks = list(iter_task_chunks(path, boundary))
+                if len(chunks) == 0:
+                    continue
+                repetition = np.concatenate(chunks).astype(np.float64)
+                blocks.extend(block for block in np.array_split(repetition, BLOCKS_PER_REPETITION) if block.size > 0)
+    if len(blocks) == 0:
+        return None
+    return blocks
+
+
+def collect_tasks(directories: List[str], newest_only: bool = False) -> Dict[Tuple, TaskResults]:
+    """
+    Groups the results of every non warmup task below `directories` by the
+    task parameters of `MATCH_KEY`, tasks of several experiments with the
+    same parameters are pooled.
+    """
+    experiment_dirs = []
+    for directory in directories:
+        experiment_dirs.extend(os.path.abspath(experiment_dir) for experiment_dir in find_experiment_dirs(directory))
+    experiment_dirs = [experiment_dir for experiment_dir in experiment_dirs if os.path.exists(os.path.join(experiment_dir, BENCHMARK))]
+    if len(experiment_dirs) == 0:
+        return {}
+
+    tasks: Dict[Tuple, TaskResults] = {}
+    blocks: Dict[Tuple, List[Optional[List[np.ndarray]]]] = {}
+    with open_index(experiment_dirs) as index:
+        for experiment_dir in experiment_dirs:
+            parameters = get_task_parameters(experiment_dir)
+            settings = task_settings(experiment_dir)
+            runs = index.runs(experiment_dir)
+            if newest_only:
+                runs = runs[:1]
+            summaries = pd.concat([index.summary(experiment_dir, run) for run in runs]) if len(runs) else pd.DataFrame()
+
+            for _, task in parameters.iterrows():
+                task_id = int(task['task_id'])
+                key = (task['mode'], int(task['num_threads']), int(task['payload_size']), int(task['throughput']), bool(settings[task_id].get('latency_correction', True)))
+                rows = summaries[summaries['Task-ID'] == task_id] if not summaries.empty else summaries
+                if rows.empty:
+                    continue
+
+                results = tasks.setdefault(key, TaskResults(experiments=[], summaries=[]))
+                results.experiments.append(os.path.basename(experiment_dir))
+                for _, row in rows.iterrows():
+                    try:
+                        results.summaries.append(SummaryData(
+                            total_time=row['Total Time (sec)'],
+                            average_throughput=row['Tput (ops/sec)'],
+                            average_response_time=row['Resp. Time (ms)'],
+                            percentile_50=row['50th p (ms)'],
+                            percentile_95=row['95th p (ms)'],
+                            percentile_99=row['99th p (ms)'],
+                            percentile_999=row['999th p (ms)'],
+                        ))
+                    except ValidationError:
+                        print(Fore.YELLOW + f"{os.path.basename(experiment_dir)} task {task_id}: invalid summary row skipped")
+                blocks.setdefault(key, []).append(task_blocks(experiment_dir, task_id, newest_only))
+
+    for key, results in tasks.items():
+        # raw samples only if every pooled experiment has them
+        if all(experiment_blocks is not None for experiment_blocks in blocks[key]):
+            results.blocks = [block for experiment_blocks in blocks[key] for block in experiment_blocks]
+            results.samples = np.sort(np.concatenate(results.blocks))
+    return tasks
+
+
+def block_histograms(blocks: List[np.ndarray]) -> List[LatencyHistogram]:
+    histograms = []
+    for block in blocks:
+        histogram = LatencyHistogram()
+        histogram.record(block)
+        histograms.append(histogram)
+    return histograms
+
+
+def percentile_change_interval(baseline: List[LatencyHistogram], candidate: List[LatencyHistogram], p: float, alpha: float = ALPHA, rng: Optional[np.random.Generator] = None) -> Tuple[float, float]:
+    """
+    One sided bootstrap interval of the relative change of a percentile,
+    both sides are resampled independently by whole blocks.
+
+    Blocks keep the samples of a stretch of a run together: samples within a
+    run are correlated (queues build up and drain), resampling single
+    samples would make the interval too narrow.
+
+    :return: The lower bound of the 1 - `alpha` interval and the share of resamples
+             in which the candidate percentile is not above the baseline one,
+             NaN if a side has fewer than two blocks.
+    """
+    _, baseline_values = bootstrap_percentile_values(baseline, p, rng=rng)
+    _, candidate_values = bootstrap_percentile_values(candidate, p, rng=rng)
+    if baseline_values.size == 0 or candidate_values.size == 0:
+        return math.nan, math.nan
+    changes = candidate_values / baseline_values - 1
+    return float(np.quantile(changes, alpha)), float(np.mean(changes <= 0))
+
+
+def compare_task(baseline: TaskResults, candidate: TaskResults, percentiles: List[float], threshold: float = THRESHOLD, alpha: float = ALPHA) -> Dict:
+    """
+    Compares one task configuration of two result sets.
+
+    With raw samples of both sides the percentiles are read from the pooled
+    samples and every gated percentile is tested itself: a bootstrap over
+    blocks of the runs gives a one sided interval of its change, the change
+    is significant if the lower bound is above zero. Otherwise the
+    percentiles are the means of the summaries and no test is possible.
+
+    The Mann-Whitney U test and the Kolmogorov-Smirnov distance are only
+    reported, they detect shifts of the whole distribution and miss a tail
+    that grew while the median stayed put.
+    """
+    row = {
+        'baseline experiments': ", ".join(baseline.experiments),
+        'candidate experiments': ", ".join(candidate.experiments),
+        'baseline runs': len(baseline.summaries),
+        'candidate runs': len(candidate.summaries),
+    }
+
+    baseline_tput = np.mean([summary.average_throughput for summary in baseline.summaries])
+    candidate_tput = np.mean([summary.average_throughput for summary in candidate.summaries])
+    row['baseline Tput (ops/sec)'] = baseline_tput
+    row['candidate Tput (ops/sec)'] = candidate_tput
+    row['Tput change'] = candidate_tput / baseline_tput - 1
+    regressions = ['throughput'] if row['Tput change'] < -threshold else []
+
+    raw = baseline.samples is not None and candidate.samples is not None
+    row['source'] = 'raw samples' if raw else 'summaries'
+    if raw:
+        baseline_samples = baseline.samples
+        candidate_samples = candidate.samples
+        row['baseline samples'] = baseline_samples.size
+        row['candidate samples'] = candidate_samples.size
+        row['P(candidate > baseline)'], row['p-value'] = mann_whitney(baseline_samples, candidate_samples)
+        row['KS distance'] = ks_distance(baseline_samples, candidate_samples)
+        baseline_histograms = block_histograms(baseline.blocks)
+        candidate_histograms = block_histograms(candidate.blocks)
+        rng = np.random.default_rng(BOOTSTRAP_SEED)
+
+    for column, p in PERCENTILES.items():
+        if raw:
+            baseline_value = percentile(baseline_samples, p)
+            candidate_value = percentile(candidate_samples, p)
+        else:
+            field = SUMMARY_PERCENTILES[p]
+            baseline_value = np.mean([getattr(summary, field) for summary in baseline.summaries])
+            candidate_value = np.mean([getattr(summary, field) for summary in candidate.summaries])
+        change = candidate_value / baseline_value - 1
+        row[f'baseline {column}'] = baseline_value
+        row[f'candidate {column}'] = candidate_value
+        row[f'{column} change'] = change
+
+        significant = True
+        if raw and p in percentiles:
+            low, p_value = percentile_change_interval(baseline_histograms, candidate_histograms, p, alpha, rng)
+            row[f'{column} change ci low'] = low
+            row[f'{column} p-value'] = p_value
+            significant = low > 0
+        if p in percentiles and change > threshold and significant:
+            regressions.append(column)
+
+    row['regression'] = ", ".join(regressions)
+    return row
+
+
+def compare(baseline_dirs: List[str], candidate_dirs: List[str], percentiles: List[float], threshold: float = THRESHOLD, alpha: float = ALPHA, newest_only: bool = False) -> pd.DataFrame:
+    """
+    Compares every task configuration present in both result sets.
+
+    :return: One row per matched configuration, tasks only present on one side are listed without comparison.
+    """
+    baseline = collect_tasks(baseline_dirs, newest_only)
+    candidate = collect_tasks(candidate_dirs, newest_only)
+
+    rows = []
+    for key in sorted(set(baseline) | set(candidate)):
+        row = dict(zip(MATCH_KEY, key))
+        if key not in baseline or key not in candidate:
+            row['regression'] = ""
+            row['source'] = "only in " + ("baseline" if key in baseline else "candidate")
+        else:
+            row.update(compare_task(baseline[key], candidate[key], percentiles, threshold, alpha))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the tasks of two result sets and exit non-zero on regressions.")
+
+    parser.add_argument('-t', type=float, default=THRESHOLD, help="Relative change that counts as regression, e.g. 0.1 for +10%% latency or -10%% throughput.")
+    parser.add_argument('-a', type=float, default=ALPHA, help="Significance level of the gated percentile changes.")
+    parser.add_argument('-p', type=float, action='append', default=None, help=f"Gated percentile, repeatable, one of {', '.join(f'{p:g}' for p in PERCENTILES.values())}. Default {GATED_PERCENTILES[0]:g}.")
+    parser.add_argument('-n', action='store_true', help="Only use the newest run of every experiment.")
+    parser.add_argument('-o', type=str, default=None, help="Optional csv file the comparison is written to.")
+    parser.add_argument('baseline', help="Baseline experiment, campaign or experiments root directory.")
+    parser.add_argument('candidate', help="Candidate experiment, campaign or experiments root directory.")
+
+    args = parser.parse_args()
+
+    for directory in (args.baseline, args.candidate):
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            sys.exit(1)
+
+    percentiles = args.p or GATED_PERCENTILES
+    unknown = [p for p in percentiles if p not in PERCENTILES.values()]
+    if unknown:
+        print(f"Error: percentiles {unknown} are not recorded, use {list(PERCENTILES.values())}")
+        sys.exit(1)
+
+    table = compare([args.baseline], [args.candidate], percentiles, args.t, args.a, args.n)
+    matched = table[~table['source'].str.startswith("only in")] if not table.empty else table
+    if matched.empty:
+        print("No tasks with matching parameters found")
+        sys.exit(1)
+
+    gated_columns = [column for column, p in PERCENTILES.items() if p in percentiles]
+    columns = [*MATCH_KEY, 'source', 'Tput change', *[f'{column} change' for column in PERCENTILES], *[f'{column} change ci low' for column in gated_columns], 'regression']
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 250):
+        print(table[[column for column in columns if column in table.columns]].round(4).to_string(index=False))
+
+    if args.o is not None:
+        table.to_csv(args.o, index=False)
+        print(f"Comparison saved to {args.o}")
+
+    regressions = matched[matched['regression'] != ""]
+    unmatched = len(table) - len(matched)
+    if unmatched:
+        print(Fore.YELLOW + f"{unmatched} task configurations only exist in one result set")
+    if len(regressions) > 0:
+        print(Fore.RED + f"{len(regressions)} of {len(matched)} task configurations regressed by more than {args.t:.0%}")
+        sys.exit(1)
+    print(Fore.GREEN + f"No regressions in {len(matched)} task configurations")
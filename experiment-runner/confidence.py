@@ -0,0 +1,304 @@
+import argparse
+import math
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+
+from latencies import PERCENTILES, LatencyHistogram, find_experiment_dirs, find_task_boundaries, iter_task_chunks
+from latency_store import LATENCIES, ExperimentResult
+from summerize_csv import CLIENT_SUMMARY, SUMMARY
+
+CONFIDENCE = 0.95
+BOOTSTRAP_RESAMPLES = 2000
+# relative half width of the confidence interval a run should reach, e.g. p99 within ±5%
+TARGET_WIDTH = 0.05
+MIN_REPETITIONS = 3
+# fixed so repeated analyses of the same results report the same intervals
+BOOTSTRAP_SEED = 0
+STATISTICS = "-statistics.csv"
+
+THROUGHPUT = 'Tput (ops/sec)'
+RESPONSE_TIME = 'Resp. Time (ms)'
+
+
+class ConfidenceInterval(BaseModel):
+    estimate: float
+    low: float
+    high: float
+    repetitions: int
+
+    @property
+    def relative_half_width(self) -> float:
+        if self.repetitions < 2 or not self.estimate:
+            return math.nan
+        return (self.high - self.low) / 2 / abs(self.estimate)
+
+
+def bootstrap_mean(values: np.ndarray, confidence: float = CONFIDENCE, resamples: int = BOOTSTRAP_RESAMPLES, rng: Optional[np.random.Generator] = None) -> ConfidenceInterval:
+    """
+    Percentile bootstrap interval of the mean of per repetition values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return ConfidenceInterval(estimate=math.nan, low=math.nan, high=math.nan, repetitions=0)
+    if values.size == 1:
+        return ConfidenceInterval(estimate=values[0], low=math.nan, high=math.nan, repetitions=1)
+
+    rng = rng or np.random.default_rng(BOOTSTRAP_SEED)
+    means = values[rng.integers(0, values.size, size=(resamples, values.size))].mean(axis=1)
+    alpha = (1 - confidence) / 2
+    return ConfidenceInterval(
+        estimate=values.mean(),
+        low=np.quantile(means, alpha),
+        high=np.quantile(means, 1 - alpha),
+        repetitions=values.size,
+    )
+
+
+def bootstrap_percentile_values(histograms: List[LatencyHistogram], p: float, resamples: int = BOOTSTRAP_RESAMPLES, rng: Optional[np.random.Generator] = None) -> Tuple[float, np.ndarray]:
+    """
+    Bootstrap distribution of a latency percentile of the pooled samples of
+    all histograms, every resample draws whole histograms with replacement.
+
+    Only buckets holding samples are kept, so a resample costs a few thousand
+    additions instead of one per sample.
+
+    :return: The percentile of all pooled histograms and the percentile of every resample,
+             an empty array for fewer than two histograms.
+    """
+    histograms = [histogram for histogram in histograms if histogram.count > 0]
+    if len(histograms) == 0:
+        return math.nan, np.empty(0)
+
+    pooled = LatencyHistogram(histograms[0].lowest, histograms[0].highest, histograms[0].precision)
+    for histogram in histograms:
+        pooled.merge(histogram)
+    estimate = pooled.percentile(p)
+    if len(histograms) == 1:
+        return estimate, np.empty(0)
+
+    counts = np.stack([histogram.counts for histogram in histograms])
+    buckets = np.flatnonzero(counts.sum(axis=0))
+    counts = counts[:, buckets]
+
+    rng = rng or np.random.default_rng(BOOTSTRAP_SEED)
+    picks = rng.integers(0, len(histograms), size=(resamples, len(histograms)))
+    multiplicity = np.stack([np.bincount(pick, minlength=len(histograms)) for pick in picks])
+    cumulative = np.cumsum(multiplicity @ counts, axis=1)
+
+    ranks = np.maximum(1, np.ceil(p / 100.0 * cumulative[:, -1]))
+    indices = buckets[(cumulative < ranks[:, None]).sum(axis=1)]
+    values = np.clip(pooled.lowest * np.exp((indices + 1) * pooled._log_base), pooled.min, pooled.max)
+    return estimate, values
+
+
+def bootstrap_percentile(histograms: List[LatencyHistogram], p: float, confidence: float = CONFIDENCE, resamples: int = BOOTSTRAP_RESAMPLES, rng: Optional[np.random.Generator] = None) -> ConfidenceInterval:
+    """
+    Percentile bootstrap interval of a latency percentile of the pooled
+    samples of all repetitions.
+
+    Whole repetitions are resampled: samples within a run are correlated
+    (queues build up and drain), so resampling single samples would hide the
+    run to run variation.
+    """
+    repetitions = sum(1 for histogram in histograms if histogram.count > 0)
+    estimate, values = bootstrap_percentile_values(histograms, p, resamples, rng)
+    if values.size == 0:
+        return ConfidenceInterval(estimate=estimate, low=math.nan, high=math.nan, repetitions=repetitions)
+
+    alpha = (1 - confidence) / 2
+    return ConfidenceInterval(
+        estimate=estimate,
+        low=np.quantile(values, alpha),
+        high=np.quantile(values, 1 - alpha),
+        repetitions=repetitions,
+    )
+
+
+def repetitions_needed(interval: ConfidenceInterval, target_width: float = TARGET_WIDTH) -> int:
+    """
+    Additional repetitions until the relative half width of `interval` drops
+    to `target_width`, assuming it shrinks with the square root of the
+    number of repetitions.
+    """
+    if interval.repetitions < MIN_REPETITIONS:
+        return MIN_REPETITIONS - interval.repetitions
+    width = interval.relative_half_width
+    if math.isnan(width) or width <= target_width:
+        return 0
+    return int(math.ceil(interval.repetitions * (width / target_width) ** 2)) - interval.repetitions
+
+
+def task_repetition_histograms(latencies_paths: List[str]) -> Dict[int, List[LatencyHistogram]]:
+    """
+    Records every repetition of every task of a run into its own histogram.
+
+    :param latencies_paths: Latencies of every client of the run, the n-th
+        occurrence of a task in every client's task index is its n-th repetition.
+    """
+    repetitions = {}
+    for latencies_path in latencies_paths:
+        boundaries = find_task_boundaries(latencies_path) if os.path.exists(latencies_path) else None
+        occurrences = {}
+        for boundary in boundaries or []:
+            repetition = occurrences.get(boundary.task_id, 0)
+            occurrences[boundary.task_id] = repetition + 1
+
+            histograms = repetitions.setdefault(boundary.task_id, [])
+            if repetition == len(histograms):
+                histograms.append(LatencyHistogram())
+            for chunk in iter_task_chunks(latencies_path, boundary):
+                histograms[repetition].record(chunk)
+    return repetitions
+
+
+def run_statistics(summary_path: str, latencies_paths: List[str], confidence: float = CONFIDENCE, target_width: float = TARGET_WIDTH) -> pd.DataFrame:
+    """
+    Confidence intervals of throughput, mean response time and every
+    percentile of every task of a run, with the repetitions still needed to
+    reach `target_width`.
+
+    Percentiles are bootstrapped from the raw samples if the run recorded a
+    task index, otherwise from the per repetition values of the summary.
+    """
+    summary = pd.read_csv(summary_path)
+    histograms = task_repetition_histograms(latencies_paths)
+    rng = np.random.default_rng(BOOTSTRAP_SEED)
+
+    rows = []
+    for task_id, task_rows in summary.groupby('Task-ID', sort=True):
+        intervals = {
+            THROUGHPUT: bootstrap_mean(task_rows[THROUGHPUT].to_numpy(), confidence, rng=rng),
+            RESPONSE_TIME: bootstrap_mean(task_rows[RESPONSE_TIME].to_numpy(), confidence, rng=rng),
+        }
+        for column, p in PERCENTILES.items():
+            if task_id in histograms:
+                intervals[column] = bootstrap_percentile(histograms[task_id], p, confidence, rng=rng)
+            else:
+                intervals[column] = bootstrap_mean(task_rows[column].to_numpy(), confidence, rng=rng)
+
+        for metric, interval in intervals.items():
+            rows.append({
+                'Task-ID': task_id,
+                'metric': metric,
+                'repetitions': interval.repetitions,
+                'estimate': interval.estimate,
+                'ci low': interval.low,
+                'ci high': interval.high,
+                'relative half width': interval.relative_half_width,
+                'more repetitions': repetitions_needed(interval, target_width),
+            })
+    return pd.DataFrame(rows)
+
+
+def additional_repetitions(summary_path: str, latencies_paths: List[str], target_width: float = TARGET_WIDTH, skip_task_ids=()) -> int:
+    """Repetitions a run still needs until every interval reaches `target_width`."""
+    if not os.path.exists(summary_path):
+        return 0
+    statistics = run_statistics(summary_path, latencies_paths, target_width=target_width)
+    statistics = statistics[~statistics['Task-ID'].isin(list(skip_task_ids))]
+    return int(statistics['more repetitions'].max()) if not statistics.empty else 0
+
+
+class RepetitionPlan:
+    """
+    Repetition indices of a run. Once the configured repetitions ran, more
+    are added until the confidence intervals of the run reach `target_width`
+    or `max_repetitions` is reached.
+    """
+
+    def __init__(
+        self,
+        repetitions: int,
+        summary_path: str,
+        latencies_paths: List[str],
+        target_width: Optional[float] = None,
+        max_repetitions: Optional[int] = None,
+        skip_task_ids=(),
+    ):
+        """
+        :param repetitions: Repetitions configured in the benchmark.yml.
+        :param target_width: Relative half width to reach, None only runs the configured repetitions.
+        :param skip_task_ids: Tasks whose intervals don't matter, e.g. the warmup.
+        """
+        self.repetitions = repetitions
+        self.summary_path = summary_path
+        self.latencies_paths = latencies_paths
+        self.target_width = target_width
+        self.max_repetitions = max_repetitions if max_repetitions is not None else 3 * max(repetitions, MIN_REPETITIONS)
+        self.skip_task_ids = skip_task_ids
+
+    def __iter__(self):
+        repetition = 0
+        while True:
+            if repetition >= self.repetitions:
+                if self.target_width is None:
+                    return
+                more = additional_repetitions(self.summary_path, self.latencies_paths, self.target_width, self.skip_task_ids)
+                more = min(more, self.max_repetitions - self.repetitions)
+                if more <= 0:
+                    return
+                print(f"Confidence intervals wider than ±{self.target_width:.0%}, running {more} more repetitions")
+                self.repetitions += more
+            yield repetition
+            repetition += 1
+
+
+def find_runs(experiment_dir: str) -> Dict[str, List[str]]:
+    """
+    Returns the latency files of every run of an experiment by its summary,
+    the files of all clients for multi client runs.
+    """
+    result_dir = os.path.join(experiment_dir, ExperimentResult)
+    if not os.path.isdir(result_dir):
+        return {}
+
+    files = sorted(os.listdir(result_dir))
+    runs = {}
+    for file in files:
+        if not file.endswith(SUMMARY) or CLIENT_SUMMARY.search(file):
+            continue
+        run = file[: -len(SUMMARY)]
+        client_files = [other for other in files if other.startswith(run + "-c") and other.endswith(LATENCIES)]
+        latencies = client_files or [run + LATENCIES]
+        runs[os.path.join(result_dir, file)] = [os.path.join(result_dir, latencies_file) for latencies_file in latencies]
+    return runs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals over the repetitions of every task.")
+
+    parser.add_argument('-n', action='store_true', help="Only use the newest run of every experiment.")
+    parser.add_argument('-c', type=float, default=CONFIDENCE, help="Confidence level of the intervals.")
+    parser.add_argument('-w', type=float, default=TARGET_WIDTH, help="Target relative half width of the intervals, e.g. 0.05 for ±5%%.")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+
+    experiment_dirs = []
+    for directory in args.directories:
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            continue
+        experiment_dirs.extend(find_experiment_dirs(directory))
+
+    if len(experiment_dirs) == 0:
+        print("No experiment results found")
+        sys.exit(1)
+
+    for experiment_dir in experiment_dirs:
+        runs = sorted(find_runs(experiment_dir).items(), reverse=True)
+        if args.n:
+            runs = runs[:1]
+        for summary_path, latencies_paths in runs:
+            statistics = run_statistics(summary_path, latencies_paths, confidence=args.c, target_width=args.w)
+            output_file = summary_path[: -len(SUMMARY)] + STATISTICS
+            statistics.to_csv(output_file, index=False, float_format="%.3f")
+
+            print(f"{os.path.basename(summary_path)}: {statistics['more repetitions'].max()} more repetitions for ±{args.w:.0%} at {args.c:.0%} confidence")
+            print(f"Statistics saved to {output_file}")
@@ -0,0 +1,219 @@
+import argparse
+import math
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from confidence import find_runs
+from latencies import PERCENTILES, LatencyHistogram, find_experiment_dirs, find_task_boundaries, iter_task_chunks
+from latency_store import BENCHMARK
+from scheduler import client_share
+
+CLIENT_LATENCIES = re.compile(r"-c(?P<client>\d+)-latencies\.csv$")
+
+# source buckets processed at once, bounds the (sources x buckets) matrices to a few MB
+CORRECTION_BLOCK = 128
+
+
+def expected_interval(throughput: float, num_threads: int) -> float:
+    """
+    Time (ms) between two requests of one generator thread at the intended
+    load, inf if the task has no rate limit.
+    """
+    if throughput <= 0:
+        return math.inf
+    return 1000.0 * max(1, num_threads) / throughput
+
+
+def correct_histogram(histogram: LatencyHistogram, interval: float) -> LatencyHistogram:
+    """
+    Rebuilds the latency distribution a generator without coordinated
+    omission would have seen, like HdrHistogram's recordValueWithExpectedInterval:
+    a sample of latency v that exceeds the expected interval I stalled the
+    requests that should have been sent meanwhile, they are added with the
+    latencies v - I, v - 2I, ... down to I.
+
+    The synthetic samples of every occupied bucket form an arithmetic
+    sequence, so they are counted per target bucket in closed form instead
+    of being recorded one by one.
+
+    :param interval: Expected interval between two requests of a thread (ms).
+    """
+    corrected = LatencyHistogram(histogram.lowest, histogram.highest, histogram.precision)
+    corrected.merge(histogram)
+    if histogram.count == 0 or not math.isfinite(interval) or interval <= 0:
+        return corrected
+
+    log_base = histogram._log_base
+    buckets = np.arange(histogram.counts.size)
+    lower = histogram.lowest * np.exp(buckets * log_base)
+    upper = histogram.lowest * np.exp((buckets + 1) * log_base)
+    # bucket centre, clipped to the recorded range
+    values = np.clip(np.sqrt(lower * upper), histogram.min, histogram.max)
+
+    sources = np.flatnonzero((histogram.counts > 0) & (values >= 2 * interval))
+    if sources.size == 0:
+        return corrected
+
+    targets = np.flatnonzero(upper > interval)
+    targets = targets[lower[targets] < values[sources].max()]
+    target_lower = np.maximum(lower[targets], interval)
+    target_upper = upper[targets]
+
+    added = np.zeros(targets.size, dtype=np.int64)
+    total = 0.0
+    for start in range(0, sources.size, CORRECTION_BLOCK):
+        block = sources[start:start + CORRECTION_BLOCK]
+        v = values[block][:, None]
+        counts = histogram.counts[block]
+
+        # k >= 1 with target_lower <= v - k * I < target_upper
+        k_max = np.floor((v - target_lower) / interval)
+        k_min = np.floor(np.maximum((v - target_upper) / interval, 0)) + 1
+        per_sample = np.maximum(0, k_max - k_min + 1).astype(np.int64)
+        added += counts @ per_sample
+
+        k = np.floor(values[block] / interval) - 1
+        total += float(np.sum(counts * (k * values[block] - interval * k * (k + 1) / 2)))
+
+    corrected.counts[targets] += added
+    corrected.count += int(added.sum())
+    corrected.total += total
+    corrected.min = min(corrected.min, interval)
+    return corrected
+
+
+def task_settings(experiment_dir: str) -> Dict[int, Dict]:
+    """Reads the tasks of an experiment's benchmark.yml by task id."""
+    with open(os.path.join(experiment_dir, BENCHMARK), "r") as file:
+        config_data = yaml.safe_load(file)
+    return {task["task_id"]: task for task in config_data["tasks"].values()}
+
+
+def client_count(experiment_dir: str) -> int:
+    with open(os.path.join(experiment_dir, BENCHMARK), "r") as file:
+        config_data = yaml.safe_load(file)
+    return int(((config_data.get("config") or {}).get("client") or {}).get("count") or 1)
+
+
+def interval_label(intervals: Set[float]):
+    """
+    The expected interval used to correct a task, "shortest-longest" if the
+    throughput did not split evenly over its clients.
+    """
+    if len(intervals) == 1:
+        return next(iter(intervals))
+    return f"{min(intervals):.3f}-{max(intervals):.3f}"
+
+
+def compare_run(experiment_dir: str, latencies_paths: List[str]) -> Optional[pd.DataFrame]:
+    """
+    Recorded and coordinated omission corrected percentiles of every task of a run.
+
+    The expected interval of every client follows from its share of the
+    task's `throughput` and `num_threads`, the reported one is the interval
+    the correction used.
+
+    :return: One row per task, None if the run has no task index.
+    """
+    tasks = task_settings(experiment_dir)
+    clients = client_count(experiment_dir)
+
+    recorded = {}
+    corrected = {}
+    intervals = {}
+    for latencies_path in latencies_paths:
+        boundaries = find_task_boundaries(latencies_path) if os.path.exists(latencies_path) else None
+        if boundaries is None:
+            continue
+        match = CLIENT_LATENCIES.search(latencies_path)
+        client = int(match.group("client")) if match else 0
+
+        for boundary in boundaries:
+            task = tasks.get(boundary.task_id)
+            if task is None:
+                continue
+            histogram = LatencyHistogram()
+            for chunk in iter_task_chunks(latencies_path, boundary):
+                histogram.record(chunk)
+
+            interval = expected_interval(client_share(task["throughput"], client, clients), task["num_threads"])
+            intervals.setdefault(boundary.task_id, set()).add(interval)
+            recorded.setdefault(boundary.task_id, LatencyHistogram()).merge(histogram)
+            corrected.setdefault(boundary.task_id, LatencyHistogram()).merge(correct_histogram(histogram, interval))
+
+    if len(recorded) == 0:
+        return None
+
+    rows = []
+    for task_id in sorted(recorded):
+        task = tasks[task_id]
+        row = {
+            'Task-ID': task_id,
+            'intended load (ops/s)': task["throughput"],
+            'thread num': task["num_threads"],
+            'expected interval (ms)': interval_label(intervals[task_id]),
+            # the generator's own correction, reconstructing on top of it counts stalls twice
+            'generator correction': task.get("latency_correction", True),
+            'samples': recorded[task_id].count,
+            'corrected samples': corrected[task_id].count,
+            'Resp. Time (ms)': recorded[task_id].mean,
+            'corrected Resp. Time (ms)': corrected[task_id].mean,
+        }
+        for column, p in PERCENTILES.items():
+            row[column] = recorded[task_id].percentile(p)
+            row[f'corrected {column}'] = corrected[task_id].percentile(p)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare recorded and coordinated omission corrected latencies of every task.")
+
+    parser.add_argument('-n', action='store_true', help="Only use the newest run of every experiment.")
+    parser.add_argument('-o', type=str, default=None, help="Optional csv file the table is written to.")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+
+    experiment_dirs = []
+    for directory in args.directories:
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            continue
+        experiment_dirs.extend(find_experiment_dirs(directory))
+
+    if len(experiment_dirs) == 0:
+        print("No experiment results found")
+        sys.exit(1)
+
+    tables = []
+    for experiment_dir in experiment_dirs:
+        runs = sorted(find_runs(experiment_dir).items(), reverse=True)
+        if args.n:
+            runs = runs[:1]
+        for summary_path, latencies_paths in runs:
+            table = compare_run(experiment_dir, latencies_paths)
+            if table is None:
+                print(f"{os.path.basename(summary_path)} has no task index, skipped")
+                continue
+            table.insert(0, 'run', os.path.basename(summary_path)[: -len("-summary.csv")])
+            table.insert(0, 'experiment', os.path.basename(os.path.normpath(experiment_dir)))
+            tables.append(table)
+
+    if len(tables) == 0:
+        print("No runs with task index found")
+        sys.exit(1)
+
+    table = pd.concat(tables, ignore_index=True)
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 250):
+        print(table.round(3).to_string(index=False))
+
+    if args.o is not None:
+        table.to_csv(args.o, index=False)
+        print(f"Table saved to {args.o}")
@@ -0,0 +1,252 @@
+import json
+import os
+import socket
+import struct
+import threading
+from http.client import HTTPConnection
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlencode
+
+from pydantic import BaseModel
+
+DOCKER_SOCKET = "/var/run/docker.sock"
+BOOKIE_IMAGE = "apache/bookkeeper:latest"
+BOOKIE_NETWORK = "bookkeeper-internal"
+RESTART_TIMEOUT = 10
+HOST_INTERFACES = "/sys/class/net"
+
+
+class DockerError(RuntimeError):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"docker api returned {status}: {message}")
+        self.status = status
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """HTTP connection over the unix socket of the Docker Engine."""
+
+    def __init__(self, socket_path: str, timeout: float = 60):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def demultiplex(data: bytes) -> Tuple[bytes, bytes]:
+    """
+    Splits the multiplexed output of a non tty exec into stdout and stderr:
+    frames of an 8 byte header (stream, 3 bytes padding, big endian size)
+    followed by the payload.
+    """
+    stdout, stderr = [], []
+    offset = 0
+    while offset + 8 <= len(data):
+        stream, size = struct.unpack(">BxxxI", data[offset:offset + 8])
+        payload = data[offset + 8:offset + 8 + size]
+        (stderr if stream == 2 else stdout).append(payload)
+        offset += 8 + size
+    return b"".join(stdout), b"".join(stderr)
+
+
+class DockerClient:
+    """
+    The few Docker Engine API calls the fault injection needs, every call is
+    one request on a fresh unix socket connection so it can be used from
+    several threads.
+    """
+
+    def __init__(self, socket_path: str = DOCKER_SOCKET):
+        self.socket_path = socket_path
+
+    def _request(self, method: str, path: str, body: Optional[Dict] = None, query: Optional[Dict] = None) -> Tuple[int, bytes]:
+        if query:
+            path += "?" + urlencode(query)
+        connection = UnixHTTPConnection(self.socket_path)
+        try:
+            headers = {"Content-Type": "application/json"} if body is not None else {}
+            connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        finally:
+            connection.close()
+
+        if response.status >= 400:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode(errors="replace")
+            raise DockerError(response.status, message)
+        return response.status, data
+
+    def _json(self, method: str, path: str, body: Optional[Dict] = None, query: Optional[Dict] = None) -> Any:
+        _, data = self._request(method, path, body, query)
+        return json.loads(data) if data else None
+
+    def list_containers(self, ancestor: Optional[str] = None) -> List[Dict]:
+        query = {"filters": json.dumps({"ancestor": [ancestor]})} if ancestor else None
+        return self._json("GET", "/containers/json", query=query)
+
+    def inspect_container(self, container: str) -> Dict:
+        return self._json("GET", f"/containers/{quote(container)}/json")
+
+    def restart_container(self, container: str, timeout: int = RESTART_TIMEOUT) -> None:
+        self._request("POST", f"/containers/{quote(container)}/restart", query={"t": timeout})
+
+    def disconnect_network(self, network: str, container: str) -> None:
+        self._request("POST", f"/networks/{quote(network)}/disconnect", body={"Container": container, "Force": True})
+
+    def connect_network(self, network: str, container: str) -> None:
+        self._request("POST", f"/networks/{quote(network)}/connect", body={"Container": container})
+
+    def exec_run(self, container: str, command: List[str]) -> bytes:
+        """Runs `command` in the container and returns its stdout."""
+        created = self._json("POST", f"/containers/{quote(container)}/exec", body={"AttachStdout": True, "AttachStderr": True, "Cmd": command})
+        _, data = self._request("POST", f"/exec/{created['Id']}/start", body={"Detach": False, "Tty": False})
+        stdout, _ = demultiplex(data)
+        return stdout
+
+
+def read_host_interfaces() -> Dict[str, str]:
+    """Host network interfaces by interface index."""
+    interfaces = {}
+    for interface in os.listdir(HOST_INTERFACES):
+        try:
+            with open(os.path.join(HOST_INTERFACES, interface, "ifindex"), "r") as file:
+                interfaces[file.read().strip()] = interface
+        except OSError:
+            continue
+    return interfaces
+
+
+class ContainerInfo(BaseModel):
+    id: str
+    name: str
+    started_at: str
+    networks: List[str]
+
+
+class ContainerControl:
+    """
+    Container discovery and control for the fault injection.
+
+    Container ids, networks and the host side interface of every container
+    are looked up once and cached. A restart through `restart` drops the
+    cached entry of the container, reconnecting it to a network drops its
+    interface since the veth pair is recreated. Before a cached interface is
+    used the container's start time is compared with the cached one and the
+    interface has to still exist on the host, so restarts and reconnects
+    made outside of this class (docker compose, other scripts) are noticed.
+    `invalidate` drops entries explicitly.
+    """
+
+    def __init__(self, client: Optional[DockerClient] = None, host_interfaces: Callable[[], Dict[str, str]] = read_host_interfaces):
+        """
+        :param client: Engine API client, e.g. the fake of `tests/fake_docker.py`.
+        :param host_interfaces: Returns the host interfaces by index.
+        """
+        self.client = client or DockerClient()
+        self._host_interfaces = host_interfaces
+        self._bookies = None
+        self._containers = {}
+        self._interfaces = {}
+        self._lock = threading.Lock()
+
+    def bookies(self, refresh: bool = False) -> List[str]:
+        """Names of the running bookie containers, sorted."""
+        with self._lock:
+            if self._bookies is None or refresh:
+                containers = self.client.list_containers(ancestor=BOOKIE_IMAGE)
+                self._bookies = sorted(container["Names"][0].lstrip("/") for container in containers)
+            return list(self._bookies)
+
+    def _inspect(self, name: str) -> ContainerInfo:
+        data = self.client.inspect_container(name)
+        return ContainerInfo(
+            id=data["Id"],
+            name=data["Name"].lstrip("/"),
+            started_at=data["State"]["StartedAt"],
+            networks=list((data.get("NetworkSettings") or {}).get("Networks") or {}),
+        )
+
+    def container(self, name: str) -> ContainerInfo:
+        with self._lock:
+            info = self._containers.get(name)
+        if info is not None:
+            return info
+
+        info = self._inspect(name)
+        with self._lock:
+            self._containers[name] = info
+        return info
+
+    def refresh(self, name: str) -> ContainerInfo:
+        """
+        Inspects a container again, its cached interface is dropped if the
+        container was (re)started since it was looked up.
+        """
+        info = self._inspect(name)
+        with self._lock:
+            cached = self._containers.get(name)
+            if cached is None or cached.started_at != info.started_at:
+                self._interfaces.pop(name, None)
+            self._containers[name] = info
+        return info
+
+    def network(self, name: str) -> str:
+        """The internal network of a bookie, named `<compose project>_bookkeeper-internal`."""
+        networks = self.container(name).networks
+        for network in networks:
+            if network.endswith(BOOKIE_NETWORK):
+                return network
+        if len(networks) == 0:
+            raise RuntimeError(f"{name} is not connected to any network")
+        return networks[0]
+
+    def host_interface(self, name: str) -> str:
+        """The host side veth interface of a container's eth0."""
+        self.refresh(name)
+        with self._lock:
+            interface = self._interfaces.get(name)
+        host_interfaces = self._host_interfaces()
+        if interface is not None and interface in host_interfaces.values():
+            return interface
+
+        iflink = self.client.exec_run(name, ["cat", "/sys/class/net/eth0/iflink"]).decode("utf-8").strip()
+        interface = host_interfaces.get(iflink)
+        if interface is None:
+            raise RuntimeError(f"no host interface found for {name}")
+        with self._lock:
+            self._interfaces[name] = interface
+        return interface
+
+    def restart(self, name: str, timeout: int = RESTART_TIMEOUT) -> None:
+        try:
+            self.client.restart_container(name, timeout)
+        finally:
+            self.invalidate(name)
+
+    def disconnect(self, name: str, network: str) -> None:
+        self.client.disconnect_network(network, name)
+        with self._lock:
+            self._interfaces.pop(name, None)
+
+    def connect(self, name: str, network: str) -> None:
+        try:
+            self.client.connect_network(network, name)
+        finally:
+            with self._lock:
+                self._interfaces.pop(name, None)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Drops the cached entries of a container, of all containers if None."""
+        with self._lock:
+            if name is None:
+                self._bookies = None
+                self._containers.clear()
+                self._interfaces.clear()
+            else:
+                self._containers.pop(name, None)
+                self._interfaces.pop(name, None)
@@ -0,0 +1,28 @@
+import json
+import os
+
+from colorama import Fore, init
+
+from task_index import ExperimentResult
+from timeseries import EVENTS, timestamp
+
+init(autoreset=True)  # Ensure automatic color reset
+
+
+def log_event(action: str, bookie: str, result_dir: str = ExperimentResult) -> None:
+    """
+    Appends a fault injected by an interrupt script to the event log of the
+    experiment, read by timeseries.py. Events are stamped with the clock of
+    the timeseries.
+
+    :param action: What was done to the bookie, e.g. "restart".
+    :param bookie: Name of the bookie container.
+    :param result_dir: Result folder of the experiment, the scripts run in the experiment directory.
+    """
+    path = os.path.join(result_dir, EVENTS)
+    try:
+        os.makedirs(result_dir, exist_ok=True)
+        with open(path, "a") as file:
+            file.write(json.dumps({"time": timestamp(), "action": action, "bookie": bookie}) + "\n")
+    except OSError as e:
+        print(Fore.RED + f"Couldn't log event: {e}")
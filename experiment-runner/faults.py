@@ -0,0 +1,408 @@
+import argparse
+import datetime
+import fnmatch
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+from time import monotonic
+from typing import Callable, Dict, List, Literal, Optional
+
+import numpy as np
+import pandas as pd
+from colorama import Fore, init
+from pydantic import BaseModel, TypeAdapter, field_validator, model_validator
+
+from docker_api import ContainerControl
+from latencies import find_experiment_dirs
+from telemetry import telemetry_path_for
+from timeseries import BUCKET, TIMESERIES, aggregate_timeseries, find_timeseries, load_timeseries, recovery_time, timestamp
+
+init(autoreset=True)  # Ensure automatic color reset
+
+FAULTS = "-faults.jsonl"
+IMPACT = "-fault-impact.csv"
+
+FAULT_PATTERN = re.compile(r"^(?P<action>[a-z]+)(:(?P<interval>[\d.]+))?(:(?P<duration>[\d.]+))?(:(?P<latency>[\d.]+))?$")
+
+
+class FaultSpec(BaseModel):
+    """
+    A fault injected over and over while a task runs, `interval` seconds
+    after the previous one was reverted.
+
+    In a benchmark.yml `rate` (faults per minute) can be given instead of
+    `interval`.
+    """
+
+    action: str
+    interval: float
+    duration: float = 0.0
+    latency_ms: float = 0.0
+    # glob over the bookie container names, e.g. "*bookie1*"
+    targets: str = "*"
+    # bookies hit by one fault, 0 hits all matching ones
+    count: int = 1
+    # fixed gaps or exponentially distributed ones with mean `interval`
+    arrival: Literal["fixed", "poisson"] = "fixed"
+
+    @field_validator("action")
+    @classmethod
+    def known_action(cls, action: str) -> str:
+        if action not in ACTIONS:
+            raise ValueError(f"unknown fault action '{action}', expected one of {', '.join(ACTIONS)}")
+        return action
+
+    @field_validator("interval")
+    @classmethod
+    def positive_interval(cls, interval: float) -> float:
+        if interval <= 0:
+            raise ValueError(f"invalid fault interval {interval}, expected more than 0 seconds")
+        return interval
+
+    @field_validator("duration", "latency_ms")
+    @classmethod
+    def non_negative(cls, value: float) -> float:
+        if value < 0:
+            raise ValueError(f"invalid fault duration or latency {value}, expected at least 0")
+        return value
+
+    @model_validator(mode="before")
+    @classmethod
+    def rate_to_interval(cls, data):
+        if isinstance(data, dict) and "rate" in data:
+            data = dict(data)
+            rate = float(data.pop("rate"))
+            if rate <= 0:
+                raise ValueError(f"invalid fault rate {rate}")
+            data.setdefault("interval", 60.0 / rate)
+        if isinstance(data, dict) and data.get("action") in DEFAULT_FAULTS:
+            # the given values override the ones of the matching script, whether `rate` or `interval` was given
+            data = {**DEFAULT_FAULTS[data["action"]], **data}
+        return data
+
+    @classmethod
+    def parse(cls, text: str) -> "FaultSpec":
+        """
+        Parses faults like "restart", "disconnect:5:1" or "delay:1:60:10",
+        i.e. action[:interval[:duration[:latency ms]]]. Missing values are the
+        ones of the matching script in `interupts/`.
+        """
+        match = FAULT_PATTERN.match(text.strip())
+        if match is None or match.group("action") not in ACTIONS:
+            raise ValueError(f"invalid fault '{text}', expected one of {', '.join(ACTIONS)}[:interval[:duration[:latency ms]]]")
+
+        values = {"action": match.group("action")}
+        for group, field in (("interval", "interval"), ("duration", "duration"), ("latency", "latency_ms")):
+            if match.group(group) is not None:
+                values[field] = float(match.group(group))
+        return cls(**values)
+
+    def __str__(self) -> str:
+        return f"{self.action} every {self.interval:g}s"
+
+
+class FaultSchedule(BaseModel):
+    """
+    The `faults` section of a benchmark.yml.
+
+    Which bookie is hit when only depends on `seed`, the task and the list
+    of running bookies, so every run of a task gets the same faults.
+    """
+
+    seed: int = 0
+    schedule: List[FaultSpec]
+
+    def plan(self, task_id: int, runtime: float, bookies: List[str]) -> List["PlannedFault"]:
+        """
+        The faults of one task, ordered by their offset from the start of the task.
+
+        Every spec draws from its own random stream, adding a spec does not
+        change the faults of the others.
+
+        :param runtime: Seconds the task runs, no fault starts later.
+        :param bookies: Names of the running bookie containers.
+        """
+        planned = []
+        for index, spec in enumerate(self.schedule):
+            rng = random.Random(f"{self.seed}:{task_id}:{index}")
+            candidates = sorted(bookie for bookie in bookies if fnmatch.fnmatchcase(bookie, spec.targets))
+            if len(candidates) == 0:
+                continue
+
+            offset = 0.0
+            while True:
+                offset += spec.interval if spec.arrival == "fixed" else rng.expovariate(1.0 / spec.interval)
+                if offset >= runtime:
+                    break
+                targets = candidates if spec.count <= 0 else rng.sample(candidates, min(spec.count, len(candidates)))
+                planned.append(PlannedFault(offset=offset, spec=index, action=spec.action, bookies=targets))
+                offset += spec.duration
+        planned.sort(key=lambda fault: (fault.offset, fault.spec))
+        return planned
+
+
+class PlannedFault(BaseModel):
+    offset: float
+    spec: int
+    action: str
+    bookies: List[str]
+
+
+def parse_runtime(runtime: str) -> float:
+    """Seconds of an ISO 8601 duration like the task runtime "PT1M"."""
+    return TypeAdapter(datetime.timedelta).validate_python(runtime).total_seconds()
+
+
+class FaultEvent(BaseModel):
+    """
+    One injected fault. `start` and `end` are taken with `timeseries.timestamp`,
+    so they line up with the samples of the run's timeseries.
+    """
+
+    task_id: int
+    action: str
+    bookie: str
+    start: float
+    end: float
+    error: Optional[str] = None
+
+
+def restart_bookie(control: ContainerControl, bookie: str, spec: FaultSpec, stop: threading.Event) -> None:
+    control.restart(bookie)
+
+
+def disconnect_bookie(control: ContainerControl, bookie: str, spec: FaultSpec, stop: threading.Event) -> None:
+    network = control.network(bookie)
+    control.disconnect(bookie, network)
+    try:
+        stop.wait(spec.duration)
+    finally:
+        control.connect(bookie, network)
+
+
+def delay_bookie(control: ContainerControl, bookie: str, spec: FaultSpec, stop: threading.Event) -> None:
+    interface = control.host_interface(bookie)
+    subprocess.run(["tc", "qdisc", "add", "dev", interface, "root", "netem", "delay", f"{spec.latency_ms:g}ms"], check=True, capture_output=True)
+    try:
+        stop.wait(spec.duration)
+    finally:
+        subprocess.run(["tc", "qdisc", "del", "dev", interface, "root"], check=True, capture_output=True)
+
+
+# an action returns once the fault is reverted, early if `stop` is set
+ACTIONS: Dict[str, Callable[[ContainerControl, str, FaultSpec, threading.Event], None]] = {
+    "restart": restart_bookie,
+    "disconnect": disconnect_bookie,
+    "delay": delay_bookie,
+}
+
+# intervals and durations of the scripts in interupts/, used for the values a fault leaves out
+DEFAULT_FAULTS = {
+    "restart": {"interval": 30.0},
+    "disconnect": {"interval": 5.0, "duration": 1.0},
+    "delay": {"interval": 1.0, "duration": 60.0, "latency_ms": 10.0},
+}
+
+
+class FaultLog:
+    """
+    Appends every injected fault as json line to `<run>-faults.jsonl`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_run(cls, latencies_paths: List[str]) -> "FaultLog":
+        """The fault log of a run, next to the latencies csvs of its clients."""
+        return cls(telemetry_path_for(latencies_paths, FAULTS))
+
+    def write(self, event: FaultEvent) -> None:
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a") as file:
+                file.write(json.dumps(event.model_dump()) + "\n")
+
+
+def read_fault_log(path: str) -> List[FaultEvent]:
+    events = []
+    if not os.path.exists(path):
+        return events
+    with open(path, "r") as file:
+        for line in file:
+            try:
+                events.append(FaultEvent(**json.loads(line)))
+            except ValueError:
+                # line of a runner killed while writing
+                continue
+    return events
+
+
+class FaultScheduler:
+    """
+    Runs the planned faults of one task while its load runs and logs each
+    of them with its start and end.
+
+    The faults of a spec run one after another in their own thread, those of
+    different specs overlap. A fault whose previous one of the same spec is
+    still running (e.g. a slow restart) starts late, the log holds the real
+    start.
+    """
+
+    def __init__(self, schedule: FaultSchedule, log: FaultLog, task_id: int, runtime: float, control: Optional[ContainerControl] = None):
+        """
+        :param runtime: Seconds the task runs, see `parse_runtime`.
+        :param control: Shared by the tasks of a run so container metadata is only looked up once.
+        """
+        self.schedule = schedule
+        self.control = control or ContainerControl()
+        self.log = log
+        self.task_id = task_id
+        self.runtime = runtime
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _inject(self, spec: FaultSpec, bookie: str) -> None:
+        start = timestamp()
+        error = None
+        try:
+            ACTIONS[spec.action](self.control, bookie, spec, self._stop)
+            print(Fore.YELLOW + f"[faults] {spec.action} {bookie} for {timestamp() - start:.1f}s")
+        except (OSError, RuntimeError, ValueError, subprocess.CalledProcessError) as e:
+            error = str(e)
+            print(Fore.RED + f"[faults] {spec.action} {bookie} failed: {e}")
+        self.log.write(FaultEvent(task_id=self.task_id, action=spec.action, bookie=bookie, start=start, end=timestamp(), error=error))
+
+    def _run(self, spec: FaultSpec, faults: List[PlannedFault], started: float) -> None:
+        for fault in faults:
+            if self._stop.wait(max(0.0, fault.offset - (monotonic() - started))):
+                return
+            # the bookies of one fault are hit at the same time
+            threads = [threading.Thread(target=self._inject, args=(spec, bookie), daemon=True) for bookie in fault.bookies]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+    def start(self) -> "FaultScheduler":
+        started = monotonic()
+        try:
+            bookies = self.control.bookies()
+        except (OSError, RuntimeError) as e:
+            print(Fore.RED + f"[faults] couldn't list bookies: {e}")
+            return self
+
+        planned = self.schedule.plan(self.task_id, self.runtime, bookies)
+        print(Fore.YELLOW + f"[faults] {len(planned)} faults planned for task {self.task_id} (seed {self.schedule.seed})")
+        for index, spec in enumerate(self.schedule.schedule):
+            faults = [fault for fault in planned if fault.spec == index]
+            if faults:
+                self._threads.append(threading.Thread(target=self._run, args=(spec, faults, started), daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Reverts the running faults and waits until they are logged."""
+        self._stop.set()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join()
+
+
+def fault_impact(samples: pd.DataFrame, events: List[FaultEvent], bucket: float = BUCKET) -> pd.DataFrame:
+    """
+    Joins the faults of a run with its timeseries.
+
+    For every fault: the longest stretch without any completed request from
+    its start until it was recovered from, the p99 of the requests completed
+    while it lasted and the time from its end until throughput and p99 are
+    back at their level before it (see `timeseries.recovery_time`).
+
+    :param samples: The run's timeseries as read by `load_timeseries`.
+    """
+    columns = ['task_id', 'action', 'bookie', 'run time (s)', 'duration (s)', 'availability gap (s)', 'p99 during fault (ms)', 'recovery (s)', 'error']
+    timestamps = samples['timestamp'].to_numpy()
+    if len(events) == 0 or timestamps.size == 0:
+        return pd.DataFrame(columns=columns)
+
+    order = np.argsort(timestamps, kind='stable')
+    timestamps = timestamps[order]
+    latencies = samples['latency'].to_numpy()[order]
+    start = float(timestamps[0])
+    series = aggregate_timeseries(timestamps, latencies, bucket, start)
+
+    rows = []
+    for event in events:
+        recovery = recovery_time(series, event.start - start, bucket, event.end - start)
+        until = event.end + (recovery if not math.isnan(recovery) else 0.0)
+
+        first, last = np.searchsorted(timestamps, [event.start, until])
+        # gaps between consecutive completions, including the ones at the edges of the fault
+        edges = np.concatenate(([event.start], timestamps[first:last], [until]))
+        gap = float(np.diff(edges).max()) if edges.size > 1 else 0.0
+
+        during = latencies[first:np.searchsorted(timestamps, event.end, side='right')]
+        p99 = float(np.sort(during)[max(1, int(math.ceil(0.99 * during.size))) - 1]) if during.size else math.nan
+
+        rows.append({
+            'task_id': event.task_id,
+            'action': event.action,
+            'bookie': event.bookie,
+            'run time (s)': event.start - start,
+            'duration (s)': event.end - event.start,
+            'availability gap (s)': gap,
+            'p99 during fault (ms)': p99,
+            'recovery (s)': recovery,
+            'error': event.error,
+        })
+    return pd.DataFrame(rows, columns=columns)
+
+
+def fault_log_for(timeseries_path: str) -> str:
+    return timeseries_path[: -len(TIMESERIES)] + FAULTS
+
+
+def run_fault_impact(timeseries_path: str, bucket: float = BUCKET) -> pd.DataFrame:
+    """Impact of every fault of the run a timeseries belongs to."""
+    return fault_impact(load_timeseries(timeseries_path), read_fault_log(fault_log_for(timeseries_path)), bucket)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Availability gap, p99 and recovery time of every fault injected by the runner.")
+
+    parser.add_argument('-n', action='store_true', help="Only use the newest run of every experiment.")
+    parser.add_argument('-b', type=float, default=BUCKET, help="Bucket width in seconds used to detect the recovery.")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+
+    experiment_dirs = []
+    for directory in args.directories:
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            continue
+        experiment_dirs.extend(find_experiment_dirs(directory))
+
+    runs = []
+    for experiment_dir in experiment_dirs:
+        files = [file for file in find_timeseries(experiment_dir) if os.path.exists(fault_log_for(file))]
+        runs.extend(files[:1] if args.n else files)
+
+    if len(runs) == 0:
+        print("No runs with timeseries and fault log found, record them with the runner's --timeseries and --fault flags")
+        sys.exit(1)
+
+    for timeseries_file in runs:
+        impact = run_fault_impact(timeseries_file, args.b)
+        output_file = timeseries_file[: -len(TIMESERIES)] + IMPACT
+        impact.to_csv(output_file, index=False, float_format="%.3f")
+        print(f"{os.path.basename(timeseries_file)[: -len(TIMESERIES)]}: {len(impact)} faults, saved to {output_file}")
+        with pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(impact.drop(columns=['error']).round(3).to_string(index=False))
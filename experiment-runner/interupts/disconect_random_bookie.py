@@ -1,7 +1,6 @@
 import os
 import signal
 import socket
-import subprocess
 import sys
 import time
 import random
@@ -9,8 +8,13 @@ from http.client import HTTPConnection
 
 from colorama import Fore, init
 
+from docker_api import ContainerControl
+from event_log import log_event
+
 init(autoreset=True)  # Ensure automatic color reset
 
+containers = ContainerControl()
+
 
 def disconnect_and_reconnect(container_name):
     """Disconnects and reconnects a Docker container to a network.
@@ -19,41 +23,26 @@ def disconnect_and_reconnect(container_name):
         container_name (str): The name of the Docker container.
     """
 
-    folder_name = os.path.basename(os.getcwd())
-
     try:
+        network = containers.network(container_name)
+
         # Disconnect the container from the network
-        subprocess.run(["docker", "network", "disconnect", f"{folder_name}_bookkeeper-internal", container_name])
+        log_event("disconnect", container_name)
+        containers.disconnect(container_name, network)
         print(Fore.GREEN + f"Disconnected {container_name} from bookkeeper-internal")
 
         # Wait for one minute
         time.sleep(1)
 
         # Reconnect the container to the network
-        subprocess.run(["docker", "network", "connect", f"{folder_name}_bookkeeper-internal", container_name])
+        log_event("reconnect", container_name)
+        containers.connect(container_name, network)
         print(Fore.GREEN + f"Reconnected {container_name} to bookkeeper-internal")
     except Exception as e:
         print(Fore.RED + f"Error: {e}")
         kill_handler()
 
 
-
-def get_bookie_names():
-    """Retrieves a list of Bookie container names from Docker.
-    """
-    cmd = ["docker", "ps"]
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-    output, _ = process.communicate()
-
-    bookie_names = []
-    for line in output.decode('utf-8').splitlines():
-        if "apache/bookkeeper:latest" in line:
-            bookie_name = line.split()[-1]
-            bookie_names.append(bookie_name)
-
-    return bookie_names
-
-
 def kill_handler(*args):
     """Handles keyboard interrupts (SIGINT) and termination signals (SIGTERM).
 
@@ -71,7 +60,7 @@ if __name__ == "__main__":
 
     time.sleep(30)
 
-    bookie_names = get_bookie_names()
+    bookie_names = containers.bookies()
     print( f"Found Bookie containers: {bookie_names}")
 
     
@@ -1,6 +1,4 @@
-import json
 import os
-import re
 import signal
 import socket
 import subprocess
@@ -11,8 +9,13 @@ from http.client import HTTPConnection
 
 from colorama import Fore, init
 
+from docker_api import ContainerControl
+from event_log import log_event
+
 init(autoreset=True)  # Ensure automatic color reset
 
+containers = ContainerControl()
+
 
 def introduce_latency(container_name, latency_ms):
     """Introduces network latency to a Docker container.
@@ -23,48 +26,22 @@ def introduce_latency(container_name, latency_ms):
     """
 
     try:
-        container_id = subprocess.check_output(["docker", "inspect", "-f", "{{.Id}}", container_name]).decode('utf-8').strip()
-        container_info = subprocess.check_output(["docker", "inspect", "-f", '{{json .NetworkSettings.Networks}}', container_name]).decode('utf-8')
-        network_name = list(json.loads(container_info).keys())[0]
-        network_details = subprocess.check_output(["docker", "network", "inspect", network_name]).decode('utf-8')
-
-        print(network_details)
-        # Extract IP address using regular expression
-        match = re.search(r'IPAM.Config\[0\].IPPrefix.(.*?)/', network_details)
-        if match:
-            container_iface = match.group(1)
-        else:
-            raise Exception("Failed to parse IP prefix information")
+        container_iface = containers.host_interface(container_name)
 
         # Introduce latency on the container's interface
+        log_event(f"delay {latency_ms}ms", container_name)
         subprocess.run(["tc", "qdisc", "add", "dev", container_iface, "root", "netem", "delay", f"{latency_ms}ms"])
 
         time.sleep(60)  # Adjust the delay time as needed
 
         # Remove network latency
+        log_event("delay removed", container_name)
         subprocess.run(["tc", "qdisc", "del", "dev", container_iface, "root"])
 
     except Exception as e:
         print(f"Error: {e}")
 
 
-
-def get_bookie_names():
-    """Retrieves a list of Bookie container names from Docker.
-    """
-    cmd = ["docker", "ps"]
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-    output, _ = process.communicate()
-
-    bookie_names = []
-    for line in output.decode('utf-8').splitlines():
-        if "apache/bookkeeper:latest" in line:
-            bookie_name = line.split()[-1]
-            bookie_names.append(bookie_name)
-
-    return bookie_names
-
-
 def kill_handler(*args):
     """Handles keyboard interrupts (SIGINT) and termination signals (SIGTERM).
 
@@ -82,7 +59,7 @@ if __name__ == "__main__":
 
     time.sleep(1)
 
-    bookie_names = get_bookie_names()
+    bookie_names = containers.bookies()
     print( f"Found Bookie containers: {bookie_names}")
 
     
@@ -1,39 +1,29 @@
 import signal
-import subprocess
 import sys
 import time
 import random
 
 from colorama import Fore, init
 
+from docker_api import ContainerControl, DockerError
+from event_log import log_event
+
 init(autoreset=True)  # Ensure automatic color reset
 
+containers = ContainerControl()
+
+
 def restart_bookie(bookie_name):
     """Restarts a Bookie container using Docker.
     """
     try:
-        subprocess.run(["docker", "restart", bookie_name])
+        log_event("restart", bookie_name)
+        containers.restart(bookie_name)
         print(Fore.GREEN + f"Successfully restarted Bookie: {bookie_name}")
-    except subprocess.CalledProcessError as e:
+    except (OSError, DockerError) as e:
         print(Fore.RED + f"Error restarting Bookie {bookie_name}: {e}")
 
 
-def get_bookie_names():
-    """Retrieves a list of Bookie container names from Docker.
-    """
-    cmd = ["docker", "ps"]
-    process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-    output, _ = process.communicate()
-
-    bookie_names = []
-    for line in output.decode('utf-8').splitlines():
-        if "apache/bookkeeper:latest" in line:
-            bookie_name = line.split()[-1]
-            bookie_names.append(bookie_name)
-
-    return bookie_names
-
-
 def kill_handler(*args):
     """Handles keyboard interrupts (SIGINT) and termination signals (SIGTERM).
 
@@ -49,7 +39,7 @@ if __name__ == "__main__":
 
     print(Fore.GREEN + "Starting restart_bookie")
 
-    bookie_names = get_bookie_names()
+    bookie_names = containers.bookies()
     print( f"Found Bookie containers: {bookie_names}")
 
     while True:
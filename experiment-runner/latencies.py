@@ -0,0 +1,332 @@
+import argparse
+import math
+import os
+import sys
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+import yaml
+
+from latency_store import BENCHMARK, CHUNK_SIZE, LATENCIES, LATENCIES_STORE, LATENCY_COLUMN, ExperimentResult, iter_csv_chunks, open_store, read_header
+from task_index import TaskBoundary, find_task_index
+
+PERCENTILES = {
+    '50th p (ms)': 50.0,
+    '95th p (ms)': 95.0,
+    '99th p (ms)': 99.0,
+    '999th p (ms)': 99.9,
+}
+
+
+class LatencyHistogram:
+    """
+    Fixed size, mergeable latency histogram in the style of HdrHistogram.
+
+    Bucket boundaries grow geometrically from `lowest` to `highest` so every
+    recorded value is reported within `precision` relative error. The memory
+    used does not depend on the number of recorded samples and two histograms
+    with the same layout can be merged by adding their counts.
+    """
+
+    def __init__(self, lowest: float = 1e-3, highest: float = 3.6e6, precision: float = 1e-3):
+        """
+        :param lowest: Smallest distinguishable latency in ms, smaller values are counted in the first bucket.
+        :param highest: Largest trackable latency in ms, larger values are counted in the last bucket.
+        :param precision: Relative error of the reported values.
+        """
+        if not 0 < lowest < highest:
+            raise ValueError(f"invalid histogram range [{lowest}, {highest}]")
+        if precision <= 0:
+            raise ValueError(f"invalid histogram precision {precision}")
+
+        self.lowest = lowest
+        self.highest = highest
+        self.precision = precision
+        self._log_base = math.log1p(precision)
+
+        bucket_count = int(math.ceil(math.log(highest / lowest) / self._log_base)) + 1
+        self.counts = np.zeros(bucket_count, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _bucket_index(self, values: np.ndarray) -> np.ndarray:
+        clipped = np.clip(values, self.lowest, self.highest)
+        return np.floor(np.log(clipped / self.lowest) / self._log_base).astype(np.intp)
+
+    def record(self, values) -> None:
+        """Records a batch of latencies (ms), NaN values are ignored."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+
+        self.counts += np.bincount(self._bucket_index(values), minlength=self.counts.size)
+        self.count += int(values.size)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def compatible(self, other: "LatencyHistogram") -> bool:
+        return (self.lowest, self.highest, self.precision) == (other.lowest, other.highest, other.precision)
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """Adds the samples of `other` to this histogram and returns it."""
+        if not self.compatible(other):
+            raise ValueError("cannot merge histograms with different bucket layouts")
+
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, p: float) -> float:
+        """
+        Returns the value below or equal to which `p` percent of the samples fall.
+        """
+        if self.count == 0:
+            return math.nan
+        if not 0 <= p <= 100:
+            raise ValueError(f"percentile {p} out of range")
+
+        rank = max(1, int(math.ceil(p / 100.0 * self.count)))
+        bucket = int(np.searchsorted(np.cumsum(self.counts), rank))
+        upper_bound = self.lowest * math.exp((bucket + 1) * self._log_base)
+        return min(max(upper_bound, self.min), self.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else math.nan
+
+    def summary(self) -> Dict[str, float]:
+        """Percentiles named like the columns of the generator's summary csv."""
+        row = {'samples': self.count, 'Resp. Time (ms)': self.mean}
+        for column, p in PERCENTILES.items():
+            row[column] = self.percentile(p)
+        row['max (ms)'] = self.max if self.count else math.nan
+        return row
+
+
+def load_latencies(file_path: str) -> np.ndarray:
+    """
+    Returns all samples of a latency file. Store files are memory-mapped
+    instead of read, csv files are parsed completely.
+    """
+    if file_path.endswith(LATENCIES_STORE):
+        _, samples = open_store(file_path)
+        return samples
+    return np.concatenate(list(iter_csv_chunks(file_path)) or [np.empty(0)])
+
+
+def iter_latency_chunks(file_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Streams the samples of a latencies csv or store file in fixed size chunks.
+
+    :param file_path: Path to a `*-latencies.csv` or `*-latencies.bin` file.
+    :param chunk_size: Number of samples per chunk.
+    """
+    if not file_path.endswith(LATENCIES_STORE):
+        yield from iter_csv_chunks(file_path, chunk_size)
+        return
+
+    _, samples = open_store(file_path)
+    for start in range(0, len(samples), chunk_size):
+        yield samples[start:start + chunk_size]
+
+
+def find_task_boundaries(file_path: str) -> Optional[List[TaskBoundary]]:
+    """Returns the task boundaries recorded for a latency file, None for runs without index."""
+    if file_path.endswith(LATENCIES_STORE):
+        header, _, _ = read_header(file_path)
+        return header.segments or None
+    return find_task_index(file_path)
+
+
+def iter_task_chunks(file_path: str, boundary: TaskBoundary, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Streams only the samples of one task, seeking directly to its first sample.
+    """
+    if file_path.endswith(LATENCIES_STORE):
+        _, samples = open_store(file_path)
+        end = boundary.sample_start + boundary.sample_count
+        for start in range(boundary.sample_start, end, chunk_size):
+            yield samples[start:min(start + chunk_size, end)]
+        return
+
+    if boundary.sample_count == 0:
+        return
+
+    with open(file_path, "r") as file:
+        file.seek(boundary.byte_start)
+        reader = pd.read_csv(
+            file,
+            header=None,
+            names=[LATENCY_COLUMN],
+            dtype={LATENCY_COLUMN: np.float64},
+            nrows=boundary.sample_count,
+            chunksize=chunk_size,
+        )
+        with reader:
+            for chunk in reader:
+                yield chunk[LATENCY_COLUMN].to_numpy()
+
+
+def histogram_from_file(file_path: str, chunk_size: int = CHUNK_SIZE, skip_task_ids: Optional[Set[int]] = None) -> LatencyHistogram:
+    """
+    Records every sample of a latency file. Tasks in `skip_task_ids` are left
+    out if the run recorded a task index.
+    """
+    histogram = LatencyHistogram()
+    boundaries = find_task_boundaries(file_path) if skip_task_ids else None
+    if boundaries is None:
+        for chunk in iter_latency_chunks(file_path, chunk_size):
+            histogram.record(chunk)
+        return histogram
+
+    for boundary in boundaries:
+        if boundary.task_id in skip_task_ids:
+            continue
+        for chunk in iter_task_chunks(file_path, boundary, chunk_size):
+            histogram.record(chunk)
+    return histogram
+
+
+def task_histograms(file_path: str, chunk_size: int = CHUNK_SIZE) -> Optional[Dict[int, LatencyHistogram]]:
+    """
+    Records the samples of every task of a run into its own histogram.
+
+    :return: Histograms by task id or None if the run has no task index.
+    """
+    boundaries = find_task_boundaries(file_path)
+    if boundaries is None:
+        return None
+
+    histograms = {}
+    for boundary in boundaries:
+        histogram = histograms.setdefault(boundary.task_id, LatencyHistogram())
+        for chunk in iter_task_chunks(file_path, boundary, chunk_size):
+            histogram.record(chunk)
+    return histograms
+
+
+def warmup_task_ids(experiment_dir: str) -> Set[int]:
+    """Returns the task ids of the warmup tasks in the benchmark.yml of an experiment."""
+    benchmark_path = os.path.join(experiment_dir, BENCHMARK)
+    if not os.path.exists(benchmark_path):
+        return set()
+
+    with open(benchmark_path, "r") as file:
+        config_data = yaml.safe_load(file)
+    return {task["task_id"] for key, task in config_data["tasks"].items() if key == "warmup"}
+
+
+def find_latency_files(experiment_dir: str) -> List[str]:
+    """
+    Returns the latency files of an experiment, newest first. Runs converted
+    by latency_store.py are returned as store file instead of csv.
+    """
+    result_dir = os.path.join(experiment_dir, ExperimentResult)
+    if not os.path.isdir(result_dir):
+        return []
+
+    runs = {}
+    for file in os.listdir(result_dir):
+        if file.endswith(LATENCIES):
+            runs.setdefault(file[: -len(LATENCIES)], file)
+        elif file.endswith(LATENCIES_STORE):
+            runs[file[: -len(LATENCIES_STORE)]] = file
+
+    return [os.path.join(result_dir, runs[run]) for run in sorted(runs, reverse=True)]
+
+
+def find_experiment_dirs(base_dir: str) -> List[str]:
+    """Finds every directory below `base_dir` (inclusive) holding an ExperimentResult folder."""
+    experiment_dirs = []
+    for root, dirs, _ in os.walk(base_dir):
+        if ExperimentResult in dirs:
+            experiment_dirs.append(root)
+            dirs.remove(ExperimentResult)
+    experiment_dirs.sort()
+    return experiment_dirs
+
+
+def summarize_experiments(
+    experiment_dirs: List[str],
+    newest_only: bool = False,
+    per_task: bool = False,
+    skip_warmup: bool = False,
+) -> Tuple[pd.DataFrame, LatencyHistogram]:
+    """
+    Recomputes the latency percentiles of every run in `experiment_dirs`.
+
+    :param newest_only: Only use the newest run of every experiment.
+    :param per_task: One row per task instead of per run, for runs with a task index.
+    :param skip_warmup: Leave out the warmup task, for runs with a task index.
+    :return: One row per latency file (or task) and a histogram merged over all of them.
+    """
+    rows = []
+    merged = LatencyHistogram()
+    for experiment_dir in tqdm(experiment_dirs, desc="Processing directories", unit="dir"):
+        files = find_latency_files(experiment_dir)
+        if newest_only:
+            files = files[:1]
+        skip_task_ids = warmup_task_ids(experiment_dir) if skip_warmup else set()
+
+        for file in files:
+            row = {'experiment': os.path.basename(os.path.normpath(experiment_dir)), 'file': os.path.basename(file)}
+            histograms = task_histograms(file) if per_task else None
+
+            if histograms is None:
+                histogram = histogram_from_file(file, skip_task_ids=skip_task_ids)
+                merged.merge(histogram)
+                rows.append({**row, **histogram.summary()})
+                continue
+
+            for task_id, histogram in sorted(histograms.items()):
+                if task_id in skip_task_ids:
+                    continue
+                merged.merge(histogram)
+                rows.append({**row, 'Task-ID': task_id, **histogram.summary()})
+
+    return pd.DataFrame(rows), merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute latency percentiles from raw latency files.")
+
+    parser.add_argument('-n', action='store_true', help="Only use the newest run of every experiment.")
+    parser.add_argument('-t', action='store_true', help="One row per task, for runs that recorded a task index.")
+    parser.add_argument('-w', action='store_true', help="Leave out the warmup task, for runs that recorded a task index.")
+    parser.add_argument('-o', type=str, default=None, help="Optional csv file the table is written to.")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+
+    experiment_dirs = []
+    for directory in args.directories:
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            continue
+        experiment_dirs.extend(find_experiment_dirs(directory))
+
+    if len(experiment_dirs) == 0:
+        print("No experiment results found")
+        sys.exit(1)
+
+    table, merged = summarize_experiments(experiment_dirs, newest_only=args.n, per_task=args.t, skip_warmup=args.w)
+    if table.empty:
+        print("No latency files found")
+        sys.exit(1)
+
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(table.round(3).to_string(index=False))
+    print(f"\nAll runs: {pd.Series(merged.summary()).round(3).to_dict()}")
+
+    if args.o is not None:
+        table.to_csv(args.o, index=False)
+        print(f"Table saved to {args.o}")
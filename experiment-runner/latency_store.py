@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import struct
+import sys
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel
+from tqdm import tqdm
+import yaml
+
+from summerize_csv import parse_and_validate_name
+from task_index import TaskBoundary, find_task_index, index_path_for
+
+ExperimentResult = "ExperimentResult"
+BENCHMARK = "benchmark.yml"
+LATENCIES = "-latencies.csv"
+LATENCIES_STORE = "-latencies.bin"
+LATENCY_COLUMN = "latency"
+
+# number of samples parsed per chunk, bounds the memory used while streaming
+CHUNK_SIZE = 1 << 16
+
+# magic, version, reserved, header length, sample count
+MAGIC = b"LATS"
+VERSION = 1
+PREAMBLE = struct.Struct("<4sHHIQ")
+DATA_ALIGNMENT = 64
+
+
+class StoredTask(BaseModel):
+    task_id: int
+    mode: str
+    throughput: int
+    num_threads: int
+    payload_size: int
+    runtime: str
+
+
+class LatencyStoreHeader(BaseModel):
+    """
+    Metadata stored in front of the samples of a latency store file.
+    """
+
+    experiment_time: str
+    name: str
+    dtype: str
+    mode: Optional[str] = None
+    num_threads: Optional[int] = None
+    payload_size: Optional[int] = None
+    tasks: List[StoredTask] = []
+    segments: List[TaskBoundary] = []
+
+
+def store_path(csv_path: str) -> str:
+    """Returns the path of the store file belonging to a latencies csv."""
+    return csv_path[: -len(LATENCIES)] + LATENCIES_STORE
+
+
+def iter_csv_chunks(file_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Streams the latency column of a latencies csv in fixed size chunks.
+
+    :param file_path: Path to a `*-latencies.csv` file.
+    :param chunk_size: Number of samples per chunk.
+    """
+    reader = pd.read_csv(
+        file_path,
+        usecols=[LATENCY_COLUMN],
+        dtype={LATENCY_COLUMN: np.float64},
+        chunksize=chunk_size,
+    )
+    with reader:
+        for chunk in reader:
+            yield chunk[LATENCY_COLUMN].to_numpy()
+
+
+def read_stored_tasks(benchmark_path: str) -> List[StoredTask]:
+    """Reads the task parameters of a benchmark.yml, ordered by task id."""
+    with open(benchmark_path, "r") as file:
+        config_data = yaml.safe_load(file)
+
+    tasks = [StoredTask(**task) for task in config_data["tasks"].values()]
+    tasks.sort(key=lambda task: task.task_id)
+    return tasks
+
+
+def build_header(csv_path: str, dtype: str, benchmark_path: Optional[str] = None) -> LatencyStoreHeader:
+    """
+    Builds the store header from the result file name, the task index of the run
+    and, if given, the benchmark.yml of the run.
+    """
+    result_name = parse_and_validate_name(os.path.basename(csv_path))
+    header = LatencyStoreHeader(experiment_time=result_name.experiment_time, name=result_name.name, dtype=dtype)
+
+    if benchmark_path is not None and os.path.exists(benchmark_path):
+        header.tasks = read_stored_tasks(benchmark_path)
+        if header.tasks:
+            header.mode = header.tasks[-1].mode
+            header.num_threads = header.tasks[-1].num_threads
+            header.payload_size = header.tasks[-1].payload_size
+
+    header.segments = find_task_index(csv_path) or []
+    return header
+
+
+def _encode_header(header: LatencyStoreHeader) -> bytes:
+    encoded = json.dumps(header.model_dump()).encode("utf-8")
+    data_offset = PREAMBLE.size + len(encoded)
+    padding = -data_offset % DATA_ALIGNMENT
+    return encoded + b" " * padding
+
+
+def write_store(path: str, header: LatencyStoreHeader, chunks: Iterable[np.ndarray]) -> int:
+    """
+    Writes the samples of `chunks` to a store file, chunk by chunk.
+
+    The file is written next to its final location and renamed once complete,
+    so readers never see a partially written store.
+
+    :return: Number of written samples.
+    """
+    dtype = np.dtype(header.dtype)
+    encoded_header = _encode_header(header)
+    tmp_path = path + ".tmp"
+
+    count = 0
+    with open(tmp_path, "wb") as file:
+        file.write(PREAMBLE.pack(MAGIC, VERSION, 0, len(encoded_header), 0))
+        file.write(encoded_header)
+        for chunk in chunks:
+            np.asarray(chunk, dtype=dtype).tofile(file)
+            count += len(chunk)
+        file.seek(0)
+        file.write(PREAMBLE.pack(MAGIC, VERSION, 0, len(encoded_header), count))
+
+    os.replace(tmp_path, path)
+    return count
+
+
+def read_header(path: str) -> Tuple[LatencyStoreHeader, int, int]:
+    """
+    Reads the header of a store file.
+
+    :return: The header, the offset of the first sample and the number of samples.
+    """
+    with open(path, "rb") as file:
+        magic, version, _, header_length, count = PREAMBLE.unpack(file.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a latency store")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported store version {version}")
+        header = LatencyStoreHeader(**json.loads(file.read(header_length).decode("utf-8")))
+
+    return header, PREAMBLE.size + header_length, count
+
+
+def open_store(path: str) -> Tuple[LatencyStoreHeader, np.ndarray]:
+    """
+    Opens a store file without reading it, the samples are memory-mapped read only.
+    """
+    header, offset, count = read_header(path)
+    if count == 0:
+        return header, np.empty(0, dtype=np.dtype(header.dtype))
+
+    samples = np.memmap(path, dtype=np.dtype(header.dtype), mode="r", offset=offset, shape=(count,))
+    return header, samples
+
+
+def is_up_to_date(csv_path: str) -> bool:
+    path = store_path(csv_path)
+    if not os.path.exists(path):
+        return False
+
+    sources = [csv_path, index_path_for(csv_path)]
+    newest_source = max(os.path.getmtime(source) for source in sources if os.path.exists(source))
+    return os.path.getmtime(path) >= newest_source
+
+
+def convert(csv_path: str, dtype: str = "<f4", force: bool = False) -> Optional[str]:
+    """
+    Converts a latencies csv into a store file next to it.
+
+    :return: The path of the store file or None if it was already up to date.
+    """
+    if not force and is_up_to_date(csv_path):
+        return None
+
+    result_dir = os.path.dirname(os.path.abspath(csv_path))
+    benchmark_path = os.path.join(os.path.dirname(result_dir), BENCHMARK)
+    header = build_header(csv_path, dtype, benchmark_path)
+
+    path = store_path(csv_path)
+    write_store(path, header, iter_csv_chunks(csv_path))
+    return path
+
+
+def find_latency_csvs(base_dir: str) -> List[str]:
+    """Finds every latencies csv in the ExperimentResult folders below `base_dir`."""
+    csv_files = []
+    for root, _, files in os.walk(base_dir):
+        if os.path.basename(root) != ExperimentResult:
+            continue
+        csv_files.extend(os.path.join(root, file) for file in files if file.endswith(LATENCIES))
+    csv_files.sort()
+    return csv_files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert latencies csv files into memory-mappable binary stores.")
+
+    parser.add_argument('-f64', action='store_true', help="Store samples as float64 instead of float32.")
+    parser.add_argument('-f', action='store_true', help="Convert files even if their store is up to date.")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+    dtype = "<f8" if args.f64 else "<f4"
+
+    csv_files = []
+    for directory in args.directories:
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            continue
+        csv_files.extend(find_latency_csvs(directory))
+
+    if len(csv_files) == 0:
+        print("No latency files found")
+        sys.exit(1)
+
+    csv_size = 0
+    store_size = 0
+    for csv_file in tqdm(csv_files, desc="Converting latency files", unit="file"):
+        convert(csv_file, dtype=dtype, force=args.f)
+        csv_size += os.path.getsize(csv_file)
+        store_size += os.path.getsize(store_path(csv_file))
+
+    print(f"{len(csv_files)} files, csv {csv_size / 2**20:.1f} MiB -> store {store_size / 2**20:.1f} MiB")
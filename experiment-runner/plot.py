@@ -1,16 +1,42 @@
 import argparse
 import colorsys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import os
 import sys
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+import matplotlib
+matplotlib.use("Agg")  # plots are only saved, this also keeps worker processes headless
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.colors import LogNorm
+from matplotlib.lines import Line2D
+from matplotlib.ticker import NullFormatter
+import numpy as np
 import pandas as pd
 from pydantic import BaseModel
 from tqdm import tqdm
 import yaml
 
+from build_cache import BuildCache
+from confidence import find_runs
+from faults import fault_log_for, run_fault_impact
+from latencies import find_task_boundaries, load_latencies
+from latency_store import is_up_to_date, store_path
+from result_index import ResultIndex, open_index
+from summerize_csv import SUMMARY
+from telemetry import telemetry_path_for
+from timeseries import SERIES_PERCENTILES, TIMESERIES, find_timeseries, load_timeseries, run_series
+
 ExperimentResult = "ExperimentResult"
 BENCHMARK = "benchmark.yml"
+DISTRIBUTION = "-distribution.png"
+
+# log spaced latency bins of the spectrum and CDF, time x latency bins of the heatmap
+DISTRIBUTION_BINS = 512
+HEATMAP_BINS = (200, 100)
+# the spectrum ends at the 99.999th percentile
+SPECTRUM_MAX = 0.99999
 
 class Task(BaseModel):
     """
@@ -35,15 +61,15 @@ class Benchmark(BaseModel):
 
 
 
-def get_task_parameters():
+def get_task_parameters(experiment_dir: str = "."):
     """
     Reads a YAML file and validates it against the Benchmark schema.
 
-    :param config_file_path: Path to the directory containing the YAML configuration file.
+    :param experiment_dir: Path to the directory containing the YAML configuration file.
     :return: Benchmark object if validation is successful.
     """
 
-    with open(BENCHMARK, "r") as file:
+    with open(os.path.join(experiment_dir, BENCHMARK), "r") as file:
         config_data = yaml.safe_load(file)
 
     # Validate the data against the Benchmark schema
@@ -167,78 +193,98 @@ def plot_summary(file:pd.DataFrame, table:pd.DataFrame, output_file:str):
 
 
 
+def combine_summaries(experiment_name_list: List[str], data_list: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates the summaries of several experiments into one frame with an
+    `experiment` column and the `Run-ID` of every row.
+    """
+    if len(data_list) == 0:
+        return pd.DataFrame(columns=['experiment', 'Run-ID'])
+    combined = pd.concat(
+        [data.drop(columns=['Run-ID'], errors='ignore') for data in data_list],
+        keys=experiment_name_list, names=['experiment', None],
+    ).reset_index(level=0).reset_index(drop=True)
+    # Add Run-ID to separate the same task in different runs
+    combined['Run-ID'] = combined.groupby(['experiment', 'Task-ID']).cumcount() + 1
+    return combined
+
+
+def experiment_colors(experiment_names: List[str]) -> Dict[str, Tuple[float, float, float]]:
+    """Distinct colors for many experiments, hues spread by the golden ratio."""
+    colors = {}
+    for i, name in enumerate(experiment_names):
+        hue = (i * 0.618033988749895) % 1.0
+        colors[name] = colorsys.hsv_to_rgb(hue, 0.75, 0.55 + 0.35 * (i % 2))
+    return colors
+
+
+def add_lines(ax, data: pd.DataFrame, x: str, y: str, by: List[str], colors: Dict[str, Tuple[float, float, float]], marker: Optional[str] = 'o', **kwargs) -> None:
+    """
+    Draws one line per group of `by` as a single LineCollection and all
+    points as a single scatter, colored by the group's experiment. The points
+    of a line are connected in the order of `data`.
+    """
+    data = data.dropna(subset=[x, y]).sort_values(by, kind='stable')
+    if data.empty:
+        return
+    points = data[[x, y]].to_numpy(dtype=float)
+    starts = np.flatnonzero(data.groupby(by, sort=False).ngroup().diff().fillna(1).to_numpy() != 0)
+    color = np.array([colors[name] for name in data['experiment']])
+
+    lines = np.split(points, starts[1:])
+    ax.add_collection(LineCollection(lines, colors=color[starts], linewidths=1, **kwargs))
+    if marker is not None:
+        ax.scatter(points[:, 0], points[:, 1], c=color, s=12, marker=marker, zorder=3)
+    ax.autoscale_view()
+
+
+def add_experiment_legend(ax, colors: Dict[str, Tuple[float, float, float]]) -> None:
+    handles = [Line2D([], [], color=color, marker='o', markersize=4, label=name) for name, color in colors.items()]
+    ax.legend(handles=handles, loc='best', fontsize='small', ncol=max(1, len(handles) // 15))
+
+
 def plot_combined_summary(experiment_name_list: List[str],data_list: List[pd.DataFrame], output_file: str):
+    """
+    Plots the summaries of all experiments into one figure.
 
-    fig, axs = plt.subplots(3, 2, figsize=(45, 30))
+    All summaries are combined into one frame and aggregated in one pass,
+    every panel then draws its lines as a single LineCollection, so the
+    number of artists does not grow with the number of experiments and runs.
+    """
+    data = combine_summaries(experiment_name_list, data_list)
+    colors = experiment_colors(list(dict.fromkeys(experiment_name_list)))
+
+    fig, axs = plt.subplots(3, 2, figsize=(24, 18))
     fig.suptitle('Combined Performance Metrics Across Experiments')
 
-    for (data, experiment_name) in zip(data_list, experiment_name_list):
-        # Add Run-ID to separate the same task in different runs
-        if 'Run-ID' not in data.columns:
-            data['Run-ID'] = (data.groupby('Task-ID').cumcount() + 1)
-
-        # Select only numeric columns for the mean calculation
-        numeric_cols = data.select_dtypes(include='number').columns
-
-        # Split file into Async and Sync Tasks
-        sync_data = data[data['async / sync'] == 'sync']
-        async_data = data[data['async / sync'] == 'async']
-
-        # Group by Task-ID and calculate the mean for each group
-        mean_sync_data = sync_data.groupby('Task-ID').mean(numeric_only=True)
-        mean_async_data = async_data.groupby('Task-ID').mean(numeric_only=True)
-
-        # Plot Latency vs Throughput (Sync)
-        axs[0, 0].plot(mean_sync_data['Tput (ops/sec)'], mean_sync_data['95th p (ms)'], marker='o', linestyle='-', label=f'{experiment_name}')
-        axs[0, 0].set_title('Latency vs Throughput (Sync)')
-        axs[0, 0].set_ylabel('Latency (ms) "95th p (ms)"')
-        axs[0, 0].set_xlabel('Throughput (ops/sec)')
-        axs[0, 0].legend(loc='best')
-
-        # Plot Latency vs Throughput (Async)
-        axs[0, 1].plot(mean_async_data['Tput (ops/sec)'], mean_async_data['95th p (ms)'], marker='o', linestyle='-', label=f'{experiment_name}')
-        axs[0, 1].set_title('Latency vs Throughput (Async)')
-        axs[0, 1].set_ylabel('Latency (ms) "95th p (ms)"')
-        axs[0, 1].set_xlabel('Throughput (ops/sec)')
-        axs[0, 1].legend(loc='best')
-
-        # Plot Total Time
-        for run_id, group in data.groupby('Run-ID'):
-            axs[1, 0].plot(group['Task-ID'], group['Total Time (sec)'], marker='o', linestyle='-', label=f'Run {run_id} ({experiment_name})')
-        axs[1, 0].set_title('Total Time')
-        axs[1, 0].set_xlabel('Task-ID')
-        axs[1, 0].set_ylabel('Total Time (sec)')
-        axs[1, 0].legend(loc='best')
-
-        # Plot Throughput
-        for run_id, group in data.groupby('Run-ID'):
-            axs[1, 1].plot(group['Task-ID'], group['Tput (ops/sec)'], marker='o', linestyle='-', label=f'Run {run_id} ({experiment_name})')
-        axs[1, 1].set_title('Throughput')
-        axs[1, 1].set_xlabel('Task-ID')
-        axs[1, 1].set_ylabel('Throughput (ops/sec)')
-        axs[1, 1].legend(loc='best')
-
-        # Plot Response Time
-        for run_id, group in data.groupby('Run-ID'):
-            axs[2, 0].plot(group['Task-ID'], group['Resp. Time (ms)'], marker='o', linestyle='-', label=f'Run {run_id} ({experiment_name})')
-        axs[2, 0].set_title('Response Time')
-        axs[2, 0].set_xlabel('Task-ID')
-        axs[2, 0].set_ylabel('Response Time (ms)')
-        axs[2, 0].legend(loc='best')
-
-        # Plot Percentiles
-        for name, group in data.groupby('Task-ID'):
-            axs[2, 1].plot(group['Task-ID'], group['50th p (ms)'], marker='_', markersize=15, linestyle='-', label=f'50th ({experiment_name})' if name == 0 else "")
-            axs[2, 1].plot(group['Task-ID'], group['95th p (ms)'], marker='_', markersize=15, linestyle='-', label=f'95th ({experiment_name})' if name == 0 else "")
-            axs[2, 1].plot(group['Task-ID'], group['99th p (ms)'], marker='_', markersize=15, linestyle='-', label=f'99th ({experiment_name})' if name == 0 else "")
-            axs[2, 1].plot(group['Task-ID'], group['999th p (ms)'], marker='_', markersize=15, linestyle='-', label=f'999th ({experiment_name})' if name == 0 else "")
-        axs[2, 1].set_yscale('log', base=10)
-        axs[2, 1].set_title('Response Time Percentiles')
-        axs[2, 1].set_xlabel('Task-ID')
-        axs[2, 1].set_ylabel('Response Time (ms) log_10')
+    # Mean of the runs of every task, split into Async and Sync Tasks
+    mean_data = data.groupby(['experiment', 'async / sync', 'Task-ID'], as_index=False).mean(numeric_only=True)
+
+    for ax, mode in ((axs[0, 0], 'sync'), (axs[0, 1], 'async')):
+        add_lines(ax, mean_data[mean_data['async / sync'] == mode], 'Tput (ops/sec)', '95th p (ms)', ['experiment'], colors)
+        ax.set_title(f'Latency vs Throughput ({mode.capitalize()})')
+        ax.set_ylabel('Latency (ms) "95th p (ms)"')
+        ax.set_xlabel('Throughput (ops/sec)')
+    add_experiment_legend(axs[0, 0], colors)
+
+    # One line per run of every experiment
+    for ax, column, title in ((axs[1, 0], 'Total Time (sec)', 'Total Time'), (axs[1, 1], 'Tput (ops/sec)', 'Throughput'), (axs[2, 0], 'Resp. Time (ms)', 'Response Time')):
+        add_lines(ax, data, 'Task-ID', column, ['experiment', 'Run-ID'], colors)
+        ax.set_title(title)
+        ax.set_xlabel('Task-ID')
+        ax.set_ylabel(column.replace('Resp.', 'Response'))
+
+    # Percentiles of every task and run, one scatter per percentile
+    for column, label in (('50th p (ms)', '50th'), ('95th p (ms)', '95th'), ('99th p (ms)', '99th'), ('999th p (ms)', '999th')):
+        axs[2, 1].scatter(data['Task-ID'], data[column], marker='_', s=100, label=label)
+    axs[2, 1].set_yscale('log', base=10)
+    axs[2, 1].set_title('Response Time Percentiles')
+    axs[2, 1].set_xlabel('Task-ID')
+    axs[2, 1].set_ylabel('Response Time (ms) log_10')
+    axs[2, 1].legend(loc='best')
 
-    # Adjust layout and save the plot
-    plt.tight_layout()
+    # a fixed layout, tight_layout would draw the figure once more
+    fig.subplots_adjust(left=0.05, right=0.98, bottom=0.05, top=0.94, wspace=0.12, hspace=0.2)
     try:
         plt.savefig(output_file)
         plt.close()
@@ -247,10 +293,301 @@ def plot_combined_summary(experiment_name_list: List[str],data_list: List[pd.Dat
         print(f"Error saving combined plot: {e}")
 
 
-def get_data():
-    files = os.listdir()
+def plot_faceted_summary(data: pd.DataFrame, output_file: str, metric: str = '99th p (ms)'):
+    """
+    Plots `metric` over throughput in a grid with one facet per thread count
+    (rows) and payload size (columns), instead of overplotting all
+    experiments in one axis.
+
+    :param data: Result of `combine_summaries`.
+    """
+    data = data.dropna(subset=['thread num', 'req size [B]'])
+    if data.empty:
+        print("No summaries with thread num and req size to plot")
+        return
+
+    mean_data = data.groupby(['experiment', 'async / sync', 'thread num', 'req size [B]', 'Task-ID'], as_index=False).mean(numeric_only=True)
+    threads = np.sort(mean_data['thread num'].unique())
+    payloads = np.sort(mean_data['req size [B]'].unique())
+    colors = experiment_colors(list(dict.fromkeys(data['experiment'])))
+
+    fig, axs = plt.subplots(len(threads), len(payloads), figsize=(4 * len(payloads) + 2, 3 * len(threads) + 1), sharex=True, sharey=True, squeeze=False)
+    fig.suptitle(f'{metric} vs Throughput by thread num and req size')
+
+    row = np.searchsorted(threads, mean_data['thread num'].to_numpy())
+    col = np.searchsorted(payloads, mean_data['req size [B]'].to_numpy())
+    facet = row * len(payloads) + col
+    for index, facet_data in mean_data.groupby(facet):
+        ax = axs.flat[index]
+        for mode, linestyle in (('sync', 'solid'), ('async', 'dashed')):
+            add_lines(ax, facet_data[facet_data['async / sync'] == mode], 'Tput (ops/sec)', metric, ['experiment'], colors, linestyles=linestyle)
+
+    for i, thread_num in enumerate(threads):
+        axs[i, 0].set_ylabel(f'{int(thread_num)} threads\n{metric}')
+    for j, payload in enumerate(payloads):
+        axs[0, j].set_title(f'{int(payload)} B')
+        axs[-1, j].set_xlabel('Throughput (ops/sec)')
+    axs[0, 0].set_yscale('log', base=10)
+    # labelled log minor ticks on every facet cost more than drawing the data
+    axs[0, 0].yaxis.set_minor_formatter(NullFormatter())
+
+    handles = [Line2D([], [], color=color, label=name) for name, color in colors.items()]
+    handles += [Line2D([], [], color='gray', linestyle='solid', label='sync'), Line2D([], [], color='gray', linestyle='dashed', label='async')]
+    fig.legend(handles=handles, loc='center right', fontsize='small')
+
+    # a fixed layout, tight_layout would draw every facet once more
+    fig.subplots_adjust(left=0.08, right=0.85, bottom=0.06, top=0.93, wspace=0.05, hspace=0.1)
+    try:
+        plt.savefig(output_file)
+        plt.close()
+        print(f"Faceted plot saved to {output_file}")
+    except Exception as e:
+        print(f"Error saving faceted plot: {e}")
+
+
+def plot_timeseries(series: pd.DataFrame, events: pd.DataFrame, output_file: str, title: str = "", faults: Optional[pd.DataFrame] = None):
+    """
+    Plots per second throughput and percentiles of a run with the logged
+    fault events as vertical lines, the time until the run recovered from
+    an event is shaded.
+
+    :param series: Result of `timeseries.aggregate_timeseries`.
+    :param events: Events with their `run time (s)` and `recovery (s)`, see `timeseries.event_recovery`.
+    :param faults: Faults injected by the runner, see `faults.fault_impact`, drawn from their start to their end.
+    """
+    fig, axs = plt.subplots(2, 1, figsize=(25, 12), sharex=True)
+    fig.suptitle(f'Latency over Time {title}')
+
+    axs[0].plot(series['time'], series['Tput (ops/sec)'], linestyle='-', linewidth=1)
+    axs[0].set_title('Throughput')
+    axs[0].set_ylabel('Throughput (ops/sec)')
+
+    for column in SERIES_PERCENTILES:
+        axs[1].plot(series['time'], series[column], linestyle='-', linewidth=1, label=column)
+    axs[1].set_yscale('log', base=10)
+    axs[1].set_title('Response Time Percentiles')
+    axs[1].set_ylabel('Response Time (ms) log_10')
+    axs[1].set_xlabel('Time (sec)')
+    axs[1].legend(loc='best')
+
+    for _, event in events.iterrows():
+        for ax in axs:
+            ax.axvline(event['run time (s)'], color='red', linestyle='--', linewidth=1)
+            if not pd.isna(event['recovery (s)']):
+                ax.axvspan(event['run time (s)'], event['run time (s)'] + event['recovery (s)'], color='red', alpha=0.1)
+        label = f"{event['action']} {event['bookie']}"
+        if not pd.isna(event['recovery (s)']):
+            label += f" ({event['recovery (s)']:.0f}s)"
+        axs[0].annotate(label, (event['run time (s)'], 1), xycoords=('data', 'axes fraction'), rotation=90, va='top', ha='right', fontsize=8)
+
+    for _, fault in (faults if faults is not None else pd.DataFrame()).iterrows():
+        for ax in axs:
+            ax.axvspan(fault['run time (s)'], fault['run time (s)'] + fault['duration (s)'], color='orange', alpha=0.3)
+        label = f"{fault['action']} {fault['bookie']}"
+        if not pd.isna(fault['recovery (s)']):
+            label += f" (+{fault['recovery (s)']:.0f}s)"
+        axs[0].annotate(label, (fault['run time (s)'], 1), xycoords=('data', 'axes fraction'), rotation=90, va='top', ha='right', fontsize=8)
+
+    plt.tight_layout()
+    try:
+        plt.savefig(output_file)
+        plt.close()
+        print(f"Timeseries plot saved to {output_file}")
+    except Exception as e:
+        print(f"Error saving timeseries plot: {e}")
+
+
+def get_timeseries(experiment_dir: str = ".", force: bool = False) -> Optional[str]:
+    """
+    Plots the latency over time of the newest run of an experiment that
+    recorded a timeseries, next to its timeseries csv.
 
-    experiment_name = os.path.basename(os.getcwd())
+    :return: The plot file, None if the experiment has no timeseries.
+    """
+    experiment_dir = os.path.abspath(experiment_dir)
+    files = find_timeseries(experiment_dir)
+    if len(files) == 0:
+        print(f"{os.path.basename(experiment_dir)} has no {TIMESERIES} file")
+        return None
+
+    output_file = files[0][: -len(".csv")] + ".png"
+    cache = BuildCache(experiment_dir)
+    if not force and cache.is_fresh("timeseries", [output_file]):
+        print(f"{os.path.basename(experiment_dir)} unchanged, keeping {output_file}")
+        return output_file
+
+    series, events, _ = run_series(files[0])
+    faults = run_fault_impact(files[0]) if os.path.exists(fault_log_for(files[0])) else None
+    plot_timeseries(series, events, output_file, os.path.basename(experiment_dir), faults)
+    if os.path.exists(output_file):
+        cache.update("timeseries")
+    return output_file
+
+
+def latency_bins(samples: np.ndarray, bins: int = DISTRIBUTION_BINS) -> np.ndarray:
+    """Log spaced bin edges covering all `samples`."""
+    positive = samples[samples > 0]
+    if positive.size == 0:
+        return np.geomspace(1e-3, 1.0, bins + 1)
+    lowest, highest = positive.min(), positive.max()
+    return np.geomspace(lowest, max(highest, lowest * 1.001), bins + 1)
+
+
+def latency_cdf(samples: np.ndarray, edges: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :return: The upper bin edges and the share of samples at or below them.
+    """
+    counts, _ = np.histogram(samples, bins=edges)
+    cdf = np.cumsum(counts) / max(1, samples.size)
+    return edges[1:], cdf
+
+
+def load_run_samples(latencies_paths: List[str]) -> Tuple[pd.DataFrame, str]:
+    """
+    Loads the raw samples of a run as `time`, `latency` and `task_id`.
+
+    The timestamps of a run recorded with --timeseries are used if present,
+    otherwise `time` is the number of the request within its client and
+    `task_id` comes from the task index (-1 for runs without one).
+    Converted store files are preferred over the csvs.
+
+    :return: The samples and the label of the `time` axis.
+    """
+    timeseries_path = telemetry_path_for(latencies_paths, TIMESERIES)
+    if os.path.exists(timeseries_path):
+        samples = load_timeseries(timeseries_path)
+        samples = samples[samples['task_id'] >= 0]
+        time = samples['timestamp'].to_numpy() - (samples['timestamp'].min() if len(samples) else 0.0)
+        return pd.DataFrame({'time': time, 'latency': samples['latency'].to_numpy(), 'task_id': samples['task_id'].to_numpy()}), 'time (s)'
+
+    frames = []
+    for latencies_path in latencies_paths:
+        path = store_path(latencies_path) if is_up_to_date(latencies_path) else latencies_path
+        if not os.path.exists(path):
+            continue
+        latencies = np.asarray(load_latencies(path), dtype=np.float64)
+        task_ids = np.full(latencies.size, -1, dtype=np.int64)
+        for boundary in find_task_boundaries(path) or []:
+            task_ids[boundary.sample_start:boundary.sample_start + boundary.sample_count] = boundary.task_id
+        frames.append(pd.DataFrame({'time': np.arange(latencies.size, dtype=np.float64), 'latency': latencies, 'task_id': task_ids}))
+    if len(frames) == 0:
+        return pd.DataFrame(columns=['time', 'latency', 'task_id']), 'request'
+    return pd.concat(frames, ignore_index=True), 'request (per client)'
+
+
+def plot_distribution(samples: pd.DataFrame, output_file: str, title: str = "", time_label: str = "time (s)"):
+    """
+    Plots the latency distribution of a run from its raw samples: an HDR
+    style percentile spectrum and a CDF per task, and a heatmap of the
+    latency over time.
+
+    All panels are drawn from NumPy histograms of log spaced latency bins,
+    never from the single samples, so the plot time barely depends on the
+    number of samples.
+
+    :param samples: Result of `load_run_samples`.
+    """
+    latencies = samples['latency'].to_numpy()
+    edges = latency_bins(latencies)
+
+    fig, axs = plt.subplots(1, 3, figsize=(25, 8))
+    fig.suptitle(f'Latency Distribution {title}')
+
+    groups = list(samples.groupby('task_id')['latency']) if samples['task_id'].nunique() > 1 else [(None, samples['latency'])]
+    for task_id, group in groups:
+        label = f'Task {task_id}' if task_id is not None and task_id >= 0 else 'all requests'
+        upper, cdf = latency_cdf(group.to_numpy(), edges)
+        axs[0].plot(1.0 / (1.0 - np.minimum(cdf, SPECTRUM_MAX)), upper, drawstyle='steps-post', linewidth=1, label=label)
+        axs[1].plot(upper, cdf, drawstyle='steps-post', linewidth=1, label=label)
+
+    # Percentile spectrum, the x axis spreads the tail: 90% -> 10, 99% -> 100, ...
+    ticks = [0.0, 0.9, 0.99, 0.999, 0.9999, 0.99999]
+    axs[0].set_xscale('log', base=10)
+    axs[0].set_yscale('log', base=10)
+    axs[0].set_xticks([1.0 / (1.0 - p) for p in ticks], [f'{p * 100:g}%' for p in ticks])
+    axs[0].xaxis.set_minor_formatter(NullFormatter())
+    axs[0].set_xlim(1, 1.0 / (1.0 - SPECTRUM_MAX))
+    axs[0].set_title('Percentile Spectrum')
+    axs[0].set_xlabel('Percentile')
+    axs[0].set_ylabel('Latency (ms) log_10')
+    axs[0].legend(loc='best', fontsize='small')
+
+    axs[1].set_xscale('log', base=10)
+    axs[1].set_title('CDF')
+    axs[1].set_xlabel('Latency (ms) log_10')
+    axs[1].set_ylabel('Share of requests')
+    axs[1].legend(loc='best', fontsize='small')
+
+    # Latency over time, requests per time and latency bin
+    times = samples['time'].to_numpy()
+    time_edges = np.linspace(times.min(), times.max() if times.max() > times.min() else times.min() + 1, HEATMAP_BINS[0] + 1) if times.size else np.linspace(0, 1, HEATMAP_BINS[0] + 1)
+    heat_edges = np.geomspace(edges[0], edges[-1], HEATMAP_BINS[1] + 1)
+    counts, _, _ = np.histogram2d(times, latencies, bins=[time_edges, heat_edges])
+    mesh = axs[2].pcolormesh(time_edges, heat_edges, np.ma.masked_equal(counts.T, 0), norm=LogNorm(), cmap='viridis')
+    fig.colorbar(mesh, ax=axs[2], label='Requests')
+    axs[2].set_yscale('log', base=10)
+    axs[2].set_title('Latency over Time')
+    axs[2].set_xlabel(time_label.capitalize())
+    axs[2].set_ylabel('Latency (ms) log_10')
+
+    # a fixed layout, tight_layout would draw the figure once more
+    fig.subplots_adjust(left=0.05, right=0.97, bottom=0.1, top=0.88, wspace=0.2)
+    try:
+        plt.savefig(output_file)
+        plt.close()
+        print(f"Distribution plot saved to {output_file}")
+    except Exception as e:
+        print(f"Error saving distribution plot: {e}")
+
+
+def get_distribution(experiment_dir: str = ".", force: bool = False) -> Optional[str]:
+    """
+    Plots the latency distribution of the newest run of an experiment from
+    its raw samples, next to its summary csv.
+
+    :return: The plot file, None if the run has no latency files.
+    """
+    experiment_dir = os.path.abspath(experiment_dir)
+    runs = sorted(find_runs(experiment_dir).items(), reverse=True)
+    if len(runs) == 0:
+        print(f"{os.path.basename(experiment_dir)} has no runs")
+        return None
+
+    summary_path, latencies_paths = runs[0]
+    output_file = summary_path[: -len(SUMMARY)] + DISTRIBUTION
+    cache = BuildCache(experiment_dir)
+    if not force and cache.is_fresh("distribution", [output_file]):
+        print(f"{os.path.basename(experiment_dir)} unchanged, keeping {output_file}")
+        return output_file
+
+    samples, time_label = load_run_samples(latencies_paths)
+    if samples.empty:
+        print(f"{os.path.basename(experiment_dir)} has no latency samples")
+        return None
+
+    plot_distribution(samples, output_file, os.path.basename(experiment_dir), time_label)
+    if os.path.exists(output_file):
+        cache.update("distribution")
+    return output_file
+
+
+def get_data(experiment_dir: str = ".", force: bool = False, index_path: Optional[str] = None) -> Optional[Tuple[str, pd.DataFrame]]:
+    """
+    Plots the newest summary of an experiment next to its summary csv.
+
+    The summary is read from the result index, only paths relative to
+    `experiment_dir` are used and the working directory is never changed so
+    experiments can be plotted in parallel worker processes.
+    The plot is skipped if no result file changed since it was last rendered,
+    unless `force` is set.
+
+    :param index_path: Result index that is up to date, the experiment is indexed first if None.
+    :return: Experiment name and summary data, None if the experiment has no results.
+    """
+    experiment_dir = os.path.abspath(experiment_dir)
+    files = os.listdir(experiment_dir)
+
+    experiment_name = os.path.basename(experiment_dir)
 
     if files is None or len(files) == 0:
         print(f"{ExperimentResult} was empty")
@@ -258,68 +595,93 @@ def get_data():
 
 
     if ExperimentResult not in files:
-        print(f"{ExperimentResult} not in {os.getcwd()}")
+        print(f"{ExperimentResult} not in {experiment_dir}")
         return
     
     if BENCHMARK not in files:
-        print(f"{BENCHMARK} not in {os.getcwd()}")
+        print(f"{BENCHMARK} not in {experiment_dir}")
         return
 
-    tasks = get_task_parameters()
-
-    os.chdir(ExperimentResult)
-    files = os.listdir()
-
-    if files is None or len(files) == 0:
-        print("ExperimentResult folder was empty")
-        sys.exit(1)
+    index = ResultIndex(index_path) if index_path is not None else open_index([experiment_dir])
+    with index:
+        runs = index.runs(experiment_dir)
+        if len(runs) == 0:
+            print(f"{ExperimentResult} folder of {experiment_name} has no summary")
+            return
 
-    files.sort(reverse=True)
+        summary_csv_file = index.summary(experiment_dir, runs[0])
+        newest_summary_csv_file = index.summary_file(experiment_dir, runs[0])
 
-    summary_csv_files = [file for file in files if file.endswith("summary.csv")]
-    #csv_files = [file for file in files if not (file.endswith("summary.csv") or file.endswith(".png"))]
-
-    newest_summary_csv_file = summary_csv_files[0]
-    #newest_csv_file = csv_files[0]
-
-
-    summary_csv_file = pd.read_csv(newest_summary_csv_file)
     output_file = newest_summary_csv_file.replace(".csv", ".png")
 
+    cache = BuildCache(experiment_dir)
+    if not force and cache.is_fresh("plot", [output_file]):
+        print(f"{experiment_name} unchanged, keeping {output_file}")
+        return experiment_name,summary_csv_file
+
+    tasks = get_task_parameters(experiment_dir)
     plot_summary(summary_csv_file,tasks,output_file)
-    #csv_file = pd.read_csv(newest_csv_file)
+    if os.path.exists(output_file):
+        cache.update("plot")
 
     return experiment_name,summary_csv_file
 
 
-def batch_traverse_and_cd(base_dir: str, fn):
-    abs_original_dir = os.path.abspath(os.getcwd())
-    try:
-        if not os.path.exists(base_dir):
-            print(f"Error: folder for experiment batch {base_dir} dos not exist")
-            sys.exit(1)
-        os.chdir(base_dir)
-        abs_base_dir = os.path.abspath(os.getcwd())
-        subdirs = [subdir for subdir in os.listdir(abs_base_dir) if os.path.isdir(os.path.join(abs_base_dir, subdir))]
-        for subdir in tqdm(subdirs,desc="Processing directories", unit="dir"):
-            subdir_path = os.path.join(abs_base_dir, subdir)
-            os.chdir(subdir_path)
-            fn()
-            os.chdir(abs_base_dir)
-                
-    finally:
-        os.chdir(abs_original_dir)
-
-def list_travers_and_cd(dir_list: List[str], fn):
-    working_directory = os.getcwd()
-    
-    for experiment_dir in tqdm(dir_list,desc="Processing directories", unit="dir"):
+def batch_experiment_dirs(base_dir: str) -> List[str]:
+    """Returns the experiment directories of a batch directory."""
+    if not os.path.exists(base_dir):
+        print(f"Error: folder for experiment batch {base_dir} dos not exist")
+        sys.exit(1)
+    abs_base_dir = os.path.abspath(base_dir)
+    return [os.path.join(abs_base_dir, subdir) for subdir in os.listdir(abs_base_dir) if os.path.isdir(os.path.join(abs_base_dir, subdir))]
+
+
+def list_experiment_dirs(dir_list: List[str]) -> List[str]:
+    """Returns the existing directories of `dir_list`."""
+    experiment_dirs = []
+    for experiment_dir in dir_list:
         if not os.path.exists(experiment_dir):
             print(f"Error: folder {experiment_dir} does not exist")
             continue
-        os.chdir(experiment_dir)
-        fn()
-        os.chdir(working_directory)
+        experiment_dirs.append(os.path.abspath(experiment_dir))
+    return experiment_dirs
+
+
+def plot_experiment(experiment_dir: str, force: bool = False, index_path: Optional[str] = None, timeseries: bool = False, distribution: bool = False) -> Optional[Tuple[str, pd.DataFrame]]:
+    """
+    Renders every requested plot of one experiment.
+
+    :param timeseries: Also plot the latency over time, see `get_timeseries`.
+    :param distribution: Also plot the latency distribution, see `get_distribution`.
+    :return: The result of `get_data`.
+    """
+    result = get_data(experiment_dir, force=force, index_path=index_path)
+    if timeseries:
+        get_timeseries(experiment_dir, force=force)
+    if distribution:
+        get_distribution(experiment_dir, force=force)
+    return result
+
+
+def plot_experiments(experiment_dirs: List[str], jobs: int = 1, force: bool = False, timeseries: bool = False, distribution: bool = False) -> List[Optional[Tuple[str, pd.DataFrame]]]:
+    """
+    Plots every experiment, with `jobs` > 1 each experiment is rendered in a worker process.
+
+    The result index is updated once up front, the workers only read from it.
+
+    :return: The results of `get_data` in the order of `experiment_dirs`.
+    """
+    if len(experiment_dirs) == 0:
+        return []
+    with open_index(experiment_dirs) as index:
+        index_path = index.path
+    plot = partial(plot_experiment, force=force, index_path=index_path, timeseries=timeseries, distribution=distribution)
+    if jobs <= 1:
+        return [plot(experiment_dir) for experiment_dir in tqdm(experiment_dirs, desc="Processing directories", unit="dir")]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(plot, experiment_dirs)
+        return list(tqdm(results, total=len(experiment_dirs), desc="Processing directories", unit="dir"))
 
 
 if __name__ == "__main__":
@@ -327,6 +689,11 @@ if __name__ == "__main__":
 
     parser.add_argument('-d', action='store_true', help="Optional '-d' flag, indicates that only one directory is allowed.")
     parser.add_argument('-c', action='store_true', help="Optional '-d' plots a combined plot or not")
+    parser.add_argument('-j', type=int, default=1, help="Number of worker processes rendering plots in parallel.")
+    parser.add_argument('-f', action='store_true', help="Re-render plots even if no result file changed.")
+    parser.add_argument('-g', action='store_true', help="Also write a combined plot with one facet per thread num and req size (combined_grid.png).")
+    parser.add_argument('-r', action='store_true', help="Also plot the latency distribution of the newest run from its raw samples: percentile spectrum, CDF and latency over time heatmap.")
+    parser.add_argument('-t', action='store_true', help="Also plot the latency over time and the fault events of the newest run with a timeseries.")
     parser.add_argument('directories', nargs='+', help="One or more experiment directories.")
 
     args = parser.parse_args()
@@ -335,24 +702,26 @@ if __name__ == "__main__":
         print("Usage: python plot.py -d <experiment_directory> <experiment_directory> ...")
         sys.exit(1)
 
-
-    all_files = []
-
     if args.d is True:
-        batch_dir = args.directories[0]
-        batch_traverse_and_cd(batch_dir, lambda: all_files.append(get_data()))
+        experiment_dirs = batch_experiment_dirs(args.directories[0])
     else:
-        list_dir = args.directories
-        list_travers_and_cd(list_dir, lambda: all_files.append(get_data()))
+        experiment_dirs = list_experiment_dirs(args.directories)
 
-    if args.c is False:
+    all_files = plot_experiments(experiment_dirs, jobs=args.j, force=args.f, timeseries=args.t, distribution=args.r)
+
+    if args.c is False and args.g is False:
         sys.exit(0)
     else:
         all_files = [file for file in all_files if file is not None]
         all_files = [(name,data) for name, data in all_files if name is not None and data is not None]
-
+        if len(all_files) == 0:
+            print("No summaries to combine")
+            sys.exit(1)
 
         experiment_name_list, data_list = zip(*all_files)
 
-        output_file = "combined_plot.png"
-        plot_combined_summary(list(experiment_name_list), list(data_list), output_file)
+        if args.c is True:
+            output_file = "combined_plot.png"
+            plot_combined_summary(list(experiment_name_list), list(data_list), output_file)
+        if args.g is True:
+            plot_faceted_summary(combine_summaries(list(experiment_name_list), list(data_list)), "combined_grid.png")
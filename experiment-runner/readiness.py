@@ -0,0 +1,69 @@
+import os
+from time import monotonic, sleep
+from typing import Optional
+
+from colorama import Fore, init
+from kazoo.client import KazooClient
+import yaml
+
+from zookeeper import get_available_bookies
+
+init(autoreset=True)  # Ensure automatic color reset
+
+READY_TIMEOUT = 120
+PROBE_INTERVAL = 0.5
+CONNECT_TIMEOUT = 5
+BOOKIE_IMAGE = "apache/bookkeeper"
+
+
+def expected_bookie_count(compose_file: str) -> Optional[int]:
+    """
+    Counts the bookie containers a docker-compose.yml starts.
+
+    :return: The number of bookies or None if the file does not exist.
+    """
+    if not os.path.exists(compose_file):
+        return None
+
+    with open(compose_file, "r") as file:
+        compose = yaml.safe_load(file) or {}
+
+    count = 0
+    for service in (compose.get("services") or {}).values():
+        if str(service.get("image", "")).startswith(BOOKIE_IMAGE):
+            count += int(((service.get("deploy") or {}).get("replicas")) or 1)
+    return count
+
+
+def wait_for_cluster(zk: str, expected_bookies: Optional[int] = None, timeout: float = READY_TIMEOUT) -> bool:
+    """
+    Polls ZooKeeper until it accepts a session and enough bookies registered as available.
+
+    :param zk: ZooKeeper connection string.
+    :param expected_bookies: Number of bookies that have to be available, at least one if None.
+    :param timeout: Seconds to wait at most.
+    :return: True as soon as the cluster is usable, False after `timeout`.
+    """
+    required = max(1, expected_bookies or 1)
+    deadline = monotonic() + timeout
+    zk_client = KazooClient(hosts=zk)
+    bookies = []
+    try:
+        while True:
+            try:
+                if not zk_client.connected:
+                    zk_client.start(timeout=max(0.1, min(CONNECT_TIMEOUT, deadline - monotonic())))
+                bookies = get_available_bookies(zk_client)
+                if len(bookies) >= required:
+                    return True
+            except Exception:
+                # not reachable or bookies not registered yet, probe again
+                pass
+
+            if monotonic() >= deadline:
+                print(Fore.RED + f"Cluster {zk} not ready after {timeout}s, {len(bookies)}/{required} bookies available")
+                return False
+            sleep(PROBE_INTERVAL)
+    finally:
+        zk_client.stop()
+        zk_client.close()
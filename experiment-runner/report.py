@@ -0,0 +1,467 @@
+import argparse
+import html
+import json
+import math
+import os
+import sys
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from confidence import find_runs
+from latencies import find_experiment_dirs
+from plot import load_run_samples
+from result_index import open_index
+from summerize_csv import parse_and_validate_name
+
+REPORT = "report.html"
+
+# buckets over the whole run of every embedded level, the browser switches to
+# the finer level once a zoomed view has fewer buckets than pixels
+REPORT_LEVELS = (1000, 10000)
+# points of the LTTB downsampled latency line
+LINE_POINTS = 2000
+
+INDEX_COLUMNS = {
+    'experiment': 'experiment',
+    'run': 'run',
+    'run_id': 'Run-ID',
+    'task_id': 'Task-ID',
+    'mode': 'async / sync',
+    'num_threads': 'thread num',
+    'payload_size': 'req size [B]',
+    'throughput': 'intended load (ops/s)',
+    'tput': 'Tput (ops/sec)',
+    'resp_time': 'Resp. Time (ms)',
+    'p50': '50th p (ms)',
+    'p95': '95th p (ms)',
+    'p99': '99th p (ms)',
+    'p999': '999th p (ms)',
+}
+
+
+def minmax_buckets(x: np.ndarray, y: np.ndarray, start: float, end: float, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum and maximum of `y` in `buckets` equally wide buckets of `x`
+    between `start` and `end`, NaN for empty buckets.
+
+    The samples are sorted once by bucket, the extremes of all buckets are
+    then reduced at the bucket starts.
+    """
+    mins = np.full(buckets, np.nan)
+    maxs = np.full(buckets, np.nan)
+    if x.size == 0:
+        return mins, maxs
+
+    width = (end - start) / buckets if end > start else 1.0
+    index = np.clip(np.floor((x - start) / width).astype(np.int64), 0, buckets - 1)
+    order = np.argsort(index, kind='stable')
+    index, values = index[order], y[order]
+
+    counts = np.bincount(index, minlength=buckets)
+    occupied = np.flatnonzero(counts)
+    starts = (np.cumsum(counts) - counts)[occupied]
+    mins[occupied] = np.minimum.reduceat(values, starts)
+    maxs[occupied] = np.maximum.reduceat(values, starts)
+    return mins, maxs
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int = LINE_POINTS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Largest-Triangle-Three-Buckets downsampling: keeps the first and last
+    point and from every bucket in between the point that spans the largest
+    triangle with the point kept before and the mean of the next bucket,
+    which preserves the spikes a plain average would flatten.
+
+    :param x: Sorted x values.
+    """
+    if x.size <= points or points < 3:
+        return x, y
+
+    edges = np.linspace(1, x.size - 1, points - 1).astype(np.int64)
+    kept = np.empty(points, dtype=np.int64)
+    kept[0], kept[-1] = 0, x.size - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < edges.size else x.size
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return x[kept], y[kept]
+
+
+def _json_values(values: np.ndarray) -> List[Optional[float]]:
+    """Rounded values with NaN as null, json has no NaN."""
+    return [None if math.isnan(value) else value for value in np.round(values.astype(np.float64), 3).tolist()]
+
+
+def downsample_run(latencies_paths: List[str], levels=REPORT_LEVELS, points: int = LINE_POINTS) -> Optional[Dict]:
+    """
+    The downsampled latency series of one run as embedded in the report.
+
+    :return: None if the run has no samples.
+    """
+    samples, time_label = load_run_samples(latencies_paths)
+    if samples.empty:
+        return None
+
+    samples = samples.sort_values('time', kind='stable')
+    x = samples['time'].to_numpy(dtype=np.float64)
+    y = samples['latency'].to_numpy(dtype=np.float64)
+    start, end = float(x[0]), float(x[-1])
+    if end <= start:
+        end = start + 1.0
+
+    series_levels = []
+    for buckets in levels:
+        mins, maxs = minmax_buckets(x, y, start, end, buckets)
+        series_levels.append({'width': (end - start) / buckets, 'min': _json_values(mins), 'max': _json_values(maxs)})
+
+    line_x, line_y = lttb(x, y, points)
+    tasks = samples[samples['task_id'] >= 0].groupby('task_id')['time'].min().sort_values()
+    return {
+        'x_label': time_label,
+        'samples': int(x.size),
+        'start': start,
+        'end': end,
+        'levels': series_levels,
+        'line': {'x': _json_values(line_x), 'y': _json_values(line_y)},
+        'tasks': [[round(float(time), 3), int(task_id)] for task_id, time in tasks.items()],
+    }
+
+
+def campaign_dirs(directories: List[str]) -> Dict[str, List[str]]:
+    """Experiment directories grouped by their campaign, the directory above them."""
+    campaigns = {}
+    for directory in directories:
+        for experiment_dir in find_experiment_dirs(directory):
+            experiment_dir = os.path.abspath(experiment_dir)
+            campaigns.setdefault(os.path.dirname(experiment_dir), []).append(experiment_dir)
+    return campaigns
+
+
+def build_report(campaign_dir: str, experiment_dirs: List[str], newest_only: bool = False) -> Dict:
+    """The data of a campaign report: the result index rows and the series of every run."""
+    with open_index(experiment_dirs) as index:
+        relative_dirs = [os.path.relpath(experiment_dir, index.root) for experiment_dir in experiment_dirs]
+        placeholders = ", ".join("?" * len(relative_dirs))
+        rows = index.query(
+            f"SELECT {', '.join(INDEX_COLUMNS)} FROM summaries WHERE experiment_dir IN ({placeholders}) AND warmup = 0 ORDER BY experiment, run, rowid",
+            relative_dirs,
+        )
+
+    runs = []
+    for experiment_dir in tqdm(experiment_dirs, desc="Downsampling runs", unit="dir"):
+        experiment_runs = sorted(find_runs(experiment_dir).items(), reverse=True)
+        if newest_only:
+            experiment_runs = experiment_runs[:1]
+        for summary_path, latencies_paths in experiment_runs:
+            series = downsample_run(latencies_paths)
+            if series is None:
+                continue
+            series['experiment'] = os.path.basename(experiment_dir)
+            series['run'] = parse_and_validate_name(os.path.basename(summary_path)).experiment_time
+            runs.append(series)
+
+    rows = rows.astype(object).where(pd.notna(rows), None)
+    return {
+        'campaign': os.path.basename(campaign_dir),
+        'columns': list(INDEX_COLUMNS.values()),
+        'index': rows.values.tolist(),
+        'runs': runs,
+    }
+
+
+def write_report(report: Dict, output_file: str) -> None:
+    # "</" would end the script element the data is embedded in
+    data = json.dumps(report, separators=(',', ':'), allow_nan=False).replace("</", "<\\/")
+    page = TEMPLATE.replace("{{title}}", html.escape(f"Campaign {report['campaign']}")).replace("{{data}}", data)
+    with open(output_file, "w", encoding="utf-8") as file:
+        file.write(page)
+
+
+TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{{title}}</title>
+<style>
+body { font-family: sans-serif; margin: 1em; color: #222; }
+h1 { font-size: 1.4em; }
+#layout { display: flex; gap: 1em; }
+#runs { width: 22em; max-height: 36em; overflow-y: auto; border: 1px solid #ccc; }
+#runs div { padding: 2px 6px; cursor: pointer; font-size: 0.85em; }
+#runs div.selected { background: #1f77b4; color: white; }
+#chart { flex: 1; }
+canvas { border: 1px solid #ccc; width: 100%; height: 32em; cursor: crosshair; }
+#status { font-size: 0.85em; height: 1.4em; }
+table { border-collapse: collapse; font-size: 0.8em; margin-top: 1em; }
+th, td { border: 1px solid #ddd; padding: 2px 6px; text-align: right; }
+th { cursor: pointer; background: #f3f3f3; position: sticky; top: 0; }
+tr:hover td { background: #eef; }
+#table { max-height: 30em; overflow-y: auto; }
+</style>
+</head>
+<body>
+<h1>{{title}}</h1>
+<div id="layout">
+  <div id="runs"></div>
+  <div id="chart">
+    <label><input type="checkbox" id="log"> log latency axis</label>
+    <span style="font-size: 0.85em"> &mdash; drag to zoom, wheel to zoom around the cursor, double click to reset</span>
+    <canvas id="canvas"></canvas>
+    <div id="status"></div>
+  </div>
+</div>
+<input id="filter" placeholder="filter rows" style="margin-top: 1em">
+<div id="table"></div>
+<script type="application/json" id="data">{{data}}</script>
+<script>
+"use strict";
+const report = JSON.parse(document.getElementById("data").textContent);
+const canvas = document.getElementById("canvas");
+const ctx = canvas.getContext("2d");
+const margin = {left: 60, right: 10, top: 10, bottom: 30};
+let run = null, view = null, drag = null;
+
+function level(run, from, to, pixels) {
+  // finest level whose visible buckets still fit the pixels, pixels are merged below
+  for (const candidate of run.levels) {
+    if ((to - from) / candidate.width >= pixels) return candidate;
+  }
+  return run.levels[run.levels.length - 1];
+}
+
+function columns(run, from, to, pixels) {
+  const lvl = level(run, from, to, pixels);
+  const mins = new Array(pixels).fill(Infinity), maxs = new Array(pixels).fill(-Infinity);
+  const first = Math.max(0, Math.floor((from - run.start) / lvl.width));
+  const last = Math.min(lvl.min.length - 1, Math.ceil((to - run.start) / lvl.width));
+  for (let i = first; i <= last; i++) {
+    if (lvl.min[i] === null) continue;
+    const x = run.start + (i + 0.5) * lvl.width;
+    const p = Math.floor((x - from) / (to - from) * pixels);
+    if (p < 0 || p >= pixels) continue;
+    mins[p] = Math.min(mins[p], lvl.min[i]);
+    maxs[p] = Math.max(maxs[p], lvl.max[i]);
+  }
+  return {mins, maxs};
+}
+
+function ticks(from, to, count) {
+  const step = Math.pow(10, Math.floor(Math.log10((to - from) / count)));
+  const nice = [1, 2, 5, 10].map(f => f * step).find(s => (to - from) / s <= count);
+  const result = [];
+  for (let t = Math.ceil(from / nice) * nice; t <= to; t += nice) result.push(t);
+  return result;
+}
+
+function draw() {
+  const width = canvas.width = canvas.clientWidth * devicePixelRatio;
+  const height = canvas.height = canvas.clientHeight * devicePixelRatio;
+  ctx.setTransform(devicePixelRatio, 0, 0, devicePixelRatio, 0, 0);
+  const w = canvas.clientWidth, h = canvas.clientHeight;
+  ctx.clearRect(0, 0, w, h);
+  if (run === null) return;
+
+  const plotW = w - margin.left - margin.right, plotH = h - margin.top - margin.bottom;
+  const pixels = Math.max(1, Math.floor(plotW));
+  const {mins, maxs} = columns(run, view[0], view[1], pixels);
+  const log = document.getElementById("log").checked;
+  let lo = Infinity, hi = -Infinity;
+  for (let i = 0; i < pixels; i++) {
+    if (mins[i] === Infinity) continue;
+    lo = Math.min(lo, mins[i]); hi = Math.max(hi, maxs[i]);
+  }
+  if (lo === Infinity) { lo = 0; hi = 1; }
+  if (log) { lo = Math.log10(Math.max(lo, 1e-3)); hi = Math.log10(Math.max(hi, 1e-3)); }
+  if (hi <= lo) hi = lo + 1;
+  const yOf = v => margin.top + plotH - ((log ? Math.log10(Math.max(v, 1e-3)) : v) - lo) / (hi - lo) * plotH;
+  const xOf = t => margin.left + (t - view[0]) / (view[1] - view[0]) * plotW;
+
+  // min/max envelope, one vertical line per pixel column
+  ctx.strokeStyle = "rgba(31, 119, 180, 0.45)";
+  ctx.beginPath();
+  for (let i = 0; i < pixels; i++) {
+    if (mins[i] === Infinity) continue;
+    const x = margin.left + i + 0.5;
+    ctx.moveTo(x, yOf(mins[i])); ctx.lineTo(x, Math.min(yOf(maxs[i]), yOf(mins[i]) - 1));
+  }
+  ctx.stroke();
+
+  // LTTB line
+  ctx.strokeStyle = "#d62728";
+  ctx.beginPath();
+  let started = false;
+  for (let i = 0; i < run.line.x.length; i++) {
+    const t = run.line.x[i];
+    if (t < view[0] || t > view[1]) continue;
+    const x = xOf(t), y = yOf(run.line.y[i]);
+    if (started) ctx.lineTo(x, y); else { ctx.moveTo(x, y); started = true; }
+  }
+  ctx.stroke();
+
+  // task starts
+  ctx.setLineDash([4, 4]);
+  ctx.strokeStyle = "#555";
+  ctx.fillStyle = "#555";
+  ctx.font = "11px sans-serif";
+  for (const [t, task] of run.tasks) {
+    if (t < view[0] || t > view[1]) continue;
+    ctx.beginPath(); ctx.moveTo(xOf(t), margin.top); ctx.lineTo(xOf(t), margin.top + plotH); ctx.stroke();
+    ctx.fillText("Task " + task, xOf(t) + 3, margin.top + 12);
+  }
+  ctx.setLineDash([]);
+
+  // axes
+  ctx.strokeStyle = "#222";
+  ctx.strokeRect(margin.left, margin.top, plotW, plotH);
+  ctx.fillStyle = "#222";
+  ctx.textAlign = "center";
+  for (const t of ticks(view[0], view[1], 8)) ctx.fillText(+t.toPrecision(6), xOf(t), h - margin.bottom + 14);
+  ctx.fillText(run.x_label, margin.left + plotW / 2, h - 3);
+  ctx.textAlign = "right";
+  for (const t of ticks(lo, hi, 6)) {
+    const value = log ? Math.pow(10, t) : t;
+    ctx.fillText(+value.toPrecision(4), margin.left - 4, yOf(value) + 4);
+  }
+  ctx.save(); ctx.translate(12, margin.top + plotH / 2); ctx.rotate(-Math.PI / 2);
+  ctx.textAlign = "center"; ctx.fillText("latency (ms)", 0, 0); ctx.restore();
+  ctx.textAlign = "left";
+
+  if (drag !== null) {
+    ctx.fillStyle = "rgba(0, 0, 0, 0.1)";
+    ctx.fillRect(Math.min(drag[0], drag[1]), margin.top, Math.abs(drag[1] - drag[0]), plotH);
+  }
+}
+
+function timeAt(event) {
+  const rect = canvas.getBoundingClientRect();
+  const plotW = rect.width - margin.left - margin.right;
+  const px = Math.min(Math.max(event.clientX - rect.left, margin.left), margin.left + plotW);
+  return {px, t: view[0] + (px - margin.left) / plotW * (view[1] - view[0])};
+}
+
+canvas.addEventListener("mousedown", e => { if (run) { const {px} = timeAt(e); drag = [px, px]; } });
+canvas.addEventListener("mousemove", e => {
+  if (!run) return;
+  const {px, t} = timeAt(e);
+  if (drag !== null) { drag[1] = px; draw(); }
+  const pixels = Math.max(1, Math.floor(canvas.clientWidth - margin.left - margin.right));
+  const {mins, maxs} = columns(run, view[0], view[1], pixels);
+  const i = Math.min(pixels - 1, Math.floor(px - margin.left));
+  const range = mins[i] === Infinity ? "no requests" : "min " + mins[i] + " ms, max " + maxs[i] + " ms";
+  document.getElementById("status").textContent = run.x_label + " " + t.toFixed(2) + ": " + range;
+});
+canvas.addEventListener("mouseup", e => {
+  if (drag === null) return;
+  const rect = canvas.getBoundingClientRect();
+  const plotW = rect.width - margin.left - margin.right;
+  const [a, b] = [Math.min(...drag), Math.max(...drag)].map(px => view[0] + (px - margin.left) / plotW * (view[1] - view[0]));
+  drag = null;
+  if (b - a > 1e-9 * (run.end - run.start)) view = [a, b];
+  draw();
+});
+canvas.addEventListener("dblclick", () => { if (run) { view = [run.start, run.end]; draw(); } });
+canvas.addEventListener("wheel", e => {
+  if (!run) return;
+  e.preventDefault();
+  const {t} = timeAt(e);
+  const factor = e.deltaY > 0 ? 1.25 : 0.8;
+  view = [Math.max(run.start, t - (t - view[0]) * factor), Math.min(run.end, t + (view[1] - t) * factor)];
+  draw();
+}, {passive: false});
+document.getElementById("log").addEventListener("change", draw);
+window.addEventListener("resize", draw);
+
+function select(index) {
+  run = report.runs[index];
+  view = [run.start, run.end];
+  document.querySelectorAll("#runs div").forEach((div, i) => div.classList.toggle("selected", i === index));
+  draw();
+}
+
+const runList = document.getElementById("runs");
+report.runs.forEach((r, i) => {
+  const div = document.createElement("div");
+  div.textContent = r.experiment + " " + r.run + " (" + r.samples.toLocaleString() + " requests)";
+  div.addEventListener("click", () => select(i));
+  runList.appendChild(div);
+});
+
+let sortColumn = -1, ascending = true;
+function renderTable() {
+  const filter = document.getElementById("filter").value.toLowerCase();
+  let rows = report.index.filter(row => row.join(" ").toLowerCase().includes(filter));
+  if (sortColumn >= 0) {
+    rows = rows.slice().sort((a, b) => {
+      const x = a[sortColumn], y = b[sortColumn];
+      const order = typeof x === "number" && typeof y === "number" ? x - y : String(x).localeCompare(String(y));
+      return ascending ? order : -order;
+    });
+  }
+  const head = "<tr>" + report.columns.map((c, i) => "<th data-i='" + i + "'>" + c + "</th>").join("") + "</tr>";
+  const escape = v => v === null ? "" : String(typeof v === "number" ? +v.toFixed(3) : v).replace(/[&<>]/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;"})[c]);
+  const body = rows.map(row => "<tr>" + row.map(v => "<td>" + escape(v) + "</td>").join("") + "</tr>").join("");
+  document.getElementById("table").innerHTML = "<table>" + head + body + "</table>";
+  document.querySelectorAll("#table th").forEach(th => th.addEventListener("click", () => {
+    const i = +th.dataset.i;
+    ascending = sortColumn === i ? !ascending : true;
+    sortColumn = i;
+    renderTable();
+  }));
+  document.querySelectorAll("#table tr").forEach((tr, i) => {
+    if (i === 0) return;
+    const row = rows[i - 1];
+    const match = report.runs.findIndex(r => r.experiment === row[0] && r.run === row[1]);
+    if (match >= 0) { tr.style.cursor = "pointer"; tr.addEventListener("click", () => select(match)); }
+  });
+}
+document.getElementById("filter").addEventListener("input", renderTable);
+renderTable();
+if (report.runs.length > 0) select(0);
+</script>
+</body>
+</html>
+"""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write one self-contained, interactive HTML report per campaign.")
+
+    parser.add_argument('-n', action='store_true', help="Only embed the newest run of every experiment.")
+    parser.add_argument('-o', type=str, default=None, help=f"Output file, default {REPORT} in every campaign directory. Only valid for a single campaign.")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+
+    directories = []
+    for directory in args.directories:
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            continue
+        directories.append(directory)
+
+    campaigns = campaign_dirs(directories)
+    if len(campaigns) == 0:
+        print("No experiment results found")
+        sys.exit(1)
+    if args.o is not None and len(campaigns) > 1:
+        print("-o can only be used for a single campaign")
+        sys.exit(1)
+
+    for campaign_dir, experiment_dirs in sorted(campaigns.items()):
+        started = monotonic()
+        report = build_report(campaign_dir, experiment_dirs, newest_only=args.n)
+        output_file = args.o or os.path.join(campaign_dir, REPORT)
+        write_report(report, output_file)
+        size = os.path.getsize(output_file) / (1 << 20)
+        samples = sum(run['samples'] for run in report['runs'])
+        print(f"Report of {len(report['runs'])} runs ({samples} requests) saved to {output_file} ({size:.1f} MB, {monotonic() - started:.1f}s)")
@@ -0,0 +1,277 @@
+import argparse
+import os
+import sqlite3
+import sys
+from time import monotonic
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import yaml
+
+from aggregate import SUMMARY_COLUMNS
+from latencies import find_experiment_dirs
+from latency_store import BENCHMARK, ExperimentResult
+from summerize_csv import CLIENT_SUMMARY, SUMMARY, parse_and_validate_name
+
+INDEX = "results.sqlite"
+
+# summary csv column -> index column
+COLUMNS = dict(zip(SUMMARY_COLUMNS, [
+    'task_id', 'mode', 'throughput', 'num_threads', 'runtime', 'payload_size',
+    'total_time', 'tput', 'resp_time',
+    'p50', 'p95', 'p99', 'p999',
+]))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    experiment_dir TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    file TEXT NOT NULL,
+    experiment_dir TEXT NOT NULL,
+    campaign TEXT NOT NULL,
+    experiment TEXT NOT NULL,
+    run TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    task_key TEXT,
+    warmup INTEGER NOT NULL,
+    repetitions INTEGER,
+    clients INTEGER,
+    task_id INTEGER NOT NULL,
+    mode TEXT,
+    throughput REAL,
+    num_threads INTEGER,
+    runtime TEXT,
+    payload_size INTEGER,
+    total_time REAL,
+    tput REAL,
+    resp_time REAL,
+    p50 REAL,
+    p95 REAL,
+    p99 REAL,
+    p999 REAL
+);
+CREATE INDEX IF NOT EXISTS summaries_run ON summaries (experiment_dir, run);
+CREATE INDEX IF NOT EXISTS summaries_params ON summaries (mode, num_threads, payload_size, throughput);
+"""
+
+
+def default_index_path(directories: List[str]) -> str:
+    """
+    The index shared by `directories`: an existing index in their common
+    directory or above it, otherwise a new one in the common directory, or
+    next to it if that is a single experiment.
+    """
+    common = os.path.commonpath([os.path.abspath(directory) for directory in directories])
+    parent = common
+    while True:
+        if os.path.exists(os.path.join(parent, INDEX)):
+            return os.path.join(parent, INDEX)
+        if os.path.dirname(parent) == parent:
+            break
+        parent = os.path.dirname(parent)
+
+    if os.path.isdir(os.path.join(common, ExperimentResult)):
+        common = os.path.dirname(common)
+    return os.path.join(common, INDEX)
+
+
+def _benchmark_tasks(experiment_dir: str) -> Tuple[Dict[int, str], Dict]:
+    """Task keys by task id and the config section of an experiment's benchmark.yml."""
+    try:
+        with open(os.path.join(experiment_dir, BENCHMARK), "r") as file:
+            config_data = yaml.safe_load(file) or {}
+    except (OSError, yaml.YAMLError):
+        return {}, {}
+    tasks = {task.get("task_id"): key for key, task in (config_data.get("tasks") or {}).items()}
+    return tasks, config_data.get("config") or {}
+
+
+class ResultIndex:
+    """
+    Every row of every summary csv below a set of directories in one SQLite
+    database, with the experiment, run and task parameters.
+
+    `update` only reads summaries that were added or changed since the last
+    update (by modification time and size) and drops the rows of removed
+    ones, so keeping the index current costs one directory listing per
+    experiment. Paths are stored relative to the database, the index can
+    be moved with the experiments.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.root = os.path.dirname(self.path)
+        os.makedirs(self.root, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=60)
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "ResultIndex":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _summary_files(self, experiment_dir: str) -> List[str]:
+        result_dir = os.path.join(experiment_dir, ExperimentResult)
+        if not os.path.isdir(result_dir):
+            return []
+        return [
+            os.path.join(result_dir, file) for file in sorted(os.listdir(result_dir))
+            if file.endswith(SUMMARY) and not CLIENT_SUMMARY.search(file)
+        ]
+
+    def _read_summary(self, summary_path: str, experiment_dir: str, task_keys: Dict[int, str], config: Dict) -> pd.DataFrame:
+        summary = pd.read_csv(summary_path)
+        summary = summary[[column for column in SUMMARY_COLUMNS if column in summary.columns]].rename(columns=COLUMNS)
+        run = parse_and_validate_name(os.path.basename(summary_path)).experiment_time
+
+        summary.insert(0, 'file', self._relative(summary_path))
+        summary.insert(1, 'experiment_dir', self._relative(experiment_dir))
+        summary.insert(2, 'campaign', os.path.basename(os.path.dirname(os.path.abspath(experiment_dir))))
+        summary.insert(3, 'experiment', os.path.basename(os.path.abspath(experiment_dir)))
+        summary.insert(4, 'run', run)
+        # repetitions of a task follow each other in the order they ran
+        summary.insert(5, 'run_id', summary.groupby('task_id').cumcount() + 1)
+        summary['task_key'] = summary['task_id'].map(task_keys)
+        summary['warmup'] = (summary['task_key'] == "warmup").astype(int)
+        summary['repetitions'] = config.get("repetitions")
+        summary['clients'] = (config.get("client") or {}).get("count", 1)
+        return summary
+
+    def update(self, directories: Iterable[str]) -> Tuple[int, int]:
+        """
+        Indexes new and changed summaries of every experiment below `directories`.
+
+        A changed benchmark.yml re-indexes all summaries of its experiment.
+
+        :return: The number of (re-)indexed and removed summary files.
+        """
+        indexed = 0
+        removed = 0
+        known = {path: (experiment_dir, mtime_ns, size) for path, experiment_dir, mtime_ns, size in self.connection.execute("SELECT path, experiment_dir, mtime_ns, size FROM files")}
+
+        with self.connection:
+            for directory in directories:
+                scanned = set()
+                for experiment_dir in find_experiment_dirs(directory):
+                    relative_dir = self._relative(experiment_dir)
+                    benchmark_path = os.path.join(experiment_dir, BENCHMARK)
+                    files = self._summary_files(experiment_dir) + ([benchmark_path] if os.path.exists(benchmark_path) else [])
+
+                    stats = {}
+                    for file in files:
+                        stat = os.stat(file)
+                        stats[self._relative(file)] = (relative_dir, stat.st_mtime_ns, stat.st_size)
+                    scanned.update(stats)
+
+                    benchmark_changed = stats.get(self._relative(benchmark_path)) != known.get(self._relative(benchmark_path))
+                    changed = [file for file in files if file.endswith(SUMMARY) and (benchmark_changed or stats[self._relative(file)] != known.get(self._relative(file)))]
+                    if not changed and not benchmark_changed:
+                        continue
+
+                    task_keys, config = _benchmark_tasks(experiment_dir)
+                    for file in changed:
+                        self.connection.execute("DELETE FROM summaries WHERE file = ?", (self._relative(file),))
+                        self._read_summary(file, experiment_dir, task_keys, config).to_sql("summaries", self.connection, if_exists="append", index=False)
+                        indexed += 1
+                    self.connection.executemany(
+                        "INSERT OR REPLACE INTO files (path, experiment_dir, mtime_ns, size) VALUES (?, ?, ?, ?)",
+                        [(path, *values) for path, values in stats.items()],
+                    )
+
+                # files below the directory that disappeared
+                prefix = self._relative(directory)
+                for path in known:
+                    in_directory = prefix == os.curdir or path == prefix or path.startswith(prefix + os.sep)
+                    if in_directory and path not in scanned:
+                        self.connection.execute("DELETE FROM files WHERE path = ?", (path,))
+                        if path.endswith(SUMMARY):
+                            self.connection.execute("DELETE FROM summaries WHERE file = ?", (path,))
+                            removed += 1
+        return indexed, removed
+
+    def query(self, sql: str, parameters: Iterable = ()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection, params=tuple(parameters))
+
+    def runs(self, experiment_dir: str) -> List[str]:
+        """Runs of an experiment, newest first."""
+        rows = self.connection.execute(
+            "SELECT DISTINCT run FROM summaries WHERE experiment_dir = ? ORDER BY run DESC",
+            (self._relative(experiment_dir),),
+        )
+        return [run for run, in rows]
+
+    def summary_file(self, experiment_dir: str, run: str) -> Optional[str]:
+        """Path of the summary csv of a run."""
+        row = self.connection.execute(
+            "SELECT file FROM summaries WHERE experiment_dir = ? AND run = ? LIMIT 1",
+            (self._relative(experiment_dir), run),
+        ).fetchone()
+        return os.path.join(self.root, row[0]) if row is not None else None
+
+    def summary(self, experiment_dir: str, run: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """
+        The summary of one run of an experiment with the columns of the
+        summary csv and its `Run-ID`, the newest run if `run` is None.
+
+        :return: None if the experiment has no indexed run.
+        """
+        if run is None:
+            runs = self.runs(experiment_dir)
+            if len(runs) == 0:
+                return None
+            run = runs[0]
+
+        columns = ", ".join(f'{column} AS "{name}"' for name, column in COLUMNS.items())
+        summary = self.query(
+            f'SELECT {columns}, run_id AS "Run-ID" FROM summaries WHERE experiment_dir = ? AND run = ? ORDER BY rowid',
+            (self._relative(experiment_dir), run),
+        )
+        return summary if not summary.empty else None
+
+
+def open_index(directories: List[str], index_path: Optional[str] = None) -> ResultIndex:
+    """Opens the index of `directories` and brings it up to date."""
+    index = ResultIndex(index_path or default_index_path(directories))
+    indexed, removed = index.update(directories)
+    if indexed or removed:
+        print(f"Indexed {indexed} summaries, removed {removed} in {index.path}")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index the summaries of all experiments and runs into one SQLite database.")
+
+    parser.add_argument('-i', type=str, default=None, help=f"Index database, default {INDEX} in the common directory of the given ones.")
+    parser.add_argument('-q', type=str, default=None, help="SQL query run against the index after updating it, e.g. \"SELECT experiment, AVG(p99) FROM summaries GROUP BY experiment\".")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+
+    directories = [directory for directory in args.directories if os.path.exists(directory)]
+    for directory in set(args.directories) - set(directories):
+        print(f"Error: folder {directory} does not exist")
+    if len(directories) == 0:
+        sys.exit(1)
+
+    started = monotonic()
+    with open_index(directories, args.i) as index:
+        count, = index.connection.execute("SELECT COUNT(*) FROM summaries").fetchone()
+        print(f"{count} summary rows in {index.path} ({monotonic() - started:.2f}s)")
+
+        if args.q is not None:
+            started = monotonic()
+            result = index.query(args.q)
+            with pd.option_context('display.max_rows', None, 'display.width', 200):
+                print(result.to_string(index=False))
+            print(f"{len(result)} rows in {(monotonic() - started) * 1000:.1f} ms")
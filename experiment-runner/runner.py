@@ -0,0 +1,429 @@
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+from typing import Callable, Dict, List, Optional, Type
+
+import yaml
+from colorama import Fore, init
+from pydantic import BaseModel
+
+from aggregate import SUMMARY, aggregate_experiment
+import async_runner
+from cluster import ClusterManager, find_compose_file, reset_ledgers
+from confidence import RepetitionPlan
+from docker_api import ContainerControl
+from faults import FaultLog, FaultSchedule, FaultScheduler, FaultSpec, parse_runtime
+from readiness import PROBE_INTERVAL, expected_bookie_count, wait_for_cluster
+from saturation import LatencySLO, SATURATION, SaturationSearch
+from scheduler import SlotPool, WorkerSlot, client_name, client_share, host_slots, local_slots, run_experiments as run_threaded_experiments, run_task
+from sweep import find_sweep, sweep_experiment_dirs
+from task_index import ExperimentResult, TaskIndexRecorder, output_name
+from telemetry import TELEMETRY_INTERVAL, TelemetryMonitor
+from timeseries import TimeseriesRecorder
+
+init(autoreset=True)  # Ensure automatic color reset
+
+BENCHMARK = "benchmark.yml"
+EXPERIMENT_ATTEMPTS = 5
+# seconds to wait before the n-th retry of an experiment, times n
+EXPERIMENT_RETRY_DELAY = 60
+
+
+class Client(BaseModel):
+    count: int
+
+
+class Config(BaseModel):
+    name: str
+    repetitions: int
+    client: Client
+
+
+class Task(BaseModel):
+    """
+    Configuration for the workload generator.
+    """
+
+    command: List[str]
+    throughput: int
+    mode: str
+    num_threads: int
+    runtime: str
+    payload_size: int
+    task_id: int
+
+    def build_args(self,time:datetime,zk:str,name:str,client:int=0,clients:int=1) -> List[str]:
+
+        """
+        takes in the configuration and name and builds the cli args.
+        with several clients every client gets its share of the throughput and its own output name.
+        """
+        new_output_name = client_name(output_name(time, name), client, clients)
+
+        args = []
+        args.append("-t")
+        args.append(str(self.num_threads))
+        args.append("-r")
+        args.append(str(self.runtime))
+        args.append("-p")
+        args.append(str(self.payload_size))
+        args.append("-l")
+        args.append(str(client_share(self.throughput, client, clients)))
+        args.append("-m")
+        args.append(self.mode)
+        args.append("-tid")
+        args.append(str(self.task_id))
+        args.append("-o")
+        args.append(new_output_name)
+        args.append("-zk")
+        args.append(zk)
+        return args
+
+
+class Benchmark(BaseModel):
+    """
+    Configuration for a single benchmark scenario.
+    """
+
+    config: Config
+    tasks: Dict[str,Task]
+    faults: Optional[FaultSchedule] = None
+
+
+class RunOptions(BaseModel):
+    """
+    Options of a runner invocation, shared by all experiments it runs.
+    """
+
+    zk: str
+    # bookies that have to be available before every task, None counts the
+    # bookie services of the managed compose file (at least one without one)
+    bookies: Optional[int] = None
+    # seconds between live telemetry reports, 0 disables them
+    telemetry_interval: float = TELEMETRY_INTERVAL
+    # record every sample with its timestamp to <run>-timeseries.csv
+    record_timeseries: bool = False
+    # faults injected into random bookies during every task except the warmup,
+    # for experiments without a faults section in their benchmark.yml
+    faults: List[FaultSpec] = []
+    fault_seed: int = 0
+    # latency objective of the adaptive saturation search, None runs the whole task ladder
+    slo: Optional[LatencySLO] = None
+    # delete the ledgers of the previous task before every task
+    reset_between_tasks: bool = False
+    # add repetitions until the confidence intervals of a run are this narrow (relative half width), None disables it
+    ci_width: Optional[float] = None
+    max_repetitions: Optional[int] = None
+    # supervise the generator clients with asyncio and stream their output
+    stream_output: bool = False
+    # run the python scripts of the experiment directory along every task (with `stream_output`)
+    fault_scripts: bool = False
+
+    def fault_schedule(self, benchmark: Benchmark) -> Optional[FaultSchedule]:
+        """The faults section of the benchmark.yml, else the faults given on the command line."""
+        if benchmark.faults is not None:
+            return benchmark.faults
+        if self.faults:
+            return FaultSchedule(seed=self.fault_seed, schedule=self.faults)
+        return None
+
+
+def add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    """Adds the arguments of `RunOptions` and the experiment selection to a runner's parser."""
+    parser.add_argument('-d', action='store_true', help="Optional '-d' flag, indicates that only one directory is allowed.")
+    parser.add_argument('zk', type=str, help="The zk string (required).")
+    parser.add_argument('-j', type=int, default=1, help="Number of local worker slots, experiments run concurrently if > 1.")
+    parser.add_argument('-a', action='store_true', help="Use the asyncio runner: streams generator output and waits for the cluster instead of fixed sleeps.")
+    parser.add_argument('--telemetry', type=float, default=TELEMETRY_INTERVAL, help="Seconds between live throughput/latency reports of the running task, 0 disables them.")
+    parser.add_argument('--timeseries', action='store_true', help="Record every latency sample with its timestamp to <run>-timeseries.csv, see timeseries.py.")
+    parser.add_argument('--fault', type=FaultSpec.parse, action='append', default=[], help="Inject a fault into a random bookie during every task, e.g. 'restart', 'disconnect:5:1' or 'delay:1:60:10' (action[:interval s[:duration s[:latency ms]]]), repeatable. Implies --timeseries.")
+    parser.add_argument('--fault-seed', type=int, default=0, help="Seed of the --fault schedule, runs with the same seed get the same faults.")
+    parser.add_argument('--slo', type=LatencySLO.parse, default=None, help="Latency SLO like 'p99<50' (ms): stop the task ladder at the first violation and bisect the max sustainable throughput.")
+    parser.add_argument('--reset', action='store_true', help="Delete the ledgers of the previous task through ZooKeeper before every task (only with experiments not sharing the cluster, e.g. -j 1).")
+    parser.add_argument('--ci-width', type=float, default=None, help="Run more repetitions until the 95%% confidence intervals of every task are within this relative half width, e.g. 0.05.")
+    parser.add_argument('--max-repetitions', type=int, default=None, help="Upper limit of repetitions added by --ci-width, default three times the configured ones (at least 9).")
+    parser.add_argument('--hosts', type=str, default=None, help="Comma separated load generator hosts (ssh), one worker slot each.")
+    parser.add_argument('--bookies', type=int, default=None, help="Number of bookies that have to be available before a task starts (default: the bookie services of the compose file, at least one).")
+    parser.add_argument('directories', nargs='+', help="One or more experiment directories or sweep files.")
+
+
+def run_options(args: argparse.Namespace, fault_scripts: bool = False) -> RunOptions:
+    return RunOptions(
+        zk=args.zk,
+        bookies=args.bookies,
+        telemetry_interval=args.telemetry,
+        record_timeseries=args.timeseries,
+        faults=args.fault,
+        fault_seed=args.fault_seed,
+        slo=args.slo,
+        reset_between_tasks=args.reset,
+        ci_width=args.ci_width,
+        max_repetitions=args.max_repetitions,
+        stream_output=args.a,
+        fault_scripts=fault_scripts,
+    )
+
+
+def parse_benchmark_config(experiment_dir: str = ".", schema: Type[Benchmark] = Benchmark) -> Benchmark:
+    """
+    Reads a YAML file and validates it against the Benchmark schema.
+
+    :param experiment_dir: Path to the directory containing the YAML configuration file.
+    :param schema: The runner's Benchmark model.
+    :return: Benchmark object if validation is successful.
+    """
+
+    with open(os.path.join(experiment_dir, BENCHMARK), "r") as file:
+        config_data = yaml.safe_load(file)
+
+    # Validate the data against the Benchmark schema
+    config = schema(**config_data)
+
+    print(Fore.GREEN + "Config successfully read and validated.")
+    return config
+
+
+def get_python_scripts(experiment_dir: str = "."):
+    """Gets a list of Python scripts in the experiment directory."""
+    return [file for file in os.listdir(experiment_dir) if file.endswith('.py')]
+
+
+async def run_benchmark(
+    experiment_dir: str,
+    benchmark: Benchmark,
+    slots: List[WorkerSlot],
+    options: RunOptions,
+    cluster: Optional[ClusterManager] = None,
+) -> None:
+    """
+    Runs all repetitions of an experiment.
+
+    :param benchmark: The parsed benchmark.yml of the experiment.
+    :param cluster: Brings up the cluster of the experiment's compose file and
+        keeps it up across repetitions and experiments, None uses a running cluster.
+    """
+    name = os.path.basename(experiment_dir)
+    compose_file = find_compose_file(experiment_dir) if cluster is not None else None
+    expected_bookies = options.bookies
+    if expected_bookies is None and compose_file is not None:
+        expected_bookies = expected_bookie_count(compose_file)
+    fault_scripts = []
+    if options.fault_scripts:
+        scripts = get_python_scripts(experiment_dir)
+        print(Fore.GREEN + f"found the folowing scripts:\n {scripts}")
+        if scripts and not options.stream_output:
+            print(Fore.YELLOW + "fault scripts only run with the asyncio runner (-a)")
+        fault_scripts = [os.path.join(experiment_dir, script) for script in scripts]
+
+    time = datetime.datetime.now()
+    clients = benchmark.config.client.count
+    result_dir = os.path.join(experiment_dir, ExperimentResult)
+    task_indexes = [TaskIndexRecorder(client_name(output_name(time, name), client, clients), result_dir) for client in range(clients)]
+    latencies_paths = [task_index.latencies_path for task_index in task_indexes]
+
+    telemetry = None
+    if options.telemetry_interval > 0:
+        telemetry = TelemetryMonitor(latencies_paths, interval=options.telemetry_interval).start()
+    timeseries = None
+    schedule = options.fault_schedule(benchmark)
+    if options.record_timeseries or schedule is not None:
+        # the impact of faults is measured on the timeseries
+        timeseries = TimeseriesRecorder(latencies_paths).start()
+    fault_log = FaultLog.for_run(latencies_paths)
+    containers = ContainerControl()
+    warmup_ids = {task.task_id for key, task in benchmark.tasks.items() if key == "warmup"}
+    try:
+        repetitions = RepetitionPlan(
+            benchmark.config.repetitions,
+            os.path.join(result_dir, output_name(time, name) + SUMMARY),
+            latencies_paths,
+            target_width=options.ci_width,
+            max_repetitions=options.max_repetitions,
+            skip_task_ids=warmup_ids,
+        )
+        # one search for all repetitions, bisection task ids stay unique in the run
+        search = SaturationSearch(benchmark.tasks, options.slo) if options.slo is not None else None
+        for repetition in repetitions:
+            if cluster is not None:
+                # polled, a blocked worker thread per waiting experiment could starve the default executor
+                while not await asyncio.to_thread(cluster.try_acquire, compose_file):
+                    await asyncio.sleep(PROBE_INTERVAL)
+            # the cluster may have been restarted
+            containers.invalidate()
+            failed = True
+            try:
+                if search is not None:
+                    search.start_repetition()
+                for task in (search if search is not None else benchmark.tasks.values()):
+                    if not await async_runner.wait_until_ready(options.zk, expected_bookies):
+                        raise RuntimeError(f"cluster {options.zk} did not become ready")
+                    if options.reset_between_tasks:
+                        await asyncio.to_thread(reset_ledgers, options.zk)
+                    if telemetry is not None:
+                        telemetry.set_task(task.task_id)
+                    if timeseries is not None:
+                        timeseries.set_task(task.task_id)
+                    injector = None
+                    if schedule is not None and task.task_id not in warmup_ids:
+                        injector = await asyncio.to_thread(FaultScheduler(schedule, fault_log, task.task_id, parse_runtime(task.runtime), containers).start)
+                    try:
+                        if options.stream_output:
+                            succeeded = await async_runner.run_task(task, time, options.zk, experiment_dir, slots, task_indexes, fault_scripts, expected_bookies)
+                        else:
+                            succeeded = await asyncio.to_thread(
+                                run_task,
+                                lambda client, clients, task=task: task.command + task.build_args(time=time,zk=options.zk,name=name,client=client,clients=clients),
+                                experiment_dir=experiment_dir,
+                                slots=slots,
+                                task_id=task.task_id,
+                                task_indexes=task_indexes,
+                                wait_ready=lambda: wait_for_cluster(options.zk, expected_bookies),
+                            )
+                    finally:
+                        if injector is not None:
+                            await asyncio.to_thread(injector.stop)
+                    if not succeeded:
+                        raise RuntimeError(f"task {task.task_id} failed")
+                    if search is not None:
+                        search.record(task, latencies_paths)
+
+                if search is not None:
+                    search.report()
+                    search.write(os.path.join(result_dir, output_name(time, name) + SATURATION), repetition + 1)
+
+                if clients > 1:
+                    aggregate_experiment(experiment_dir, force=True)
+                failed = False
+            finally:
+                if cluster is not None:
+                    # the cluster stays up for the next repetition or experiment
+                    cluster.release(failed)
+    finally:
+        if telemetry is not None:
+            await asyncio.to_thread(telemetry.stop)
+        if timeseries is not None:
+            await asyncio.to_thread(timeseries.stop)
+
+
+async def retry_run_benchmark(
+    experiment_dir: str,
+    slots: List[WorkerSlot],
+    options: RunOptions,
+    cluster: Optional[ClusterManager] = None,
+    schema: Type[Benchmark] = Benchmark,
+) -> None:
+    """
+    Runs an experiment and retries it if it failed, the n-th retry after
+    backing off n times `EXPERIMENT_RETRY_DELAY` seconds. A managed cluster
+    is restarted by the next attempt, an external one is waited for as long
+    instead and the experiment is given up if it does not become ready.
+    """
+    try:
+        benchmark = parse_benchmark_config(experiment_dir, schema)
+    except Exception as e:
+        print(Fore.RED + "Couldn't parse config")
+        print(e)
+        return
+
+    for attempt in range(1, EXPERIMENT_ATTEMPTS + 1):
+        try:
+            await run_benchmark(experiment_dir, benchmark, slots, options, cluster)
+            return
+        except Exception as e:
+            if attempt == EXPERIMENT_ATTEMPTS:
+                print(Fore.RED + f"Experiment failed ({e}), giving up after {attempt} attempts")
+                return
+            delay = EXPERIMENT_RETRY_DELAY * attempt
+            if cluster is not None:
+                print(Fore.CYAN + f"Experiment failed ({e}), retrying in {delay}s")
+                await asyncio.sleep(delay)
+                continue
+            print(Fore.CYAN + f"Experiment failed ({e}), waiting up to {delay}s for the cluster before retrying")
+            if not await async_runner.wait_until_ready(options.zk, options.bookies, timeout=delay):
+                print(Fore.RED + f"Cluster {options.zk} not ready, giving up {experiment_dir}")
+                return
+
+
+def client_count(experiment_dir:str) -> int:
+    try:
+        return parse_benchmark_config(experiment_dir).config.client.count
+    except Exception:
+        return 1
+
+
+def run_experiments(
+    experiment_dirs: List[str],
+    slots: List[WorkerSlot],
+    options: RunOptions,
+    cluster: Optional[ClusterManager] = None,
+    schema: Type[Benchmark] = Benchmark,
+) -> None:
+    """
+    Runs experiments concurrently on the worker slots, in one event loop with
+    `options.stream_output`, else each in its own thread.
+    """
+    if options.stream_output:
+        asyncio.run(async_runner.run_experiments(
+            experiment_dirs,
+            lambda experiment_dir, slots: retry_run_benchmark(experiment_dir, slots, options, cluster, schema),
+            slots,
+            client_count,
+        ))
+        return
+
+    run_threaded_experiments(
+        experiment_dirs,
+        lambda experiment_dir, slots: asyncio.run(retry_run_benchmark(experiment_dir, slots, options, cluster, schema)),
+        SlotPool(slots),
+        client_count,
+    )
+
+
+def expand_sweep_or_exit(sweep_file: str) -> List[str]:
+    try:
+        return sweep_experiment_dirs(sweep_file)
+    except ValueError as e:
+        print(f"Error: invalid sweep {sweep_file}: {e}")
+        sys.exit(1)
+
+
+def batch_experiment_dirs(base_dir: str) -> List[str]:
+    if not os.path.exists(base_dir):
+        print(f"Error: folder for experiment batch {base_dir} dos not exist")
+        sys.exit(1)
+    sweep_file = find_sweep(base_dir)
+    if sweep_file is not None:
+        return expand_sweep_or_exit(sweep_file)
+    abs_base_dir = os.path.abspath(base_dir)
+    return [os.path.join(abs_base_dir, subdir) for subdir in os.listdir(abs_base_dir) if os.path.isdir(os.path.join(abs_base_dir, subdir))]
+
+def list_experiment_dirs(dir_list: List[str]) -> List[str]:
+    experiment_dirs = []
+    for experiment_dir in dir_list:
+        if not os.path.exists(experiment_dir):
+            print(f"Error: folder {experiment_dir} does not exist")
+            continue
+        if os.path.isfile(experiment_dir) and find_sweep(experiment_dir) is not None:
+            experiment_dirs.extend(expand_sweep_or_exit(experiment_dir))
+            continue
+        experiment_dirs.append(os.path.abspath(experiment_dir))
+    return experiment_dirs
+
+
+def worker_slots(args: argparse.Namespace) -> List[WorkerSlot]:
+    if args.hosts is not None:
+        return host_slots([host for host in args.hosts.split(",") if host])
+    return local_slots(max(1, args.j))
+
+
+def selected_experiment_dirs(args: argparse.Namespace, on_error: Callable[[], None]) -> List[str]:
+    """The experiment directories of the parsed arguments, `-d` expands one batch directory."""
+    if args.d is True and len(args.directories) > 1:
+        print("Error: When using the '-d' flag, only one directory is allowed.")
+        on_error()
+
+    if args.d is True:
+        return batch_experiment_dirs(args.directories[0])
+    return list_experiment_dirs(args.directories)
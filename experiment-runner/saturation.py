@@ -0,0 +1,202 @@
+import csv
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from colorama import Fore, init
+from pydantic import BaseModel
+
+from latencies import LatencyHistogram, find_task_boundaries, iter_task_chunks
+
+init(autoreset=True)  # Ensure automatic color reset
+
+SATURATION = "-saturation.csv"
+
+# bisection stops once the gap between the last good and the first bad load is below this fraction
+SEARCH_RESOLUTION = 0.05
+SEARCH_STEPS = 8
+
+SLO_PATTERN = re.compile(r"^\s*p(?P<percentile>\d+(\.\d+)?)\s*<\s*(?P<latency>\d+(\.\d+)?)\s*(ms)?\s*$")
+
+
+class LatencySLO(BaseModel):
+    """
+    A latency objective a task has to meet, e.g. p99 < 50 ms.
+    """
+
+    percentile: float
+    max_latency: float
+
+    @classmethod
+    def parse(cls, text: str) -> "LatencySLO":
+        """
+        Parses objectives like "p99<50" or "p999 < 120ms", latencies are in ms.
+        """
+        match = SLO_PATTERN.match(text)
+        if match is None:
+            raise ValueError(f"invalid latency SLO '{text}', expected e.g. p99<50")
+
+        # p999 is the 99.9th percentile
+        percentile = float(match.group("percentile"))
+        while percentile > 100:
+            percentile /= 10
+        return cls(percentile=percentile, max_latency=float(match.group("latency")))
+
+    def __str__(self) -> str:
+        return f"p{self.percentile:g} < {self.max_latency:g} ms"
+
+    def latency(self, histogram: LatencyHistogram) -> float:
+        return histogram.percentile(self.percentile)
+
+    def met(self, histogram: LatencyHistogram) -> bool:
+        """A task without samples (e.g. all attempts failed) never meets the objective."""
+        return histogram.count > 0 and self.latency(histogram) < self.max_latency
+
+
+def new_task_histogram(latencies_paths: List[str], task_id: int, seen: Dict[str, int]) -> LatencyHistogram:
+    """
+    Merges the samples a task recorded over all clients since the last call.
+
+    :param seen: Task index entries already read per latencies csv, updated
+        in place. Earlier runs of the task are never read, a task that
+        recorded nothing yields an empty histogram.
+    """
+    histogram = LatencyHistogram()
+    for latencies_path in latencies_paths:
+        if not os.path.exists(latencies_path):
+            continue
+        boundaries = find_task_boundaries(latencies_path) or []
+        new_boundaries = boundaries[seen.get(latencies_path, 0):]
+        seen[latencies_path] = len(boundaries)
+        for boundary in new_boundaries:
+            if boundary.task_id != task_id:
+                continue
+            for chunk in iter_task_chunks(latencies_path, boundary):
+                histogram.record(chunk)
+    return histogram
+
+
+class SaturationStep(BaseModel):
+    task_id: int
+    throughput: int
+    latency: float
+    samples: int
+    met: bool
+
+
+class SaturationSearch:
+    """
+    Finds the highest throughput of a task ladder that still meets a latency SLO.
+
+    The warmup task runs first, then the ladder of the benchmark.yml in order
+    of increasing throughput. The ladder stops at the first step violating the
+    SLO and the load between the last good and the first bad step is bisected.
+    Bisection steps are copies of the first bad task with a new task id, so
+    the generator writes them to the summary like any other task.
+
+    Iterating the search yields the task to run next, `record` has to be
+    called with its results before the next one is requested. One search
+    serves all repetitions of a run, `start_repetition` restarts the ladder
+    while bisection task ids keep counting up, so a task id never stands for
+    two different loads in the same latencies csv.
+    """
+
+    def __init__(self, tasks: Dict[str, Any], slo: LatencySLO, resolution: float = SEARCH_RESOLUTION, max_steps: int = SEARCH_STEPS):
+        """
+        :param tasks: The tasks of the benchmark.yml by name.
+        :param resolution: Relative gap between good and bad load at which bisection stops.
+        :param max_steps: Maximum number of bisection steps.
+        """
+        self.slo = slo
+        self.resolution = resolution
+        self.max_steps = max_steps
+        self.warmup_ids = {task.task_id for key, task in tasks.items() if key == "warmup"}
+        ladder = sorted((task for key, task in tasks.items() if key != "warmup"), key=lambda task: task.throughput)
+        self._ladder = [task for key, task in tasks.items() if key == "warmup"] + ladder
+        self._next_task_id = max((task.task_id for task in tasks.values()), default=0) + 1
+        self._seen: Dict[str, int] = {}
+        self.start_repetition()
+
+    def start_repetition(self) -> None:
+        """Starts the search over with the first task of the ladder."""
+        self._pending = list(self._ladder)
+        self._bisections = 0
+        self.steps: List[SaturationStep] = []
+        self.last_good = None
+        self.first_bad = None
+
+    def next_task(self) -> Optional[Any]:
+        if self.first_bad is None:
+            return self._pending.pop(0) if self._pending else None
+
+        low = self.last_good.throughput if self.last_good is not None else 0
+        high = self.first_bad.throughput
+        if high - low <= max(1, self.resolution * high) or self._bisections >= self.max_steps:
+            return None
+
+        self._bisections += 1
+        task = self.first_bad.model_copy(update={"throughput": (low + high) // 2, "task_id": self._next_task_id})
+        self._next_task_id += 1
+        return task
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            task = self.next_task()
+            if task is None:
+                return
+            yield task
+
+    def record(self, task: Any, latencies_paths: List[str]) -> Optional[SaturationStep]:
+        """
+        Checks the samples `task` recorded since the previous call against the
+        SLO, a task that recorded none fails.
+
+        :param latencies_paths: Latencies csv of every client of the run.
+        """
+        histogram = new_task_histogram(latencies_paths, task.task_id, self._seen)
+        if task.task_id in self.warmup_ids:
+            return None
+
+        step = SaturationStep(
+            task_id=task.task_id,
+            throughput=task.throughput,
+            latency=self.slo.latency(histogram),
+            samples=histogram.count,
+            met=self.slo.met(histogram),
+        )
+        self.steps.append(step)
+
+        if step.met:
+            self.last_good = task
+            print(Fore.GREEN + f"Task {task.task_id} at {task.throughput} ops/s meets {self.slo} ({step.latency:.3f} ms)")
+        else:
+            self.first_bad = task
+            print(Fore.YELLOW + f"Task {task.task_id} at {task.throughput} ops/s violates {self.slo} ({step.latency:.3f} ms)")
+        return step
+
+    @property
+    def max_throughput(self) -> Optional[int]:
+        """Highest intended load that met the SLO, None if no step did."""
+        return self.last_good.throughput if self.last_good is not None else None
+
+    def report(self) -> None:
+        if self.max_throughput is None:
+            print(Fore.RED + f"No throughput meets {self.slo}")
+        elif self.first_bad is None:
+            print(Fore.YELLOW + f"All {self.max_throughput} ops/s of the ladder meet {self.slo}, saturation not reached")
+        else:
+            print(Fore.GREEN + f"Max sustainable throughput for {self.slo}: {self.max_throughput} ops/s ({len(self.steps)} steps)")
+
+    def write(self, output_file: str, run_id: int = 1) -> None:
+        """
+        Appends the steps of the search to `output_file`, one row per step.
+
+        :param run_id: Repetition the search belongs to.
+        """
+        write_header = not os.path.exists(output_file)
+        with open(output_file, "a", newline="") as file:
+            writer = csv.writer(file)
+            if write_header:
+                writer.writerow(['Run-ID', 'Task-ID', 'intended load (ops/s)', 'SLO', 'latency (ms)', 'samples', 'SLO met', 'max sustainable (ops/s)'])
+            for step in self.steps:
+                writer.writerow([run_id, step.task_id, step.throughput, str(self.slo), f"{step.latency:.3f}", step.samples, step.met, self.max_throughput if self.max_throughput is not None else ""])
@@ -0,0 +1,170 @@
+import shlex
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+from typing import Callable, List, Optional, Sequence
+
+from colorama import Fore, init
+from pydantic import BaseModel
+from tqdm import tqdm
+
+from task_index import TaskIndexRecorder
+
+init(autoreset=True)  # Ensure automatic color reset
+
+TASK_ATTEMPTS = 5
+RETRY_DELAY = 10
+
+
+class WorkerSlot(BaseModel):
+    """
+    A place a workload generator client can run on: the local machine or a
+    load generator host reached over ssh.
+
+    Remote hosts need the experiment directories at the same path as the
+    runner (e.g. a shared file system), the generator writes its results
+    relative to the experiment directory.
+    """
+
+    name: str
+    host: Optional[str] = None
+
+    def wrap(self, command: List[str], cwd: str) -> List[str]:
+        """Returns the command line running `command` in `cwd` on this slot."""
+        if self.host is None:
+            return command
+        remote_command = f"cd {shlex.quote(cwd)} && {shlex.join(command)}"
+        return ["ssh", self.host, remote_command]
+
+
+def local_slots(count: int) -> List[WorkerSlot]:
+    return [WorkerSlot(name=f"local-{i}") for i in range(count)]
+
+
+def host_slots(hosts: Sequence[str]) -> List[WorkerSlot]:
+    return [WorkerSlot(name=host, host=host) for host in hosts]
+
+
+class SlotPool:
+    """
+    Hands out worker slots to concurrently running experiments.
+    """
+
+    def __init__(self, slots: List[WorkerSlot]):
+        if len(slots) == 0:
+            raise ValueError("at least one worker slot is required")
+        self._free = list(slots)
+        self.size = len(slots)
+        self._condition = threading.Condition()
+
+    def acquire(self, count: int) -> List[WorkerSlot]:
+        """
+        Blocks until `count` slots are free, at most the whole pool is handed out.
+        """
+        count = max(1, min(count, self.size))
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._free) >= count)
+            acquired, self._free = self._free[:count], self._free[count:]
+            return acquired
+
+    def release(self, slots: List[WorkerSlot]) -> None:
+        with self._condition:
+            self._free.extend(slots)
+            self._condition.notify_all()
+
+
+def client_share(throughput: int, client: int, clients: int) -> int:
+    """
+    Splits the intended load of a task over its clients, the shares add up to
+    `throughput` so the aggregate offered load stays the one of the task.
+    """
+    share, remainder = divmod(throughput, clients)
+    return share + (1 if client < remainder else 0)
+
+
+def client_name(name: str, client: int, clients: int) -> str:
+    """Output name of one client, single client runs keep the plain name."""
+    return name if clients <= 1 else f"{name}-c{client}"
+
+
+def run_task(
+    build_command: Callable[[int, int], List[str]],
+    experiment_dir: str,
+    slots: List[WorkerSlot],
+    task_id: int,
+    task_indexes: List[TaskIndexRecorder],
+    wait_ready: Optional[Callable[[], bool]] = None,
+    attempts: int = TASK_ATTEMPTS,
+) -> bool:
+    """
+    Runs one task with one generator process per entry of `task_indexes` at
+    once, spread round-robin over `slots`, and retries it until every client
+    succeeded.
+
+    :param build_command: Returns the generator command of a client, given its index and the client count.
+    :param task_indexes: Task index recorder of every client.
+    :param wait_ready: Blocks until the cluster is usable again after a failed attempt and returns False
+        if it did not become usable, a fixed delay is used if None.
+    :return: True if an attempt succeeded.
+    """
+    clients = len(task_indexes)
+    for _ in range(attempts):
+        print("Running task")
+        processes = []
+        try:
+            for task_index in task_indexes:
+                task_index.begin()
+            for client in range(clients):
+                slot = slots[client % len(slots)]
+                command = slot.wrap(build_command(client, clients), experiment_dir)
+                processes.append(subprocess.Popen(command, cwd=experiment_dir))
+
+            return_codes = [process.wait() for process in processes]
+            if all(return_code == 0 for return_code in return_codes):
+                for task_index in task_indexes:
+                    task_index.end(task_id)
+                return True
+        except Exception as e:
+            print(Fore.RED + "Couldn't start benchmark")
+            print(e)
+            for process in processes:
+                process.kill()
+
+        if wait_ready is None:
+            sleep(RETRY_DELAY)
+        elif not wait_ready():
+            print(Fore.RED + f"Cluster not ready, giving up task {task_id}")
+            return False
+        print(Fore.GREEN + "Retrying")
+    return False
+
+
+def run_experiments(experiment_dirs: List[str], run_experiment: Callable[[str, List[WorkerSlot]], None], pool: SlotPool, client_count: Callable[[str], int]):
+    """
+    Runs experiments concurrently, each one as soon as enough worker slots are free.
+
+    :param run_experiment: Runs one experiment on the given slots.
+    :param client_count: Number of clients (slots) an experiment asks for.
+    """
+
+    def run(experiment_dir: str):
+        slots = pool.acquire(client_count(experiment_dir))
+        try:
+            print(Fore.GREEN + f"Running {experiment_dir} on {[slot.name for slot in slots]}")
+            run_experiment(experiment_dir, slots)
+        finally:
+            pool.release(slots)
+
+    if pool.size == 1:
+        for experiment_dir in tqdm(experiment_dirs, desc="Processing directories", unit="dir"):
+            run(experiment_dir)
+        return
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = [executor.submit(run, experiment_dir) for experiment_dir in experiment_dirs]
+        for future in tqdm(futures, desc="Processing directories", unit="dir"):
+            try:
+                future.result()
+            except Exception as e:
+                print(Fore.RED + f"Experiment failed: {e}")
@@ -1,4 +1,5 @@
 import csv
+import re
 import sys
 from datetime import date, datetime
 from typing import List, Optional
@@ -8,7 +9,11 @@ import datetime
 
 from pydantic import BaseModel, Field,ValidationError
 
+from build_cache import BuildCache
+
 SUMMARY = "-summary.csv"
+# per client summaries of multi client runs, aggregate.py merges them into one summary
+CLIENT_SUMMARY = re.compile(r"-c\d+-summary\.csv$")
 
 class Experiment_result_name_format(BaseModel):
     experiment_time: str
@@ -87,73 +92,61 @@ def parse_and_validate_summary(file_path:str):
         
 
 
-def load_csvs(experiment_result_name:Optional[Experiment_result_name_format]):
-    """Loads a CSV files from current directory"""
-    
-    base_name = os.path.basename(os.getcwd())
-    if base_name != "ExperimentResult":
-        print(f"cwd is not ExperimentResult is is {base_name}")
-        sys.exit(1)
-    
-    file_names = [str]
-    try:
-        file_names = os.listdir()
-    except Exception:
-        print("ExperimentResult dos not exist Experiment not Run?")
-        sys.exit(1)
-    matching_files = None
-    if experiment_result_name is not None:
-        matching_files = [f_name for f_name in file_names if f_name.startswith(experiment_result_name.experiment_time) and f_name.endswith(SUMMARY)]
-    else:
-        _summaries = [f_name for f_name in file_names if f_name.endswith(SUMMARY)]
-        time_experiments = [(Experiment_result_name_format(summary_name).experiment_time,summary_name) for summary_name in _summaries if  summary_name.endswith(SUMMARY)]
-        time_experiments.sort(key=0,reverse=True)
-
-        last_exp = time_experiments[0][0]
-        i:int
-        for i,exp in enumerate(time_experiments):
-            if last_exp != exp:
-                break
-            last_exp = exp
-
-        experiments_list = [tup[1] for tup in time_experiments]
-        matching_files = experiments_list[:i+1]
+def load_summaries(experiment_dir: str, experiment_result_name: Optional[Experiment_result_name_format]) -> pd.DataFrame:
+    """Loads the summary rows of a run from the result index, the newest run if no name is given."""
+    # imported here, the index reads summaries with the helpers of this module
+    from result_index import open_index
 
-        print(f"found {matching_files[0]} to be the newest Experiment")
-
-    if len(matching_files) == 0:
-        print(f"no matiching experimt results found")
-        sys.exit(1)
+    with open_index([experiment_dir]) as index:
+        runs = index.runs(experiment_dir)
+        if len(runs) == 0:
+            print(f"ExperimentResult of {experiment_dir} has no summaries, Experiment not Run?")
+            sys.exit(1)
 
-    summaries:List[SummaryData] = []
-    for file in matching_files:
-        summaries.append(parse_and_validate_summary(file))
-    return summaries
+        if experiment_result_name is not None:
+            run = experiment_result_name.experiment_time
+            if run not in runs:
+                print(f"no matiching experimt results found")
+                sys.exit(1)
+        else:
+            run = runs[0]
+            print(f"found {run} to be the newest Experiment")
 
+        return index.summary(experiment_dir, run)
 
 
-def summarize(folder_name, experiment_result_name: Optional[Experiment_result_name_format]):
-    try:
-        os.chdir("ExperimentResult")
-    except Exception:
-        print(f"could not find ExperimentResult in {folder_name}")
-        sys.exit(1)
+def summarize(experiment_dir: str, experiment_result_name: Optional[Experiment_result_name_format]):
+    folder_name = os.path.basename(os.path.abspath(experiment_dir))
+    rows = load_summaries(experiment_dir, experiment_result_name)
 
-    summaries = load_csvs(experiment_result_name)
+    summaries: List[SummaryData] = []
+    for _, row in rows.iterrows():
+        try:
+            summaries.append(SummaryData(
+                total_time=row['Total Time (sec)'],
+                average_throughput=row['Tput (ops/sec)'],
+                average_response_time=row['Resp. Time (ms)'],
+                percentile_50=row['50th p (ms)'],
+                percentile_95=row['95th p (ms)'],
+                percentile_99=row['99th p (ms)'],
+                percentile_999=row['999th p (ms)']
+            ))
+        except ValidationError as e:
+            print(f"Error parsing row of task {row['Task-ID']}: {e}")
+            sys.exit(1)
 
     if not summaries:
         print("No summaries loaded")
         sys.exit(1)
 
-    os.chdir('..')
     summary_data = []
-    for i, summary in enumerate(summaries, start=1):
+    for i, ((_, row), summary) in enumerate(zip(rows.iterrows(), summaries), start=1):
         summary_data.append([
             i,  # Exp ID
-            '',  # async / sync
-            '',  # thread num
-            '',  # req num
-            '',  # req size [B]
+            row['async / sync'],
+            row['thread num'],
+            row['intended load (ops/s)'],
+            row['req size [B]'],
             summary.total_time,
             summary.average_throughput,
             summary.average_response_time,
@@ -165,6 +158,8 @@ def summarize(folder_name, experiment_result_name: Optional[Experiment_result_na
 
     columns = ['Exp ID', 'async / sync', 'thread num', 'req num', 'req size [B]', 'Total Time (sec)', 'Average Throughput (ops/sec)', 'Average Response Time (ms)', '50th p (ms)', '95th p (ms)', '99th p (ms)', '999th p (ms)']
     df = pd.DataFrame(summary_data, columns=columns)
+    # keep the ids and task parameters integral next to the float statistics rows
+    df[columns[:5]] = df[columns[:5]].astype(object)
 
     # Calculate summary statistics
     numeric_columns = df.columns[5:]  # Exclude non-numeric columns
@@ -179,21 +174,24 @@ def summarize(folder_name, experiment_result_name: Optional[Experiment_result_na
     final_df = pd.concat([pd.DataFrame([['', '', '', '', '', '', '', '', '', '', '', '']], columns=columns, index=[experiment_name]), final_df])
 
     # Save to CSV
-    output_file = f'{folder_name}.csv'
+    output_file = os.path.join(experiment_dir, f'{folder_name}.csv')
     final_df.to_csv(output_file, sep=';', index=True, index_label='')
 
-    print(f"Summary saved to {output_file} in {os.getcwd()}")
+    print(f"Summary saved to {output_file}")
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2 or  len(sys.argv) > 3 :
-        print("Usage: python summarize_csv.py <experiment_directory> Optional<Experiment result name>")
+    force = "-f" in sys.argv[1:]
+    argv = [arg for arg in sys.argv if arg != "-f"]
+
+    if len(argv) < 2 or  len(argv) > 3 :
+        print("Usage: python summarize_csv.py [-f] <experiment_directory> Optional<Experiment result name>")
         sys.exit(1)
 
     name = None
-    if len(sys.argv) == 3:
+    if len(argv) == 3:
         try:
-            name_tmp = sys.argv[2]
+            name_tmp = argv[2]
             name = parse_and_validate_name(name_tmp)
         except ValidationError as e:
             print("<Experiment result name> has the wrong format")
@@ -203,7 +201,18 @@ if __name__ == "__main__":
     if name is None:
         print("no spesiffic Experiment given trying newest Experiment")
 
-    directory = sys.argv[1]
-    os.chdir(directory)
-    folder_name = os.path.basename(directory)
-    summarize(folder_name,name)
\ No newline at end of file
+    directory = argv[1]
+    if not os.path.isdir(directory):
+        print(f"Error: folder {directory} does not exist")
+        sys.exit(1)
+    folder_name = os.path.basename(os.path.abspath(directory))
+
+    # skip experiments whose results did not change since the last summary
+    cache = BuildCache(directory)
+    cache_key = name.experiment_time if name is not None else ""
+    if not force and cache.is_fresh("summary", [os.path.join(directory, f'{folder_name}.csv')], cache_key):
+        print(f"{folder_name} unchanged, keeping {folder_name}.csv")
+        sys.exit(0)
+
+    summarize(directory,name)
+    cache.update("summary", cache_key)
\ No newline at end of file
@@ -0,0 +1,210 @@
+import argparse
+import itertools
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from colorama import Fore, init
+from pydantic import BaseModel
+
+init(autoreset=True)  # Ensure automatic color reset
+
+BENCHMARK = "benchmark.yml"
+SWEEP = "sweep.yml"
+ExperimentResult = "ExperimentResult"
+GENERATED = f"# generated from {SWEEP} by sweep.py, edit the sweep instead\n"
+
+NAME_FORMAT = "{mode}-t{num_threads}-p{payload_size}"
+
+
+class Client(BaseModel):
+    count: int = 1
+
+
+class Warmup(BaseModel):
+    """Warmup task run before the ladder, defaults to the load of the first ladder step."""
+
+    throughput: Optional[int] = None
+    runtime: str = "PT30S"
+
+
+class SweepMatrix(BaseModel):
+    """
+    One Cartesian product of the sweep: every combination of mode, thread
+    count and payload size becomes an experiment running the throughput ladder.
+    """
+
+    mode: List[str]
+    num_threads: List[int]
+    payload_size: List[int]
+    throughput: List[int]
+    runtime: Optional[str] = None
+    warmup: Optional[Warmup] = None
+    name: Optional[str] = None
+
+
+class SweepSpec(BaseModel):
+    """
+    Campaign level description of experiments that only differ in their
+    parameters, expanded into one benchmark.yml per experiment.
+    """
+
+    repetitions: int = 1
+    client: Client = Client()
+    command: List[str]
+    runtime: str
+    warmup: Optional[Warmup] = Warmup()
+    name: str = NAME_FORMAT
+    matrix: List[SweepMatrix]
+
+
+class SweepExperiment(BaseModel):
+    name: str
+    mode: str
+    num_threads: int
+    payload_size: int
+    config: Dict[str, Any]
+
+    @property
+    def cluster_key(self) -> Tuple[str, int]:
+        """Experiments with the same key can share one cluster bring-up, e.g. all payload sizes of a thread count."""
+        return self.mode, self.num_threads
+
+
+def load_sweep(sweep_file: str) -> SweepSpec:
+    with open(sweep_file, "r") as file:
+        return SweepSpec(**yaml.safe_load(file))
+
+
+def build_tasks(spec: SweepSpec, matrix: SweepMatrix, mode: str, num_threads: int, payload_size: int) -> Dict[str, Dict[str, Any]]:
+    def task(task_id: int, throughput: int, runtime: str) -> Dict[str, Any]:
+        return {
+            'command': list(spec.command),
+            'throughput': throughput,
+            'mode': mode,
+            'num_threads': num_threads,
+            'runtime': runtime,
+            'task_id': task_id,
+            'payload_size': payload_size,
+        }
+
+    tasks = {}
+    warmup = matrix.warmup or spec.warmup
+    if warmup is not None:
+        tasks["warmup"] = task(0, warmup.throughput if warmup.throughput is not None else matrix.throughput[0], warmup.runtime)
+    for task_id, throughput in enumerate(matrix.throughput, start=1):
+        tasks[f"t{task_id}"] = task(task_id, throughput, matrix.runtime or spec.runtime)
+    return tasks
+
+
+def expand_sweep(spec: SweepSpec) -> List[SweepExperiment]:
+    """
+    Expands every matrix of the sweep into experiments.
+
+    Duplicate combinations are run once, the experiments are ordered so the
+    ones that can share a cluster (see `SweepExperiment.cluster_key`) follow
+    each other.
+
+    :raises ValueError: If two different experiments expand to the same name.
+    """
+    experiments = {}
+    for matrix in spec.matrix:
+        for mode, num_threads, payload_size in itertools.product(matrix.mode, matrix.num_threads, matrix.payload_size):
+            name = (matrix.name or spec.name).format(mode=mode, num_threads=num_threads, payload_size=payload_size)
+            config = {
+                'config': {'name': name, 'repetitions': spec.repetitions, 'client': spec.client.model_dump()},
+                'tasks': build_tasks(spec, matrix, mode, num_threads, payload_size),
+            }
+            experiment = SweepExperiment(name=name, mode=mode, num_threads=num_threads, payload_size=payload_size, config=config)
+
+            if name in experiments:
+                if experiments[name].config != config:
+                    raise ValueError(f"sweep expands to two different experiments named {name}")
+                continue
+            experiments[name] = experiment
+
+    return sorted(experiments.values(), key=lambda experiment: (experiment.cluster_key, experiment.payload_size, experiment.name))
+
+
+def _comparable(config_data: Dict[str, Any]) -> Dict[str, Any]:
+    # the display name of hand written configs does not always match the folder
+    config = dict(config_data.get('config', {}))
+    config.pop('name', None)
+    return {'config': config, 'tasks': config_data.get('tasks')}
+
+
+def write_benchmark(experiment_dir: str, config: Dict[str, Any]) -> bool:
+    """
+    Writes the benchmark.yml of a sweep experiment, an existing one is only
+    replaced if its tasks differ.
+
+    :return: True if the file was written.
+    :raises ValueError: If the existing benchmark.yml differs but was written
+        by hand or already has results, the sweep must reproduce it instead.
+    """
+    benchmark_path = os.path.join(experiment_dir, BENCHMARK)
+    if os.path.exists(benchmark_path):
+        with open(benchmark_path, "r") as file:
+            content = file.read()
+        if _comparable(yaml.safe_load(content) or {}) == _comparable(config):
+            return False
+        if not content.startswith(GENERATED):
+            raise ValueError(f"{benchmark_path} was not generated by the sweep and differs from it")
+        result_dir = os.path.join(experiment_dir, ExperimentResult)
+        if os.path.isdir(result_dir) and len(os.listdir(result_dir)) > 0:
+            raise ValueError(f"{benchmark_path} differs from the sweep but {result_dir} already holds results")
+
+    os.makedirs(experiment_dir, exist_ok=True)
+    with open(benchmark_path, "w") as file:
+        file.write(GENERATED)
+        yaml.safe_dump(config, file, sort_keys=False, default_flow_style=False)
+    return True
+
+
+def sweep_experiment_dirs(sweep_file: str, dry_run: bool = False) -> List[str]:
+    """
+    Expands a sweep into experiment directories next to the sweep file and
+    returns them in run order.
+    """
+    campaign_dir = os.path.dirname(os.path.abspath(sweep_file))
+    experiment_dirs = []
+    for experiment in expand_sweep(load_sweep(sweep_file)):
+        experiment_dir = os.path.join(campaign_dir, experiment.name)
+        if not dry_run and write_benchmark(experiment_dir, experiment.config):
+            print(Fore.GREEN + f"Wrote {os.path.join(experiment_dir, BENCHMARK)}")
+        experiment_dirs.append(experiment_dir)
+    return experiment_dirs
+
+
+def find_sweep(path: str) -> Optional[str]:
+    """Returns the sweep file `path` points to, directly or as campaign directory."""
+    if os.path.isfile(path) and path.endswith((".yml", ".yaml")) and os.path.basename(path) != BENCHMARK:
+        return path
+    sweep_file = os.path.join(path, SWEEP)
+    if os.path.isfile(sweep_file):
+        return sweep_file
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expand a campaign sweep into the benchmark.yml of every experiment.")
+
+    parser.add_argument('-n', action='store_true', help="Only list the experiments, don't write any file.")
+    parser.add_argument('sweep', help=f"Sweep file or campaign directory containing a {SWEEP}.")
+
+    args = parser.parse_args()
+
+    sweep_file = find_sweep(args.sweep)
+    if sweep_file is None:
+        print(f"Error: no {SWEEP} found for {args.sweep}")
+        sys.exit(1)
+
+    try:
+        experiment_dirs = sweep_experiment_dirs(sweep_file, dry_run=args.n)
+    except ValueError as e:
+        print(Fore.RED + f"Invalid sweep {sweep_file}: {e}")
+        sys.exit(1)
+
+    for experiment_dir in experiment_dirs:
+        print(experiment_dir)
@@ -0,0 +1,158 @@
+import csv
+import datetime
+import os
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+ExperimentResult = "ExperimentResult"
+LATENCIES = "-latencies.csv"
+SUMMARY = "-summary.csv"
+TASK_INDEX = "-tasks.csv"
+
+# bytes read at once while counting the samples appended by a task
+READ_SIZE = 1 << 20
+
+
+class TaskBoundary(BaseModel):
+    """
+    Location of the samples of one task inside a latencies csv.
+    """
+
+    task_id: int
+    byte_start: int
+    byte_end: int
+    sample_start: int
+    sample_count: int
+    # row of the task in the summary csv of the run, None if the generator wrote no summary
+    summary_row: Optional[int] = None
+
+
+def output_name(time: datetime.datetime, name: str) -> str:
+    """Name prefix of all result files of a run, passed to the generator with -o."""
+    return f'{time.strftime("%Y_%m_%d_%H_%M_%S")}_{name}'
+
+
+def index_path_for(latencies_path: str) -> str:
+    """Returns the path of the task index belonging to a latencies csv."""
+    return latencies_path[: -len(LATENCIES)] + TASK_INDEX
+
+
+def read_task_index(index_path: str) -> List[TaskBoundary]:
+    """Reads a task index, boundaries are returned in the order the tasks ran."""
+    with open(index_path, "r", newline="") as file:
+        # empty cells are optional fields that were not recorded
+        return [TaskBoundary(**{key: value for key, value in row.items() if value != ""}) for row in csv.DictReader(file)]
+
+
+def find_task_index(latencies_path: str) -> Optional[List[TaskBoundary]]:
+    """Reads the task index of a latencies csv if the run recorded one."""
+    index_path = index_path_for(latencies_path)
+    if not os.path.exists(index_path):
+        return None
+    return read_task_index(index_path)
+
+
+def _is_sample(line: bytes) -> bool:
+    try:
+        float(line)
+        return True
+    except ValueError:
+        return False
+
+
+def count_rows(csv_path: str) -> Optional[int]:
+    """Counts the data rows of a csv with a header line, None if it does not exist."""
+    if not os.path.exists(csv_path):
+        return None
+    with open(csv_path, "r", newline="") as file:
+        return max(0, sum(1 for _ in csv.reader(file)) - 1)
+
+
+class TaskIndexRecorder:
+    """
+    Records which part of the latencies csv of a run was written by which task.
+
+    The generator appends the samples of every task to the same file. Calling
+    `begin` before and `end` after a task stores the byte range and sample range
+    the task appended, so the samples of one task can later be read with a
+    single seek. Samples written by failed attempts are skipped because every
+    attempt calls `begin` again. The summary row a task wrote is recorded as
+    well, clients that succeeded in a failed attempt still append one.
+    """
+
+    def __init__(self, name: str, result_dir: str = ExperimentResult):
+        """
+        :param name: Output name of the run as built by `output_name`.
+        :param result_dir: Folder the generator writes its results to.
+        """
+        self.latencies_path = os.path.join(result_dir, name + LATENCIES)
+        self.index_path = index_path_for(self.latencies_path)
+        self.summary_path = os.path.join(result_dir, name + SUMMARY)
+        self._offset = 0
+        self._samples = 0
+        self._header_length = 0
+        self._start = (0, 0)
+
+        if os.path.exists(self.index_path):
+            boundaries = read_task_index(self.index_path)
+            if boundaries:
+                self._offset = boundaries[-1].byte_end
+                self._samples = boundaries[-1].sample_start + boundaries[-1].sample_count
+
+    def _advance(self) -> None:
+        """Counts the samples appended since the last call."""
+        if not os.path.exists(self.latencies_path):
+            return
+
+        size = os.path.getsize(self.latencies_path)
+        if size <= self._offset:
+            return
+
+        with open(self.latencies_path, "rb") as file:
+            file.seek(self._offset)
+            if self._offset == 0:
+                first_line = file.readline()
+                if _is_sample(first_line):
+                    file.seek(0)
+                else:
+                    # csv header written when the generator created the file
+                    self._header_length = len(first_line)
+                    self._offset = self._header_length
+
+            while self._offset < size:
+                block = file.read(min(READ_SIZE, size - self._offset))
+                if not block:
+                    break
+                self._samples += block.count(b"\n")
+                self._offset += len(block)
+
+    def begin(self) -> None:
+        """Marks the start of a task attempt."""
+        self._advance()
+        self._start = (self._offset, self._samples)
+
+    def end(self, task_id: int) -> TaskBoundary:
+        """Marks the successful end of a task and appends its boundary to the index."""
+        self._advance()
+        byte_start, sample_start = self._start
+        byte_start = max(byte_start, self._header_length)
+        boundary = TaskBoundary(
+            task_id=task_id,
+            byte_start=byte_start,
+            byte_end=self._offset,
+            sample_start=sample_start,
+            sample_count=self._samples - sample_start,
+        )
+        summary_rows = count_rows(self.summary_path)
+        if summary_rows:
+            # the generator appends the summary row of a task when it finishes it
+            boundary.summary_row = summary_rows - 1
+
+        write_header = not os.path.exists(self.index_path)
+        with open(self.index_path, "a", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(TaskBoundary.model_fields))
+            if write_header:
+                writer.writeheader()
+            writer.writerow(boundary.model_dump())
+        return boundary
@@ -0,0 +1,173 @@
+import datetime
+import json
+import os
+import re
+import threading
+from collections import deque
+from time import monotonic
+from typing import Dict, List, Optional
+
+import numpy as np
+from colorama import Fore, init
+
+from latencies import LatencyHistogram
+
+init(autoreset=True)  # Ensure automatic color reset
+
+TELEMETRY = "-telemetry.jsonl"
+TELEMETRY_INTERVAL = 5.0
+TELEMETRY_WINDOW = 30.0
+
+# live percentiles only need to be roughly right, keeps every window slice small
+LIVE_PRECISION = 1e-2
+
+
+def telemetry_path_for(latencies_paths: List[str], suffix: str = TELEMETRY) -> str:
+    """Telemetry stream of a run, next to the latencies csvs of its clients."""
+    run = latencies_paths[0][: -len("-latencies.csv")]
+    if len(latencies_paths) > 1:
+        run = re.sub(r"-c\d+$", "", run)
+    return run + suffix
+
+
+def _parse_samples(lines: List[bytes]) -> np.ndarray:
+    try:
+        return np.array(lines, dtype=np.float64)
+    except ValueError:
+        samples = []
+        for line in lines:
+            try:
+                samples.append(float(line))
+            except ValueError:
+                # csv header
+                continue
+        return np.array(samples, dtype=np.float64)
+
+
+class LatencyTail:
+    """
+    Follows a latencies csv while the generator appends to it and returns
+    the samples of all lines completed since the last read.
+    """
+
+    def __init__(self, path: str, from_end: bool = True):
+        """
+        :param from_end: Skip the samples already in the file, e.g. of earlier tasks.
+        """
+        self.path = path
+        self.offset = os.path.getsize(path) if from_end and os.path.exists(path) else 0
+        self._partial = b""
+
+    def read(self) -> np.ndarray:
+        if not os.path.exists(self.path):
+            return np.empty(0)
+
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            data = file.read()
+        self.offset += len(data)
+
+        complete, newline, partial = (self._partial + data).rpartition(b"\n")
+        if not newline:
+            self._partial = partial
+            return np.empty(0)
+        self._partial = partial
+
+        lines = [line for line in complete.split(b"\n") if line.strip()]
+        return _parse_samples(lines)
+
+
+class RollingWindow:
+    """
+    Latency histogram over the last `window` seconds, built from one small
+    histogram per recorded interval so old intervals can be dropped.
+    """
+
+    def __init__(self, window: float = TELEMETRY_WINDOW):
+        self.window = window
+        self.started = monotonic()
+        self._slices = deque()
+
+    def record(self, now: float, samples: np.ndarray) -> None:
+        histogram = LatencyHistogram(precision=LIVE_PRECISION)
+        histogram.record(samples)
+        self._slices.append((now, histogram))
+        while self._slices and self._slices[0][0] <= now - self.window:
+            self._slices.popleft()
+
+    def snapshot(self, now: float) -> Dict[str, float]:
+        merged = LatencyHistogram(precision=LIVE_PRECISION)
+        for _, histogram in self._slices:
+            merged.merge(histogram)
+
+        span = min(self.window, now - self.started)
+        return {
+            'samples': merged.count,
+            'throughput': merged.count / span if span > 0 else 0.0,
+            'p50': merged.percentile(50),
+            'p99': merged.percentile(99),
+            'max': merged.max if merged.count else float('nan'),
+        }
+
+
+class TelemetryMonitor:
+    """
+    Tails the latencies csv of every client of a run in a background thread
+    and reports the rolling throughput and percentiles of the current task
+    every `interval` seconds, to the console and as json lines to a file.
+    """
+
+    def __init__(self, latencies_paths: List[str], interval: float = TELEMETRY_INTERVAL, window: float = TELEMETRY_WINDOW, output_path: Optional[str] = None):
+        self.latencies_paths = latencies_paths
+        self.interval = interval
+        self.window = window
+        self.output_path = output_path or telemetry_path_for(latencies_paths)
+        self.task_id = None
+        self._tails = [LatencyTail(path) for path in latencies_paths]
+        self._rolling = RollingWindow(window)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def set_task(self, task_id: int) -> None:
+        """Starts a new window for the task that is about to run."""
+        with self._lock:
+            for tail in self._tails:
+                tail.read()
+            self.task_id = task_id
+            self._rolling = RollingWindow(self.window)
+
+    def poll(self) -> Dict:
+        with self._lock:
+            now = monotonic()
+            samples = [tail.read() for tail in self._tails]
+            self._rolling.record(now, np.concatenate(samples) if samples else np.empty(0))
+            snapshot = self._rolling.snapshot(now)
+            snapshot['task_id'] = self.task_id
+            snapshot['elapsed'] = now - self._rolling.started
+        snapshot['time'] = datetime.datetime.now().isoformat()
+
+        print(Fore.BLUE + f"[telemetry] task {snapshot['task_id']} {snapshot['elapsed']:.0f}s "
+              f"tput {snapshot['throughput']:.1f} ops/s p50 {snapshot['p50']:.3f} ms p99 {snapshot['p99']:.3f} ms")
+
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        record = {key: None if isinstance(value, float) and np.isnan(value) else value for key, value in snapshot.items()}
+        with open(self.output_path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+        return snapshot
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except OSError as e:
+                print(Fore.RED + f"[telemetry] {e}")
+
+    def start(self) -> "TelemetryMonitor":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
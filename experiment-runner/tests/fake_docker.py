@@ -0,0 +1,80 @@
+import json
+from typing import Dict, List, Optional
+
+from docker_api import BOOKIE_IMAGE, BOOKIE_NETWORK, RESTART_TIMEOUT, DockerError
+
+
+class FakeDockerClient:
+    """
+    In-process stand-in for `DockerClient`: containers are plain dicts,
+    every call is recorded in `calls`, restarts and reconnects change the
+    start time and the interface index like the Docker Engine does.
+    """
+
+    def __init__(self, bookies: int = 3, project: str = "experiment"):
+        self.calls = []
+        self._next_index = 100
+        self.containers = {}
+        for bookie in range(1, bookies + 1):
+            name = f"{project}-bookie{bookie}-1"
+            self.containers[name] = {
+                "Id": f"id-{name}",
+                "Name": f"/{name}",
+                "Image": BOOKIE_IMAGE,
+                "State": {"StartedAt": "0"},
+                "NetworkSettings": {"Networks": {f"{project}_{BOOKIE_NETWORK}": {}}},
+                "iflink": self._new_index(),
+            }
+
+    def _new_index(self) -> str:
+        self._next_index += 1
+        return str(self._next_index)
+
+    def _get(self, container: str) -> Dict:
+        for name, data in self.containers.items():
+            if container in (name, data["Id"]):
+                return data
+        raise DockerError(404, f"No such container: {container}")
+
+    def host_interfaces(self) -> Dict[str, str]:
+        """Host interfaces by index, to pass to `ContainerControl`."""
+        return {data["iflink"]: f"veth{data['iflink']}" for data in self.containers.values()}
+
+    def list_containers(self, ancestor: Optional[str] = None) -> List[Dict]:
+        self.calls.append(("list_containers", ancestor))
+        return [
+            {"Id": data["Id"], "Names": [data["Name"]], "Image": data["Image"]}
+            for data in self.containers.values()
+            if ancestor is None or data["Image"] == ancestor
+        ]
+
+    def inspect_container(self, container: str) -> Dict:
+        self.calls.append(("inspect_container", container))
+        return json.loads(json.dumps({key: value for key, value in self._get(container).items() if key != "iflink"}))
+
+    def restart_container(self, container: str, timeout: int = RESTART_TIMEOUT) -> None:
+        self.calls.append(("restart_container", container))
+        data = self._get(container)
+        data["State"]["StartedAt"] = str(int(data["State"]["StartedAt"]) + 1)
+        # the network namespace is recreated with a new veth pair
+        data["iflink"] = self._new_index()
+
+    def disconnect_network(self, network: str, container: str) -> None:
+        self.calls.append(("disconnect_network", network, container))
+        networks = self._get(container)["NetworkSettings"]["Networks"]
+        if network not in networks:
+            raise DockerError(500, f"container {container} is not connected to network {network}")
+        del networks[network]
+
+    def connect_network(self, network: str, container: str) -> None:
+        self.calls.append(("connect_network", network, container))
+        data = self._get(container)
+        data["NetworkSettings"]["Networks"][network] = {}
+        data["iflink"] = self._new_index()
+
+    def exec_run(self, container: str, command: List[str]) -> bytes:
+        self.calls.append(("exec_run", container, tuple(command)))
+        data = self._get(container)
+        if command == ["cat", "/sys/class/net/eth0/iflink"]:
+            return (data["iflink"] + "\n").encode("utf-8")
+        raise DockerError(500, f"unsupported command {command}")
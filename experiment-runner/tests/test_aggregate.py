@@ -0,0 +1,52 @@
+import os
+
+import pandas as pd
+
+from aggregate import SUMMARY_COLUMNS, aggregate_run
+from task_index import LATENCIES, SUMMARY, TaskIndexRecorder
+
+RUN = "2024_01_01_00_00_00_experiment"
+
+
+def write_attempt(result_dir, client, samples, total_time, load):
+    """Appends what one generator client writes for one finished task."""
+    prefix = os.path.join(result_dir, f"{RUN}-c{client}")
+    latencies = prefix + LATENCIES
+    new = not os.path.exists(latencies)
+    with open(latencies, "a") as file:
+        if new:
+            file.write("latency\n")
+        file.writelines(f"{sample}\n" for sample in samples)
+
+    summary = prefix + SUMMARY
+    row = {column: 0 for column in SUMMARY_COLUMNS}
+    row.update({'Task-ID': 1, 'async / sync': 'async', 'intended load (ops/s)': load, 'thread num': 1,
+                'runtime': '1s', 'req size [B]': 128, 'Total Time (sec)': total_time})
+    pd.DataFrame([row]).to_csv(summary, mode="a", header=not os.path.exists(summary), index=False)
+
+
+def test_failed_attempt_rows_are_skipped(tmp_path):
+    result_dir = str(tmp_path)
+    recorders = [TaskIndexRecorder(f"{RUN}-c{client}", result_dir) for client in range(2)]
+
+    # first attempt fails on client 1, client 0 still finishes and writes its summary row
+    for recorder in recorders:
+        recorder.begin()
+    write_attempt(result_dir, 0, [100.0] * 10, total_time=50, load=999)
+
+    # retry succeeds on both clients
+    for recorder in recorders:
+        recorder.begin()
+    write_attempt(result_dir, 0, [1.0] * 10, total_time=10, load=100)
+    write_attempt(result_dir, 1, [2.0] * 10, total_time=5, load=100)
+    for recorder in recorders:
+        recorder.end(1)
+
+    summary = aggregate_run(result_dir, RUN, [0, 1])
+
+    assert len(summary) == 1
+    row = summary.iloc[0]
+    assert row['intended load (ops/s)'] == 200
+    assert row['Total Time (sec)'] == 10
+    assert row['Tput (ops/sec)'] == 2
+    assert row['99th p (ms)'] == 2.0
@@ -0,0 +1,96 @@
+import pytest
+
+from docker_api import BOOKIE_NETWORK, ContainerControl
+from fake_docker import FakeDockerClient
+
+BOOKIE = "experiment-bookie1-1"
+NETWORK = f"experiment_{BOOKIE_NETWORK}"
+
+
+@pytest.fixture
+def fake():
+    return FakeDockerClient()
+
+
+@pytest.fixture
+def control(fake):
+    return ContainerControl(fake, fake.host_interfaces)
+
+
+def interface_lookups(fake, name=BOOKIE):
+    return sum(1 for call in fake.calls if call[0] == "exec_run" and call[1] == name)
+
+
+def test_interface_is_cached(fake, control):
+    interface = control.host_interface(BOOKIE)
+
+    assert control.host_interface(BOOKIE) == interface
+    assert interface == f"veth{fake.containers[BOOKIE]['iflink']}"
+    assert interface_lookups(fake) == 1
+
+
+def test_restart_drops_interface(fake, control):
+    before = control.host_interface(BOOKIE)
+
+    control.restart(BOOKIE)
+
+    assert control.host_interface(BOOKIE) != before
+    assert interface_lookups(fake) == 2
+
+
+def test_restart_outside_is_detected_by_start_time(fake, control):
+    before = control.host_interface(BOOKIE)
+    started_at = control.container(BOOKIE).started_at
+
+    # e.g. docker compose restart or another fault script
+    fake.restart_container(BOOKIE)
+
+    after = control.host_interface(BOOKIE)
+    assert after != before
+    assert after == f"veth{fake.containers[BOOKIE]['iflink']}"
+    assert control.container(BOOKIE).started_at != started_at
+    assert interface_lookups(fake) == 2
+
+
+def test_reconnect_outside_is_detected_by_missing_interface(fake, control):
+    before = control.host_interface(BOOKIE)
+
+    fake.disconnect_network(NETWORK, BOOKIE)
+    fake.connect_network(NETWORK, BOOKIE)
+
+    assert control.host_interface(BOOKIE) != before
+    assert interface_lookups(fake) == 2
+
+
+def test_reconnect_drops_interface(fake, control):
+    before = control.host_interface(BOOKIE)
+
+    network = control.network(BOOKIE)
+    control.disconnect(BOOKIE, network)
+    control.connect(BOOKIE, network)
+
+    assert network == NETWORK
+    assert control.host_interface(BOOKIE) != before
+    assert interface_lookups(fake) == 2
+
+
+def test_other_containers_keep_their_interface(fake, control):
+    other = "experiment-bookie2-1"
+    interface = control.host_interface(other)
+
+    control.restart(BOOKIE)
+
+    assert control.host_interface(other) == interface
+    assert interface_lookups(fake, other) == 1
+
+
+def test_invalidate_drops_everything(fake, control):
+    assert control.bookies() == sorted(fake.containers)
+    control.host_interface(BOOKIE)
+
+    control.invalidate()
+
+    control.bookies()
+    control.host_interface(BOOKIE)
+    assert sum(1 for call in fake.calls if call[0] == "list_containers") == 2
+    assert interface_lookups(fake) == 2
@@ -0,0 +1,36 @@
+import pytest
+from pydantic import ValidationError
+
+from faults import DEFAULT_FAULTS, FaultSchedule, FaultSpec
+
+
+def test_rate_keeps_default_duration_and_latency():
+    schedule = FaultSchedule(schedule=[{"action": "delay", "rate": 2}, {"action": "disconnect", "rate": 6}])
+    delay, disconnect = schedule.schedule
+
+    assert delay.interval == 30
+    assert delay.duration == DEFAULT_FAULTS["delay"]["duration"]
+    assert delay.latency_ms == DEFAULT_FAULTS["delay"]["latency_ms"]
+    assert disconnect.interval == 10
+    assert disconnect.duration == DEFAULT_FAULTS["disconnect"]["duration"]
+
+
+def test_given_values_override_defaults():
+    spec = FaultSpec(action="delay", rate=1, latency_ms=50)
+
+    assert spec.interval == 60
+    assert spec.latency_ms == 50
+    assert spec.duration == DEFAULT_FAULTS["delay"]["duration"]
+
+
+def test_parse_fills_missing_values():
+    spec = FaultSpec.parse("delay:2")
+
+    assert spec.interval == 2
+    assert spec.duration == DEFAULT_FAULTS["delay"]["duration"]
+    assert spec.latency_ms == DEFAULT_FAULTS["delay"]["latency_ms"]
+
+
+def test_non_positive_interval_is_rejected():
+    with pytest.raises(ValidationError):
+        FaultSpec.parse("restart:0")
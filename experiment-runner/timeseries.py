@@ -0,0 +1,295 @@
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+from time import monotonic, time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from colorama import Fore, init
+
+from latencies import find_experiment_dirs
+from latency_store import ExperimentResult
+from telemetry import LatencyTail, telemetry_path_for
+
+init(autoreset=True)  # Ensure automatic color reset
+
+TIMESERIES = "-timeseries.csv"
+SERIES = "-series.csv"
+# written by the interrupt scripts, one json line per injected fault
+EVENTS = "events.jsonl"
+
+# seconds between two reads of the latencies csvs, bounds the timestamp error of a sample
+SAMPLE_INTERVAL = 0.1
+BUCKET = 1.0
+
+# a fault is recovered from once throughput and p99 are back near their level
+# of the BASELINE_WINDOW seconds before it for RECOVERY_HOLD seconds
+BASELINE_WINDOW = 30.0
+RECOVERY_HOLD = 5.0
+THROUGHPUT_TOLERANCE = 0.9
+LATENCY_TOLERANCE = 1.5
+
+# read once, timestamps advance with the monotonic clock so clock steps
+# (e.g. by NTP) during a run don't move samples and fault events apart
+_EPOCH = time()
+_MONOTONIC = monotonic()
+
+SERIES_PERCENTILES = {
+    'p50 (ms)': 50.0,
+    'p99 (ms)': 99.0,
+    'p999 (ms)': 99.9,
+}
+
+
+def timestamp() -> float:
+    """Epoch seconds advancing with the monotonic clock, the clock of timeseries and fault logs."""
+    return _EPOCH + (monotonic() - _MONOTONIC)
+
+
+class TimeseriesRecorder:
+    """
+    Stamps the samples the generator clients of a run append to their
+    latencies csvs with the wall clock time they were written and appends
+    them as `timestamp,latency,task_id` to `<run>-timeseries.csv`.
+
+    The generator only writes bare latencies, so the files are read every
+    `interval` seconds and the samples of one read are spread evenly over
+    the time since the previous read. Timestamps are taken with `timestamp`,
+    epoch seconds like the events of the interrupt scripts.
+    """
+
+    def __init__(self, latencies_paths: List[str], interval: float = SAMPLE_INTERVAL, output_path: Optional[str] = None):
+        self.latencies_paths = latencies_paths
+        self.interval = interval
+        self.output_path = output_path or telemetry_path_for(latencies_paths, TIMESERIES)
+        self.task_id = -1
+        self._tails = [LatencyTail(path) for path in latencies_paths]
+        self._last = timestamp()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def set_task(self, task_id: int) -> None:
+        """Samples read from now on belong to `task_id`."""
+        with self._lock:
+            self._record()
+            self.task_id = task_id
+
+    def poll(self) -> int:
+        """:return: The number of recorded samples."""
+        with self._lock:
+            return self._record()
+
+    def _record(self) -> int:
+        now = timestamp()
+        samples = np.concatenate([tail.read() for tail in self._tails] or [np.empty(0)])
+        previous, self._last = self._last, now
+        if samples.size == 0:
+            return 0
+
+        timestamps = previous + (np.arange(samples.size) + 1) * ((now - previous) / samples.size)
+        write_header = not os.path.exists(self.output_path)
+        os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+        with open(self.output_path, "a") as file:
+            if write_header:
+                file.write("timestamp,latency,task_id\n")
+            np.savetxt(file, np.column_stack((timestamps, samples, np.full(samples.size, self.task_id))), fmt="%.3f,%.6g,%d")
+        return int(samples.size)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except OSError as e:
+                print(Fore.RED + f"[timeseries] {e}")
+
+    def start(self) -> "TimeseriesRecorder":
+        with self._lock:
+            for tail in self._tails:
+                tail.read()
+            self._last = timestamp()
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.poll()
+
+
+def load_timeseries(path: str) -> pd.DataFrame:
+    return pd.read_csv(path, dtype={'timestamp': np.float64, 'latency': np.float64, 'task_id': np.int64})
+
+
+def aggregate_timeseries(timestamps: np.ndarray, latencies: np.ndarray, bucket: float = BUCKET, start: Optional[float] = None) -> pd.DataFrame:
+    """
+    Throughput and latency percentiles of every `bucket` seconds.
+
+    The samples are sorted once by bucket and latency, the percentiles of all
+    buckets are then read from the sorted array at computed offsets. Buckets
+    without samples are kept with zero throughput, they are the gaps a fault
+    causes.
+
+    :param start: Time of the first bucket, the first sample if None.
+    :return: One row per bucket, `time` in seconds since `start`.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    latencies = np.asarray(latencies, dtype=np.float64)
+    columns = ['time', 'Tput (ops/sec)', *SERIES_PERCENTILES, 'max (ms)']
+    if timestamps.size == 0:
+        return pd.DataFrame(columns=columns)
+
+    start = timestamps.min() if start is None else start
+    buckets = np.floor((timestamps - start) / bucket).astype(np.int64)
+    keep = buckets >= 0
+    buckets, latencies = buckets[keep], latencies[keep]
+
+    order = np.lexsort((latencies, buckets))
+    buckets, latencies = buckets[order], latencies[order]
+
+    counts = np.bincount(buckets)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    occupied = counts > 0
+
+    series = {
+        'time': np.arange(counts.size) * bucket,
+        'Tput (ops/sec)': counts / bucket,
+    }
+    for column, p in SERIES_PERCENTILES.items():
+        ranks = np.maximum(1, np.ceil(p / 100.0 * counts)).astype(np.int64)
+        positions = np.minimum(starts + ranks - 1, latencies.size - 1)
+        series[column] = np.where(occupied, latencies[positions], np.nan)
+    series['max (ms)'] = np.where(occupied, latencies[np.maximum(ends - 1, 0)], np.nan)
+    return pd.DataFrame(series, columns=columns)
+
+
+def read_events(result_dir: str, start: float = -math.inf, end: float = math.inf) -> pd.DataFrame:
+    """
+    Events logged by the interrupt scripts between `start` and `end` (epoch seconds).
+    """
+    path = os.path.join(result_dir, EVENTS)
+    events = []
+    if os.path.exists(path):
+        with open(path, "r") as file:
+            for line in file:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # line of a script killed while writing
+                    continue
+                if start <= event.get('time', math.nan) <= end:
+                    events.append(event)
+    return pd.DataFrame(events, columns=['time', 'action', 'bookie'])
+
+
+def recovery_time(series: pd.DataFrame, event_time: float, bucket: float = BUCKET, end: Optional[float] = None) -> float:
+    """
+    Seconds from an event until throughput and p99 stay near their level
+    before the event for `RECOVERY_HOLD` seconds.
+
+    :param series: Result of `aggregate_timeseries`.
+    :param event_time: Time of the event relative to the start of `series`.
+    :param end: End of an event that lasted, recovery is measured from there.
+    :return: NaN if there is no baseline before the event or the run never recovered.
+    """
+    end = event_time if end is None else end
+    times = series['time'].to_numpy()
+    throughput = series['Tput (ops/sec)'].to_numpy()
+    p99 = series['p99 (ms)'].to_numpy()
+
+    before = (times >= event_time - BASELINE_WINDOW) & (times + bucket <= event_time)
+    if not before.any():
+        return math.nan
+    baseline_throughput = np.median(throughput[before])
+    baseline_p99 = np.nanmedian(p99[before]) if not np.isnan(p99[before]).all() else math.nan
+    if baseline_throughput <= 0 or math.isnan(baseline_p99):
+        return math.nan
+
+    after = times >= end
+    healthy = (throughput >= THROUGHPUT_TOLERANCE * baseline_throughput) & (np.nan_to_num(p99, nan=math.inf) <= LATENCY_TOLERANCE * baseline_p99)
+    healthy = healthy[after]
+    hold = max(1, int(round(RECOVERY_HOLD / bucket)))
+    if healthy.size < hold:
+        return math.nan
+
+    # buckets starting a run of `hold` healthy buckets
+    windows = np.convolve(healthy.astype(np.int64), np.ones(hold, dtype=np.int64), mode='valid')
+    recovered = np.flatnonzero(windows == hold)
+    if recovered.size == 0:
+        return math.nan
+    return max(0.0, times[after][recovered[0]] - end)
+
+
+def event_recovery(series: pd.DataFrame, events: pd.DataFrame, start: float, bucket: float = BUCKET) -> pd.DataFrame:
+    """Adds the time relative to the run and the recovery time to every event."""
+    events = events.copy()
+    events['run time (s)'] = events['time'] - start
+    events['recovery (s)'] = [recovery_time(series, event_time, bucket) for event_time in events['run time (s)']]
+    return events
+
+
+def find_timeseries(experiment_dir: str) -> List[str]:
+    """Returns the timeseries files of an experiment, newest first."""
+    result_dir = os.path.join(experiment_dir, ExperimentResult)
+    if not os.path.isdir(result_dir):
+        return []
+    files = [file for file in os.listdir(result_dir) if file.endswith(TIMESERIES)]
+    return [os.path.join(result_dir, file) for file in sorted(files, reverse=True)]
+
+
+def run_series(timeseries_path: str, bucket: float = BUCKET):
+    """
+    Aggregates a timeseries file and joins the events logged during the run.
+
+    :return: The per bucket series, the events with their recovery time and the run's start (epoch seconds).
+    """
+    samples = load_timeseries(timeseries_path)
+    timestamps = samples['timestamp'].to_numpy()
+    start = float(timestamps.min()) if timestamps.size else 0.0
+    series = aggregate_timeseries(timestamps, samples['latency'].to_numpy(), bucket, start)
+
+    end = start + (series['time'].iloc[-1] + bucket if not series.empty else 0.0)
+    events = read_events(os.path.dirname(timeseries_path), start, end)
+    return series, event_recovery(series, events, start, bucket), start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate timestamped latencies into per second series and measure the recovery after logged faults.")
+
+    parser.add_argument('-n', action='store_true', help="Only use the newest run of every experiment.")
+    parser.add_argument('-b', type=float, default=BUCKET, help="Bucket width in seconds.")
+    parser.add_argument('directories', nargs='+', help="Experiment, campaign or experiments root directories.")
+
+    args = parser.parse_args()
+
+    experiment_dirs = []
+    for directory in args.directories:
+        if not os.path.exists(directory):
+            print(f"Error: folder {directory} does not exist")
+            continue
+        experiment_dirs.extend(find_experiment_dirs(directory))
+
+    timeseries_files = []
+    for experiment_dir in experiment_dirs:
+        files = find_timeseries(experiment_dir)
+        timeseries_files.extend(files[:1] if args.n else files)
+
+    if len(timeseries_files) == 0:
+        print("No timeseries files found, record them with the runner's --timeseries flag")
+        sys.exit(1)
+
+    for timeseries_file in timeseries_files:
+        started = monotonic()
+        series, events, _ = run_series(timeseries_file, args.b)
+        output_file = timeseries_file[: -len(TIMESERIES)] + SERIES
+        series.to_csv(output_file, index=False, float_format="%.3f")
+        print(f"{os.path.basename(timeseries_file)}: {len(series)} buckets in {monotonic() - started:.2f}s, saved to {output_file}")
+        for _, event in events.iterrows():
+            recovery = "not recovered" if math.isnan(event['recovery (s)']) else f"recovered after {event['recovery (s)']:.1f}s"
+            print(f"  {event['run time (s)']:8.1f}s {event['action']} {event['bookie']}: {recovery}")
@@ -1,10 +1,35 @@
 import argparse
 from datetime import time
 import os
+import re
 import sys
-from time import sleep
+from time import monotonic, sleep
+from typing import List, Optional, Pattern
 from kazoo.client import KazooClient, KazooState
+from kazoo.exceptions import NoNodeError, NotEmptyError
 from kazoo.security import make_digest_acl,ACL,Permissions
+from pydantic import BaseModel
+
+# bookies register themselves below this path, read-only bookies below its "readonly" child
+AVAILABLE_BOOKIES_PATH = "/ledgers/available"
+READONLY = "readonly"
+
+# ledger metadata lives below /ledgers, as L<id> nodes (flat layout) or in numbered
+# directories (hierarchical layouts) next to the bookie registry and cluster metadata
+LEDGERS_PATH = "/ledgers"
+LEDGER_NODE = re.compile(r"^(L\d+|\d+)$")
+# ledger metadata znodes never have children
+LEDGER_LEAF = re.compile(r"^L\d+$")
+
+# delete operations per multi request, keeps a request far below ZooKeeper's 1 MB jute.maxbuffer
+TRANSACTION_SIZE = 1000
+
+
+class ResetResult(BaseModel):
+    deleted: int
+    bookies: List[str]
+    readonly_bookies: List[str]
+    seconds: float
 
 def add_bookie(zk_client, bookie_address):
     """
@@ -50,6 +75,146 @@ def list_bookies(zk_client:KazooClient):
         print(f"Error listing Bookies: {e.with_traceback()}")
 
 
+def get_available_bookies(zk_client:KazooClient):
+    """
+    Returns the bookies registered as available (writable) in ZooKeeper.
+
+    Args:
+        zk_client (KazooClient): The Kazoo client instance.
+    """
+
+    children = zk_client.get_children(AVAILABLE_BOOKIES_PATH)
+    return [bookie for bookie in children if bookie != READONLY]
+
+
+def collect_znodes(zk_client:KazooClient, roots:List[str], leaf:Optional[Pattern]=None):
+    """
+    Lists the subtrees below `roots` level by level. All get_children requests
+    of a level are sent at once, so a tree costs one round trip per level
+    instead of one per znode.
+
+    Args:
+        zk_client (KazooClient): The Kazoo client instance.
+        roots (List[str]): Paths of the subtrees.
+        leaf (Pattern): Names of znodes known to have no children, they are not listed.
+
+    Returns:
+        List[List[str]]: The paths of every level, the roots first.
+    """
+
+    levels = []
+    level = list(roots)
+    while level:
+        levels.append(level)
+        requests = [
+            (path, zk_client.get_children_async(path))
+            for path in level
+            if leaf is None or not leaf.match(path.rsplit("/", 1)[-1])
+        ]
+        level = []
+        for path, request in requests:
+            try:
+                level.extend(f"{path}/{child}" for child in request.get())
+            except NoNodeError:
+                continue
+    return levels
+
+
+def _delete_one_by_one(zk_client:KazooClient, paths:List[str]):
+    deleted = 0
+    requests = [(path, zk_client.delete_async(path)) for path in paths]
+    for path, request in requests:
+        try:
+            request.get()
+            deleted += 1
+        except NoNodeError:
+            # already gone
+            continue
+        except NotEmptyError:
+            # a child was created after the subtree was listed
+            zk_client.delete(path, recursive=True)
+            deleted += 1
+    return deleted
+
+
+def delete_znodes(zk_client:KazooClient, levels:List[List[str]]):
+    """
+    Deletes the znodes listed by `collect_znodes`, the deepest level first.
+    Each level is deleted by concurrently committed multi requests of up to
+    TRANSACTION_SIZE operations. A batch whose transaction was rolled back,
+    e.g. because a znode vanished in between, is deleted znode by znode.
+
+    Returns:
+        int: The number of deleted znodes.
+    """
+
+    deleted = 0
+    for level in reversed(levels):
+        batches = [level[i:i + TRANSACTION_SIZE] for i in range(0, len(level), TRANSACTION_SIZE)]
+        commits = []
+        for batch in batches:
+            transaction = zk_client.transaction()
+            for path in batch:
+                transaction.delete(path)
+            commits.append((batch, transaction.commit_async()))
+
+        for batch, commit in commits:
+            results = commit.get()
+            if any(isinstance(result, Exception) for result in results):
+                deleted += _delete_one_by_one(zk_client, batch)
+            else:
+                deleted += len(batch)
+    return deleted
+
+
+def delete_ledgers(zk_client:KazooClient):
+    """
+    Deletes the metadata of all ledgers, the bookie registry and the cluster
+    metadata stay so the bookies keep running. Bookies garbage collect the
+    data of the deleted ledgers on their own.
+
+    Args:
+        zk_client (KazooClient): The Kazoo client instance.
+
+    Returns:
+        int: The number of deleted znodes.
+    """
+
+    if not zk_client.exists(LEDGERS_PATH):
+        return 0
+    ledger_nodes = [f"{LEDGERS_PATH}/{child}" for child in zk_client.get_children(LEDGERS_PATH) if LEDGER_NODE.match(child)]
+    return delete_znodes(zk_client, collect_znodes(zk_client, ledger_nodes, leaf=LEDGER_LEAF))
+
+
+def reset_cluster_state(zk_client:KazooClient):
+    """
+    Deletes all ledgers while the bookie registry is read concurrently, so a
+    warm cluster can be reused by the next run.
+
+    Args:
+        zk_client (KazooClient): The Kazoo client instance.
+
+    Returns:
+        ResetResult: Deleted znodes, the registered bookies and the duration.
+    """
+
+    start = monotonic()
+    available = zk_client.get_children_async(AVAILABLE_BOOKIES_PATH)
+    readonly = zk_client.get_children_async(f"{AVAILABLE_BOOKIES_PATH}/{READONLY}")
+
+    deleted = delete_ledgers(zk_client)
+
+    try:
+        bookies = [bookie for bookie in available.get() if bookie != READONLY]
+    except NoNodeError:
+        bookies = []
+    try:
+        readonly_bookies = readonly.get()
+    except NoNodeError:
+        readonly_bookies = []
+    return ResetResult(deleted=deleted, bookies=bookies, readonly_bookies=readonly_bookies, seconds=monotonic() - start)
+
+
 def check_connection_state(state):
     if state == KazooState.LOST:
         print("ZooKeeper connection lost")
@@ -74,7 +239,7 @@ def connect_to_zookeeper(zookeeper_hosts):
 
 def main():
     parser = argparse.ArgumentParser(description="Kazoo-based Bookie Cluster Management Tool")
-    parser.add_argument("action", choices=["add_bookie", "list_bookies"], help="The action to perform")
+    parser.add_argument("action", choices=["add_bookie", "list_bookies", "reset"], help="The action to perform, 'reset' deletes all ledgers")
     parser.add_argument("--zookeeper", required=True, help="The ZooKeeper connection string (e.g., localhost:2181)")
     parser.add_argument("--bookie_address", help="The address of the Bookie to add (required for 'add_bookie' action)")
     parser.add_argument("--username", default="user", help="Username for the digest ACL (optional)")
@@ -90,6 +255,10 @@ def main():
         add_bookie(zk_client, args.bookie_address, username=args.username, password=args.password)
     elif args.action == "list_bookies":
         list_bookies(zk_client)
+    elif args.action == "reset":
+        result = reset_cluster_state(zk_client)
+        print(f"Deleted {result.deleted} znodes in {result.seconds * 1000:.0f} ms")
+        print(f"Available bookies: {len(result.bookies)} writable, {len(result.readonly_bookies)} read-only")
 
     # Close ZooKeeper connection
     zk_client.stop()